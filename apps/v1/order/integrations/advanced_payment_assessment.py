@@ -1,31 +1,17 @@
-import requests
-import json
+import logging
 import os
-from pathlib import Path
-
-from apps.v1.products.models import ProductCategory
-
-# Django settings dan BASE_DIR ni olish
-try:
-    from django.conf import settings
-    BASE_DIR = settings.BASE_DIR
-except:
-    BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent.parent
-
-try:
-    from dotenv import load_dotenv
-    env_path = BASE_DIR / '.env'
-    if env_path.exists():
-        load_dotenv(dotenv_path=env_path, override=True)
-    else:
-        load_dotenv(override=True)
-except ImportError:
-    load_dotenv = None
-except Exception:
-    pass
-
-API_KEY = os.getenv('ISell_API_KEY')
-DOC_ID = os.getenv('ISell_DOC_ID')
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.v1.products.models import GristApplication, GristApplicationProduct, GristProduct, ProductCategory
+from apps.v1.products.integrations.grist_client import get_grist_client, GristAPIError
+from apps.v1.products.integrations.fingerprints import row_hash, unchanged_result
+from apps.v1.products.integrations.instrumentation import instrumented
+from apps.v1.products.integrations.product_lists import BULK_BATCH_SIZE
+from apps.v1.products.services.percentage_matrix import invalidate_percentage_matrix
+
+logger = logging.getLogger(__name__)
 
 Isell_ADVANCED_PAYMENT_ASSESSMENT = os.getenv('ISell_PRODUCT_ADVANCED_PAYMENT_ASSESSMENT')
 Isell_RISK_CATEGORIES = os.getenv('ISell_RISK_CATEGORY')
@@ -34,116 +20,118 @@ Isell_PRICE_CATEGORIES = os.getenv('ISell_PRICE_CATEGORY')
 ISell_APPLICATION = os.getenv('ISell_APPLICATION')
 ISell_PRODUCTS = os.getenv('ISell_PRODUCTS')
 
+CATEGORY_COLUMNS = ["category"]
+ASSESSMENT_COLUMNS = ["risk_category", "price_category", "percentage"]
+APPLICATION_COLUMNS = ["products", "risk_category_id"]
+GRIST_PRODUCT_COLUMNS = ["price_category_id"]
+APPLICATION_TYPES = {"products": "RefList"}
 
-def get_url(table_name):
-    return f"https://isell.getgrist.com/api/docs/{DOC_ID}/tables/{table_name}/records"
-
-headers = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Accept": "application/json"
-}
 
-
-def get_advanced_payment_assessment():
+@instrumented("advanced_payment")
+def get_advanced_payment_assessment(fingerprint):
     """
     Advanced payment assessment ma'lumotlarini Grist'dan olib ProductCategory modeliga saqlash
     """
-    print("[ADVANCED_PAYMENT] Starting advanced payment assessment import...")
+    logger.info("Starting advanced payment assessment import...")
+    grist = get_grist_client()
     try:
         # Environment variables check
         if not Isell_RISK_CATEGORIES:
-            print("[ADVANCED_PAYMENT] ERROR: Environment variable 'Isell_RISK_CATEGORIES' is not set")
+            logger.error("Environment variable 'Isell_RISK_CATEGORIES' is not set")
             return {
                 "success": False,
                 "message": "Environment variable 'Isell_RISK_CATEGORIES' is not set"
             }
         if not Isell_PRICE_CATEGORIES:
-            print("[ADVANCED_PAYMENT] ERROR: Environment variable 'Isell_PRICE_CATEGORIES' is not set")
+            logger.error("Environment variable 'Isell_PRICE_CATEGORIES' is not set")
             return {
                 "success": False,
                 "message": "Environment variable 'Isell_PRICE_CATEGORIES' is not set"
             }
         if not Isell_ADVANCED_PAYMENT_ASSESSMENT:
-            print("[ADVANCED_PAYMENT] ERROR: Environment variable 'Isell_ADVANCED_PAYMENT_ASSESSMENT' is not set")
+            logger.error("Environment variable 'Isell_ADVANCED_PAYMENT_ASSESSMENT' is not set")
             return {
                 "success": False,
                 "message": "Environment variable 'Isell_ADVANCED_PAYMENT_ASSESSMENT' is not set"
             }
         
         # 1. Risk categories ni olish
-        print("[ADVANCED_PAYMENT] Fetching risk categories...")
-        risk_categories_url = get_url(Isell_RISK_CATEGORIES)
-        print(f"[ADVANCED_PAYMENT] Risk categories URL: {risk_categories_url}")
-        risk_response = requests.get(risk_categories_url, headers=headers)
-        print(f"[ADVANCED_PAYMENT] Risk categories API Status: {risk_response.status_code}")
-        
-        if risk_response.status_code != 200:
-            try:
-                error_detail = risk_response.json()
-            except:
-                error_detail = risk_response.text
-            print(f"[ADVANCED_PAYMENT] ERROR: Risk categories API failed - {error_detail}")
+        logger.info("Fetching risk categories...")
+        try:
+            risk_records = list(fingerprint.track(
+                Isell_RISK_CATEGORIES, grist.iter_table(Isell_RISK_CATEGORIES, columns=CATEGORY_COLUMNS)
+            ))
+        except GristAPIError as e:
+            logger.error(f"Risk categories API failed - {e.detail or str(e)}")
             return {
                 "success": False,
-                "message": f"Risk categories API Error: {risk_response.status_code}",
-                "url": risk_categories_url,
+                "message": f"Risk categories API Error: {e.status_code}",
+                "url": grist.records_url(Isell_RISK_CATEGORIES),
                 "table_name": Isell_RISK_CATEGORIES,
-                "error_detail": error_detail
+                "error_detail": e.detail or str(e)
             }
         
         # Risk categories mapping yaratish (id -> category name)
         risk_categories_map = {}
-        for record in risk_response.json().get("records", []):
+        for record in risk_records:
             record_id = record.get("id")
             category_name = record.get("fields", {}).get("category")
             if record_id and category_name:
                 risk_categories_map[record_id] = category_name
-        print(f"[ADVANCED_PAYMENT] Risk categories mapped: {len(risk_categories_map)}")
+        logger.info(f"Risk categories mapped: {len(risk_categories_map)}")
         
         # 2. Product categories ni olish
-        print("[ADVANCED_PAYMENT] Fetching product categories...")
-        product_categories_url = get_url(Isell_PRICE_CATEGORIES)
-        print(f"[ADVANCED_PAYMENT] Product categories URL: {product_categories_url}")
-        product_response = requests.get(product_categories_url, headers=headers)
-        print(f"[ADVANCED_PAYMENT] Product categories API Status: {product_response.status_code}")
-        
-        if product_response.status_code != 200:
-            print(f"[ADVANCED_PAYMENT] ERROR: Product categories API failed - Status {product_response.status_code}")
+        logger.info("Fetching product categories...")
+        try:
+            product_records = list(fingerprint.track(
+                Isell_PRICE_CATEGORIES, grist.iter_table(Isell_PRICE_CATEGORIES, columns=CATEGORY_COLUMNS)
+            ))
+        except GristAPIError as e:
+            logger.error(f"Product categories API failed - {str(e)}")
             return {
                 "success": False,
-                "message": f"Product categories API Error: {product_response.status_code}"
+                "message": f"Product categories API Error: {e.status_code}"
             }
         
         # Product categories mapping yaratish (id -> category name)
         product_categories_map = {}
-        for record in product_response.json().get("records", []):
+        for record in product_records:
             record_id = record.get("id")
             category_name = record.get("fields", {}).get("category")
             if record_id and category_name:
                 product_categories_map[record_id] = category_name
-        print(f"[ADVANCED_PAYMENT] Product categories mapped: {len(product_categories_map)}")
+        logger.info(f"Product categories mapped: {len(product_categories_map)}")
         
         # 3. Advanced payment assessment ni olish
-        print("[ADVANCED_PAYMENT] Fetching advanced payment assessment...")
-        assessment_url = get_url(Isell_ADVANCED_PAYMENT_ASSESSMENT)
-        print(f"[ADVANCED_PAYMENT] Assessment URL: {assessment_url}")
-        assessment_response = requests.get(assessment_url, headers=headers)
-        print(f"[ADVANCED_PAYMENT] Assessment API Status: {assessment_response.status_code}")
-        
-        if assessment_response.status_code != 200:
-            print(f"[ADVANCED_PAYMENT] ERROR: Assessment API failed - Status {assessment_response.status_code}")
+        logger.info("Fetching advanced payment assessment...")
+        try:
+            assessment_records = list(fingerprint.track(
+                Isell_ADVANCED_PAYMENT_ASSESSMENT,
+                grist.iter_table(Isell_ADVANCED_PAYMENT_ASSESSMENT, columns=ASSESSMENT_COLUMNS)
+            ))
+        except GristAPIError as e:
+            logger.error(f"Assessment API failed - {str(e)}")
             return {
                 "success": False,
-                "message": f"Advanced payment assessment API Error: {assessment_response.status_code}"
+                "message": f"Advanced payment assessment API Error: {e.status_code}"
             }
         
-        assessment_records = assessment_response.json().get("records", [])
-        print(f"[ADVANCED_PAYMENT] Total assessment records: {len(assessment_records)}")
+        logger.info(f"Total assessment records: {len(assessment_records)}")
+        
+        if fingerprint.unchanged():
+            return unchanged_result(fingerprint)
+        
+        # Qator hash i o'zgarmagan yozuvlar uchun ORM so'rovi yuborilmaydi
+        known_hashes = dict(
+            ProductCategory.objects.filter(grist_product_category_id__isnull=False)
+            .values_list('grist_product_category_id', 'grist_hash')
+        )
         
         # 4. ProductCategory modeliga ma'lumotlarni saqlash
         created_count = 0
         updated_count = 0
         skipped_count = 0
+        unchanged_count = 0
         skipped_details = []
         
         for record in assessment_records:
@@ -166,7 +154,13 @@ def get_advanced_payment_assessment():
                     "price_category_id": price_category_id,
                     "price_category_name": price_category_name
                 })
-                print(f"[ADVANCED_PAYMENT] ⚠ Skipped record {assessment_id}: Missing category mapping")
+                logger.warning(f"Skipped record {assessment_id}: Missing category mapping")
+                continue
+            
+            # Kategoriya nomlari boshqa jadvallardan keladi - ular ham hash ga kiradi
+            assessment_hash = row_hash([record.get("row_hash"), risk_category_name, price_category_name])
+            if known_hashes.get(str(assessment_id)) == assessment_hash:
+                unchanged_count += 1
                 continue
             
             try:
@@ -178,50 +172,275 @@ def get_advanced_payment_assessment():
                         "risk_category": risk_category_name,
                         "percentage": percentage,
                         "grist_risk_category_id": str(risk_category_id) if risk_category_id else None,
-                        "grist_price_category_id": str(price_category_id) if price_category_id else None
+                        "grist_price_category_id": str(price_category_id) if price_category_id else None,
+                        "grist_hash": assessment_hash
                     }
                 )
                 
                 if created:
                     created_count += 1
-                    print(f"[ADVANCED_PAYMENT] ✓ Created: {price_category_name} - {risk_category_name} ({percentage}%)")
+                    logger.debug(f"Created: {price_category_name} - {risk_category_name} ({percentage}%)")
                 else:
                     updated_count += 1
-                    print(f"[ADVANCED_PAYMENT] - Updated: {price_category_name} - {risk_category_name} ({percentage}%)")
+                    logger.debug(f"Updated: {price_category_name} - {risk_category_name} ({percentage}%)")
                     
             except Exception as e:
                 skipped_count += 1
-                print(f"[ADVANCED_PAYMENT] ⚠ Error processing record {assessment_id}: {str(e)}")
+                logger.warning(f"Error processing record {assessment_id}: {str(e)}")
                 continue
         
-        print(f"[ADVANCED_PAYMENT] Import completed! Created: {created_count}, Updated: {updated_count}, Skipped: {skipped_count}")
+        if created_count or updated_count:
+            invalidate_percentage_matrix()
+        fingerprint.save()
+        logger.info(f"Import completed! Created: {created_count}, Updated: {updated_count}, Unchanged: {unchanged_count}, Skipped: {skipped_count}")
         return {
             "success": True,
             "message": "Advanced payment assessment импортирован успешно",
             "created": created_count,
             "updated": updated_count,
             "skipped": skipped_count,
+            "unchanged": unchanged_count,
             "total_processed": created_count + updated_count + skipped_count,
             "risk_categories_found": len(risk_categories_map),
             "product_categories_found": len(product_categories_map),
             "risk_categories_map": risk_categories_map,
             "product_categories_map": product_categories_map,
-            "skipped_details": skipped_details[:5] if skipped_details else []  # Faqat birinchi 5 ta
+            "skipped_details": skipped_details[:5] if skipped_details else [],  # Faqat birinchi 5 ta
         }
         
     except Exception as e:
-        print(f"[ADVANCED_PAYMENT] ERROR: {str(e)}")
+        logger.exception(f"Advanced payment assessment import failed: {e}")
+        return {
+            "success": False,
+            "message": f"Error: {str(e)}"
+        }
+
+def reference_ids(value):
+    """Grist RefList qiymati (``["L", 1, 2]``) -> butun sonlar ro'yxati"""
+    if not isinstance(value, list):
+        return []
+    return [item for item in value if isinstance(item, int) and not isinstance(item, bool)]
+
+
+def save_application_records(records, delete_missing=False):
+    """Grist Application qatorlarini GristApplication/GristApplicationProduct ga yozish (hash i o'zgarmaganlari o'tkaziladi)"""
+    existing = {
+        application.grist_application_id: application
+        for application in GristApplication.objects.only('id', 'grist_application_id', 'grist_hash')
+    }
+    
+    now = timezone.now()
+    applications_to_create = []
+    applications_to_update = []
+    product_ids = {}
+    unchanged_count = 0
+    seen = set()
+    
+    for record in records:
+        grist_id = record.get("id")
+        if grist_id in seen:
+            continue
+        seen.add(grist_id)
+        
+        application = existing.get(grist_id)
+        if application is not None and record.get("row_hash") and application.grist_hash == record["row_hash"]:
+            unchanged_count += 1
+            continue
+        
+        fields = record.get("fields", {})
+        risk_category_id = fields.get("risk_category_id")
+        risk_category_id = str(risk_category_id) if risk_category_id else None
+        product_ids[grist_id] = dict.fromkeys(reference_ids(fields.get("products")))
+        if application is None:
+            applications_to_create.append(GristApplication(
+                grist_application_id=grist_id, risk_category_id=risk_category_id, grist_hash=record.get("row_hash")
+            ))
+            continue
+        
+        application.risk_category_id = risk_category_id
+        application.grist_hash = record.get("row_hash")
+        application.updated_at = now
+        applications_to_update.append(application)
+    
+    applications_to_delete = []
+    if delete_missing:
+        applications_to_delete = [application.pk for grist_id, application in existing.items() if grist_id not in seen]
+    
+    with transaction.atomic():
+        GristApplication.objects.bulk_create(applications_to_create, batch_size=BULK_BATCH_SIZE)
+        GristApplication.objects.bulk_update(
+            applications_to_update, ['risk_category_id', 'grist_hash', 'updated_at'], batch_size=BULK_BATCH_SIZE
+        )
+        changed = applications_to_create + applications_to_update
+        GristApplicationProduct.objects.filter(application__in=applications_to_update).delete()
+        GristApplicationProduct.objects.bulk_create(
+            [
+                GristApplicationProduct(application=application, grist_product_id=product_id)
+                for application in changed
+                for product_id in product_ids[application.grist_application_id]
+            ],
+            batch_size=BULK_BATCH_SIZE
+        )
+        GristApplication.objects.filter(pk__in=applications_to_delete).delete()
+    
+    return {
+        "created": len(applications_to_create),
+        "updated": len(applications_to_update),
+        "unchanged": unchanged_count,
+        "deleted": len(applications_to_delete),
+    }
+
+
+def save_grist_product_records(records, delete_missing=False):
+    """
+    Grist Products qatorlarini GristProduct ga yozish (grist id -> price_category_id).
+    delete_missing=True (to'liq import) bo'lsa Grist'da yo'q qatorlar o'chiriladi.
+    """
+    existing = {product.grist_product_id: product for product in GristProduct.objects.all()}
+    
+    now = timezone.now()
+    products_to_create = []
+    products_to_update = []
+    unchanged_count = 0
+    seen = set()
+    
+    for record in records:
+        grist_id = record.get("id")
+        if grist_id in seen:
+            continue
+        seen.add(grist_id)
+        
+        product = existing.get(grist_id)
+        if product is not None and record.get("row_hash") and product.grist_hash == record["row_hash"]:
+            unchanged_count += 1
+            continue
+        
+        price_category_id = record.get("fields", {}).get("price_category_id")
+        price_category_id = str(price_category_id) if price_category_id else None
+        if product is None:
+            products_to_create.append(GristProduct(
+                grist_product_id=grist_id, price_category_id=price_category_id, grist_hash=record.get("row_hash")
+            ))
+            continue
+        
+        product.price_category_id = price_category_id
+        product.grist_hash = record.get("row_hash")
+        product.updated_at = now
+        products_to_update.append(product)
+    
+    products_to_delete = []
+    if delete_missing:
+        products_to_delete = [product.pk for grist_id, product in existing.items() if grist_id not in seen]
+    
+    with transaction.atomic():
+        GristProduct.objects.bulk_create(products_to_create, batch_size=BULK_BATCH_SIZE)
+        GristProduct.objects.bulk_update(
+            products_to_update, ['price_category_id', 'grist_hash', 'updated_at'], batch_size=BULK_BATCH_SIZE
+        )
+        GristProduct.objects.filter(pk__in=products_to_delete).delete()
+    
+    return {
+        "created": len(products_to_create),
+        "updated": len(products_to_update),
+        "unchanged": unchanged_count,
+        "deleted": len(products_to_delete),
+    }
+
+
+@instrumented("quote_tables")
+def import_quote_tables(fingerprint):
+    """To'lov jadvali uchun Grist Application va Products jadvallarini lokal modellarga ko'chirish"""
+    logger.info("Starting quote tables import...")
+    grist = get_grist_client()
+    try:
+        try:
+            application_records = list(fingerprint.track(
+                ISell_APPLICATION, grist.iter_table(ISell_APPLICATION, columns=APPLICATION_COLUMNS, column_types=APPLICATION_TYPES)
+            ))
+            product_records = list(fingerprint.track(
+                ISell_PRODUCTS, grist.iter_table(ISell_PRODUCTS, columns=GRIST_PRODUCT_COLUMNS)
+            ))
+        except GristAPIError as e:
+            logger.error(f"Quote tables API failed - {e.detail or str(e)}")
+            return {
+                "success": False,
+                "message": f"Quote tables API Error: {e.status_code}",
+                "error_detail": e.detail or str(e)
+            }
+        
+        logger.info(f"Applications: {len(application_records)}, Grist products: {len(product_records)}")
+        
+        if fingerprint.unchanged():
+            return unchanged_result(fingerprint)
+        
+        applications = save_application_records(application_records, delete_missing=True)
+        products = save_grist_product_records(product_records, delete_missing=True)
+        
+        fingerprint.save()
+        logger.info(f"Quote tables import completed! Applications: {applications}, Grist products: {products}")
+        return {
+            "success": True,
+            "message": "Заявки и продукты ГРИСТ импортированы успешно",
+            **{key: applications[key] + products[key] for key in applications},
+            "applications": applications,
+            "grist_products": products
+        }
+    
+    except Exception as e:
+        logger.exception(f"Quote tables import failed: {e}")
         return {
             "success": False,
             "message": f"Error: {str(e)}"
         }
 
-def get_application():
-    application_url = get_url(ISell_APPLICATION)
-    application_response = requests.get(application_url, headers=headers)
-    return application_response.json()
 
-def get_products_in_grist():
-    products_url = get_url(ISell_PRODUCTS)
-    products_response = requests.get(products_url, headers=headers)
-    return products_response.json()
\ No newline at end of file
+def project_row_hashes(records, columns):
+    # Webhook barcha ustunlarni yuboradi - hash to'liq import bilan mos bo'lishi uchun
+    for record in records:
+        fields = record.get("fields", {})
+        record["fields"] = {column: fields.get(column) for column in columns if column in fields}
+        record["row_hash"] = row_hash(record["fields"])
+    return records
+
+
+def apply_application_rows(records):
+    """Grist webhook orqali kelgan Application qatorlarini qo'llash"""
+    return save_application_records(project_row_hashes(records, APPLICATION_COLUMNS))
+
+
+def apply_grist_product_rows(records):
+    """Grist webhook orqali kelgan Products qatorlarini qo'llash"""
+    return save_grist_product_records(project_row_hashes(records, GRIST_PRODUCT_COLUMNS))
+
+
+def grist_price_categories(grist_product_ids):
+    """grist product id -> price_category_id (bitta indeksli so'rov)"""
+    return dict(
+        GristProduct.objects.filter(grist_product_id__in=grist_product_ids, price_category_id__isnull=False)
+        .values_list('grist_product_id', 'price_category_id')
+    )
+
+
+def grist_application_links(grist_product_ids):
+    """(grist product id, risk_category_id) juftliklari Grist'dagi zayavkalar tartibida"""
+    return list(
+        GristApplicationProduct.objects.filter(grist_product_id__in=grist_product_ids)
+        .order_by('application__grist_application_id', 'id')
+        .values_list('grist_product_id', 'application__risk_category_id')
+    )
+
+
+def grist_risk_categories(grist_product_ids):
+    """grist product id -> mahsulot uchragan birinchi zayavkaning risk_category_id si"""
+    risk_categories = {}
+    for grist_product_id, risk_category_id in grist_application_links(grist_product_ids):
+        risk_categories.setdefault(grist_product_id, risk_category_id)
+    return risk_categories
+
+
+def grist_basket_risk_category(grist_product_ids):
+    """Savatdagi mahsulotlardan birini o'z ichiga olgan birinchi zayavkaning risk_category_id si"""
+    for _, risk_category_id in grist_application_links(grist_product_ids):
+        if risk_category_id:
+            return risk_category_id
+    return None
@@ -1,119 +1,152 @@
-import requests
-import json
+import logging
 import os
-from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
 
 from apps.v1.order.models import Tariffs
+from apps.v1.products.integrations.grist_client import get_grist_client, GristAPIError
+from apps.v1.products.integrations.fingerprints import row_hash, unchanged_result
+from apps.v1.products.integrations.instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
 
-# Django settings dan BASE_DIR ni olish
-try:
-    from django.conf import settings
-    BASE_DIR = settings.BASE_DIR
-except:
-    BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent.parent
-
-try:
-    from dotenv import load_dotenv
-    env_path = BASE_DIR / '.env'
-    if env_path.exists():
-        load_dotenv(dotenv_path=env_path, override=True)
-    else:
-        load_dotenv(override=True)
-except ImportError:
-    load_dotenv = None
-except Exception:
-    pass
-
-API_KEY = os.getenv('ISell_API_KEY')
-DOC_ID = os.getenv('ISell_DOC_ID')
 Isell_TARIFFS = os.getenv('ISell_TARIFFS')
 
+TARIFF_COLUMNS = ["name", "payments_count", "offset", "type", "coefficient"]
+
+
+def tariff_values(fields):
+    """Grist tarif qatori -> Tariffs maydonlari"""
+    return {
+        'name': fields.get('name', ''),
+        'payments_count': fields.get('payments_count', 0),
+        'offset_days': fields.get('offset', 0),
+        'type': fields.get('type', ''),
+        'coefficient': fields.get('coefficient', 1.0),
+    }
+
+
+def save_tariff_records(records, deactivate_missing=False):
+    """Grist tarif qatorlarini Tariffs bilan grist_tariff_id bo'yicha bulk sinxronlash"""
+    existing = {}
+    duplicates = []
+    for tariff in Tariffs.objects.filter(grist_tariff_id__isnull=False).order_by('id'):
+        if tariff.grist_tariff_id in existing:
+            duplicates.append(tariff)
+        else:
+            existing[tariff.grist_tariff_id] = tariff
+    
+    now = timezone.now()
+    tariffs_to_create = []
+    tariffs_to_update = []
+    unchanged_count = 0
+    seen = set()
+    
+    for record in records:
+        grist_id = str(record.get('id'))
+        row_hash = record.get('row_hash')
+        if grist_id in seen:
+            continue
+        seen.add(grist_id)
+        
+        tariff = existing.get(grist_id)
+        if tariff is not None and tariff.is_active and row_hash and tariff.grist_hash == row_hash:
+            unchanged_count += 1
+            continue
+        
+        values = tariff_values(record.get('fields', {}))
+        if tariff is None:
+            tariffs_to_create.append(Tariffs(grist_tariff_id=grist_id, grist_hash=row_hash, is_active=True, **values))
+            continue
+        
+        for field, value in values.items():
+            setattr(tariff, field, value)
+        tariff.grist_hash = row_hash
+        tariff.is_active = True
+        tariff.updated_at = now
+        tariffs_to_update.append(tariff)
+    
+    tariffs_to_deactivate = []
+    if deactivate_missing:
+        tariffs_to_deactivate = [
+            tariff.pk for grist_id, tariff in existing.items()
+            if grist_id not in seen and tariff.is_active
+        ] + [tariff.pk for tariff in duplicates if tariff.is_active]
+    
+    with transaction.atomic():
+        Tariffs.objects.bulk_create(tariffs_to_create)
+        Tariffs.objects.bulk_update(
+            tariffs_to_update,
+            ['name', 'payments_count', 'offset_days', 'type', 'coefficient', 'grist_hash', 'is_active', 'updated_at']
+        )
+        Tariffs.objects.filter(pk__in=tariffs_to_deactivate).update(is_active=False, updated_at=now)
+    
+    return {
+        "created": len(tariffs_to_create),
+        "updated": len(tariffs_to_update),
+        "unchanged": unchanged_count,
+        "deactivated": len(tariffs_to_deactivate),
+    }
 
-def get_url(table_name):
-    return f"https://isell.getgrist.com/api/docs/{DOC_ID}/tables/{table_name}/records"
 
-headers = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Accept": "application/json"
-}
+def apply_tariff_rows(records):
+    """Grist webhook orqali kelgan tarif qatorlarini qo'llash (hash faqat TARIFF_COLUMNS bo'yicha)"""
+    for record in records:
+        fields = record.get('fields', {})
+        record['row_hash'] = row_hash({column: fields.get(column) for column in TARIFF_COLUMNS if column in fields})
+    
+    return save_tariff_records(records)
 
 
-def get_tariffs():
+@instrumented("tariffs")
+def get_tariffs(fingerprint):
     """
     ISell API dan tariflarni olib kelib bazaga saqlaydi
     Response format: [{id: 1, fields: {name: "...", ...}}]
     """
-    print("[ORDER_LIST] Starting tariffs import...")
-    url = get_url(Isell_TARIFFS)
-    print(f"[ORDER_LIST] API URL: {url}")
+    logger.info("Starting tariffs import...")
+    grist = get_grist_client()
     
     try:
-        response = requests.get(url, headers=headers)
-        print(f"[ORDER_LIST] API Response Status: {response.status_code}")
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if not isinstance(data, dict) or 'records' not in data:
-            print("[ORDER_LIST] ERROR: Invalid response format")
-            return {"error": "Invalid response format"}
-        
-        records = data.get('records', [])
-        print(f"[ORDER_LIST] Total records received: {len(records)}")
+        records = list(fingerprint.track(Isell_TARIFFS, grist.iter_table(Isell_TARIFFS, columns=TARIFF_COLUMNS)))
+        logger.info(f"Total records received: {len(records)}")
         
-        created_count = 0
-        updated_count = 0
+        if not records:
+            # Bo'sh javobda barcha tariflar o'chib ketmasligi uchun
+            logger.warning("No tariffs found")
+            return {
+                "success": False,
+                "error": "No tariffs found in Grist"
+            }
         
-        for record in records:
-            grist_id = str(record.get('id'))
-            fields = record.get('fields', {})
-            
-            # Ma'lumotlarni olish
-            name = fields.get('name', '')
-            payments_count = fields.get('payments_count', 0)
-            offset = fields.get('offset', 0)
-            tariff_type = fields.get('type', '')
-            coefficient = fields.get('coefficient', 1.0)
-            
-            print(f"[ORDER_LIST] Processing tariff: {name} (ID: {grist_id})")
-            
-            # Tariff yaratish yoki yangilash
-            tariff, created = Tariffs.objects.update_or_create(
-                grist_tariff_id=grist_id,
-                defaults={
-                    'name': name,
-                    'payments_count': payments_count,
-                    'offset_days': offset,
-                    'type': tariff_type,
-                    'coefficient': coefficient,
-                    'is_active': True
-                }
-            )
-            
-            if created:
-                created_count += 1
-                print(f"[ORDER_LIST] ✓ Created new tariff: {name}")
-            else:
-                updated_count += 1
-                print(f"[ORDER_LIST] - Updated existing tariff: {name}")
+        if fingerprint.unchanged():
+            return unchanged_result(fingerprint)
         
-        print(f"[ORDER_LIST] Import completed! Created: {created_count}, Updated: {updated_count}, Total: {len(records)}")
+        saved = save_tariff_records(records, deactivate_missing=True)
+        fingerprint.save()
+        logger.info(
+            f"Import completed! Created: {saved['created']}, Updated: {saved['updated']}, "
+            f"Unchanged: {saved['unchanged']}, Deactivated: {saved['deactivated']}, Total: {len(records)}"
+        )
         return {
             "success": True,
             "message": "Tariffs imported successfully",
-            "created": created_count,
-            "updated": updated_count,
+            "created": saved["created"],
+            "updated": saved["updated"],
+            "unchanged": saved["unchanged"],
+            "deactivated": saved["deactivated"],
             "total": len(records)
         }
         
-    except requests.RequestException as e:
-        print(f"[ORDER_LIST] ERROR: API request failed - {str(e)}")
+    except GristAPIError as e:
+        logger.error(f"API request failed - {str(e)}")
         return {
             "success": False,
             "error": f"API request failed: {str(e)}"
         }
     except Exception as e:
-        print(f"[ORDER_LIST] ERROR: Import failed - {str(e)}")
+        logger.exception(f"Tariffs import failed: {e}")
         return {
             "success": False,
             "error": f"Import failed: {str(e)}"
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0006_alter_orders_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tariffs',
+            name='grist_hash',
+            field=models.CharField(blank=True, max_length=16, null=True, verbose_name='Хэш строки ГРИСТ'),
+        ),
+    ]
@@ -9,6 +9,7 @@ class Tariffs(models.Model):
     offset_days = models.IntegerField(null=True, blank=True, verbose_name="Количество дней отсрочки")
     type = models.CharField(max_length=255, null=True, blank=True, verbose_name="Тип тарифа")
     grist_tariff_id = models.CharField(max_length=255, null=True, blank=True, verbose_name="ID тарифа в ГРИСТ")
+    grist_hash = models.CharField(max_length=16, null=True, blank=True, verbose_name="Хэш строки ГРИСТ")
     coefficient = models.FloatField(null=True, blank=True, verbose_name="Коэффициент")
     is_active = models.BooleanField(default=True, verbose_name="Активен")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
@@ -1,3 +1,53 @@
 from django.test import TestCase
 
-# Create your tests here.
+from apps.v1.order.integrations.order_list import apply_tariff_rows, save_tariff_records
+from apps.v1.order.models import Tariffs
+
+
+def tariff_record(grist_id, name, payments_count, row_hash):
+    return {
+        "id": grist_id,
+        "fields": {"name": name, "payments_count": payments_count, "offset": 0, "type": "monthly", "coefficient": 1.2},
+        "row_hash": row_hash,
+    }
+
+
+class SaveTariffRecordsTests(TestCase):
+    def test_diff(self):
+        save_tariff_records([tariff_record(1, "6 oy", 6, "h1"), tariff_record(2, "12 oy", 12, "h2")])
+
+        result = save_tariff_records([
+            tariff_record(1, "6 oy", 6, "h1"),
+            tariff_record(2, "12 oy", 10, "h2b"),
+            tariff_record(3, "24 oy", 24, "h3"),
+        ])
+        self.assertEqual((result["created"], result["updated"], result["unchanged"]), (1, 1, 1))
+        self.assertEqual(Tariffs.objects.get(grist_tariff_id="2").payments_count, 10)
+        self.assertEqual(Tariffs.objects.count(), 3)
+
+    def test_deactivates_only_on_full_import(self):
+        save_tariff_records([tariff_record(1, "6 oy", 6, "h1"), tariff_record(2, "12 oy", 12, "h2")])
+        duplicate = Tariffs.objects.create(name="6 oy", grist_tariff_id="1")
+
+        result = save_tariff_records([tariff_record(1, "6 oy", 6, "h1")])
+        self.assertEqual(result["deactivated"], 0)
+        self.assertFalse(Tariffs.objects.filter(is_active=False).exists())
+
+        result = save_tariff_records([tariff_record(1, "6 oy", 6, "h1")], deactivate_missing=True)
+        self.assertEqual(result["deactivated"], 2)
+        self.assertEqual(
+            set(Tariffs.objects.filter(is_active=False).values_list('id', flat=True)),
+            {duplicate.id, Tariffs.objects.get(grist_tariff_id="2").id},
+        )
+
+    def test_webhook_rows_match_full_import_hash(self):
+        save_tariff_records([tariff_record(1, "6 oy", 6, None)])
+        record = tariff_record(1, "6 oy", 6, None)
+        record["fields"]["manualSort"] = 1
+        result = apply_tariff_rows([record])
+        self.assertEqual(result["updated"], 1)
+
+        record = tariff_record(1, "6 oy", 6, None)
+        record["fields"]["manualSort"] = 2
+        result = apply_tariff_rows([record])
+        self.assertEqual((result["updated"], result["unchanged"]), (0, 1))
@@ -9,10 +9,10 @@ from datetime import datetime, timedelta
 from calendar import monthrange
 from django.db import transaction
 
-from apps.v1.order.integrations.order_list import get_tariffs
 from apps.v1.order.models import Tariffs, Orders, OrderItems, OrderPaymentSchedule, OrderCaluculationMode, CompanyAddress
 from apps.v1.order.serializers import TariffsSerializer, OrdersSerializer, CompanyAddressSerializer
-from apps.v1.products.models import Products
+from apps.v1.products.models import Products, ImportJob
+from apps.v1.products.views.import_views import IMPORT_JOB_RESPONSE, IMPORT_FORCE_PARAMETER, enqueue_import_response
 
 
 class ImportTariffsView(APIView):
@@ -20,22 +20,12 @@ class ImportTariffsView(APIView):
     
     @swagger_auto_schema(
         tags=['Импорт'],
-        operation_description="Импорт тарифов",
-        responses={
-            200: openapi.Response(
-                description="Тарифы импортированы успешно",
-                schema=openapi.Schema(
-                    type=openapi.TYPE_OBJECT,
-                    properties={
-                        "message": openapi.Schema(type=openapi.TYPE_STRING, description="Сообщение о результате импорта")
-                    }
-                )
-            )
-        }
+        operation_description="Импорт тарифов (в фоне)",
+        manual_parameters=[IMPORT_FORCE_PARAMETER],
+        responses={202: IMPORT_JOB_RESPONSE}
     )
     def get(self, request):
-        result = get_tariffs()
-        return Response({"message": "Тарифы импортированы успешно"}, status=status.HTTP_200_OK)
+        return enqueue_import_response(request, ImportJob.Kind.TARIFFS)
 
 
 class TariffsListView(APIView):
@@ -218,7 +208,7 @@ class CreateOrderView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            tariff = get_object_or_404(Tariffs, id=installment_period)
+            tariff = get_object_or_404(Tariffs, id=installment_period, is_active=True)
             
             total_product_sum = 0
             products_data = []
@@ -295,7 +285,7 @@ class CreateOrderView(APIView):
                     continue
                 
                 product = get_object_or_404(Products, id=product_id)
-                tariff = get_object_or_404(Tariffs, id=item_installment_period)
+                tariff = get_object_or_404(Tariffs, id=item_installment_period, is_active=True)
                 
                 order_item = OrderItems.objects.create(
                     order=order,
@@ -4,8 +4,10 @@ from django.utils.html import format_html
 from .models import (
     Categories, Products,
     ProductDetails, ProductIDs, 
-    ProductProperties, ProductCharacteristics, ProductCategory, ProductImages, Banner
+    ProductProperties, ProductCharacteristics, ProductCategory, ProductImages, Banner, ImportJob, GristSyncState, GristWebhookEvent, DataVersion,
+    GristApplication, GristApplicationProduct, GristProduct
 )
+from .services.percentage_matrix import invalidate_percentage_matrix
 
 
 @admin.register(Categories)
@@ -112,6 +114,19 @@ class ProductCategoryAdmin(admin.ModelAdmin):
     list_filter = ('risk_category', 'percentage')
     ordering = ["created_at"]
 
+    # Minimal badal matritsasi boshqa jarayonlarda ham yangilanishi uchun
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_percentage_matrix()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_percentage_matrix()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_percentage_matrix()
+
 
 @admin.register(Banner)
 class BannerAdmin(admin.ModelAdmin):
@@ -124,4 +139,58 @@ class BannerAdmin(admin.ModelAdmin):
     list_display = ('get_image', 'name', 'description', 'link', 'is_active', 'order')
     search_fields = ('name', 'description', 'link')
     list_filter = ('is_active', 'order')
-    ordering = ["created_at"]
\ No newline at end of file
+    ordering = ["created_at"]
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'force', 'worker', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('kind', 'status', 'force')
+    readonly_fields = ('progress', 'result', 'error', 'worker', 'started_at', 'finished_at', 'created_at', 'updated_at')
+    ordering = ["-created_at"]
+
+
+@admin.register(GristSyncState)
+class GristSyncStateAdmin(admin.ModelAdmin):
+    list_display = ('stage', 'row_count', 'fingerprint', 'updated_at')
+    readonly_fields = ('stage', 'fingerprint', 'row_count', 'tables', 'created_at', 'updated_at')
+    exclude = ('groups',)
+    ordering = ["stage"]
+
+
+@admin.register(GristWebhookEvent)
+class GristWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'table', 'status', 'row_count', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('table', 'status')
+    readonly_fields = ('records', 'result', 'error', 'attempts', 'started_at', 'processed_at', 'created_at', 'updated_at')
+    ordering = ["-created_at"]
+
+
+@admin.register(DataVersion)
+class DataVersionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'version', 'updated_at')
+    readonly_fields = ('name', 'version', 'updated_at')
+    ordering = ["name"]
+
+
+class GristApplicationProductInline(admin.TabularInline):
+    model = GristApplicationProduct
+    extra = 0
+    readonly_fields = ('grist_product_id',)
+
+
+@admin.register(GristApplication)
+class GristApplicationAdmin(admin.ModelAdmin):
+    list_display = ('grist_application_id', 'risk_category_id', 'updated_at')
+    search_fields = ('grist_application_id', 'products__grist_product_id')
+    readonly_fields = ('grist_application_id', 'risk_category_id', 'grist_hash', 'created_at', 'updated_at')
+    inlines = [GristApplicationProductInline]
+    ordering = ["grist_application_id"]
+
+
+@admin.register(GristProduct)
+class GristProductAdmin(admin.ModelAdmin):
+    list_display = ('grist_product_id', 'price_category_id', 'updated_at')
+    search_fields = ('grist_product_id',)
+    readonly_fields = ('grist_product_id', 'price_category_id', 'grist_hash', 'created_at', 'updated_at')
+    ordering = ["grist_product_id"]
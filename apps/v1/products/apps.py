@@ -6,3 +6,6 @@ class ProductsConfig(AppConfig):
     name = 'apps.v1.products'
     label = 'products'
     verbose_name = 'Продукты'
+
+    def ready(self):
+        import apps.v1.products.signals  # noqa: F401
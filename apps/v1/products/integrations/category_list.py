@@ -1,93 +1,141 @@
-import requests
-import json
+import logging
 import os
-from pathlib import Path
 
-from apps.v1.products.models import Categories
+from django.db import transaction
+from django.utils import timezone
 
-# Django settings dan BASE_DIR ni olish
-try:
-    from django.conf import settings
-    BASE_DIR = settings.BASE_DIR
-except:
-    # Agar Django settings yuklanmagan bo'lsa, o'zimiz aniqlaymiz
-    BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent.parent
+from apps.v1.products.models import Categories
+from apps.v1.products.integrations.grist_client import get_grist_client, GristAPIError
+from apps.v1.products.integrations.fingerprints import unchanged_result
+from apps.v1.products.integrations.instrumentation import instrumented
+from apps.v1.products.integrations.product_lists import BULK_BATCH_SIZE, to_grist_id
 
-try:
-    from dotenv import load_dotenv
-    # .env faylga to'liq yo'l bilan yuklash
-    env_path = BASE_DIR / '.env'
-    if env_path.exists():
-        load_dotenv(dotenv_path=env_path, override=True)
-    else:
-        # Agar .env fayl topilmasa, joriy directorydan qidiramiz
-        load_dotenv(override=True)
-except ImportError:
-    load_dotenv = None
-except Exception:
-    pass
+logger = logging.getLogger(__name__)
 
 # Environment variablelarni olish
-API_KEY = os.getenv('ISell_API_KEY')
-DOC_ID = os.getenv('ISell_DOC_ID')
 Isell_PRODUCT_CATEGORIES = os.getenv('ISell_PRODUCT_CATEGORIES') or os.getenv('Isell_PRODUCT_CATEGORIES')
 
+CATEGORY_COLUMNS = ["name", "description"]
 
-def get_url(table_name):
-    return f"https://isell.getgrist.com/api/docs/{DOC_ID}/tables/{table_name}/records"
 
-headers = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Accept": "application/json"
-}
+def save_category_records(records):
+    """Grist kategoriyalarini Categories bilan Grist ID bo'yicha bulk sinxronlash (o'chirilganlari is_active=False)"""
+    existing = {}
+    unlinked_by_name = {}
+    duplicates = []
+    for category in Categories.objects.order_by('id'):
+        if category.grist_category_id:
+            if category.grist_category_id in existing:
+                duplicates.append(category)
+            else:
+                existing[category.grist_category_id] = category
+        elif category.name:
+            unlinked_by_name.setdefault(category.name, category)
+    
+    now = timezone.now()
+    categories_to_create = []
+    categories_to_update = []
+    unchanged_count = 0
+    seen = set()
+    
+    for record in records:
+        grist_id = to_grist_id(record.get("id"))
+        fields = record.get("fields", {})
+        name = fields.get("name")
+        description = fields.get("description")
+        row_hash = record.get("row_hash")
+        
+        if not grist_id or grist_id in seen:
+            continue
+        seen.add(grist_id)
+        
+        category = existing.get(grist_id) or unlinked_by_name.pop(name, None)
+        if category is None:
+            categories_to_create.append(Categories(
+                name=name,
+                description=description,
+                grist_category_id=grist_id,
+                grist_hash=row_hash,
+                is_active=True
+            ))
+            continue
+        
+        if category.grist_category_id == grist_id and category.is_active and row_hash and category.grist_hash == row_hash:
+            unchanged_count += 1
+            continue
+        
+        category.name = name
+        category.description = description
+        category.grist_category_id = grist_id
+        category.grist_hash = row_hash
+        category.is_active = True
+        category.updated_at = now
+        categories_to_update.append(category)
+    
+    categories_to_deactivate = [
+        category.pk for grist_id, category in existing.items()
+        if grist_id not in seen and category.is_active
+    ] + [category.pk for category in duplicates if category.is_active]
+    
+    with transaction.atomic():
+        Categories.objects.bulk_create(categories_to_create, batch_size=BULK_BATCH_SIZE)
+        Categories.objects.bulk_update(
+            categories_to_update,
+            ["name", "description", "grist_category_id", "grist_hash", "is_active", "updated_at"],
+            batch_size=BULK_BATCH_SIZE
+        )
+        Categories.objects.filter(pk__in=categories_to_deactivate).update(is_active=False, updated_at=now)
+    
+    return {
+        "created": len(categories_to_create),
+        "updated": len(categories_to_update),
+        "unchanged": unchanged_count,
+        "deactivated": len(categories_to_deactivate),
+        "changed_category_ids": sorted(
+            [category.pk for category in categories_to_create + categories_to_update] + categories_to_deactivate
+        ),
+    }
 
 
-def get_categories():
-    print("[CATEGORY_LIST] Starting categories import...")
-    url = get_url(Isell_PRODUCT_CATEGORIES)
-    print(f"[CATEGORY_LIST] API URL: {url}")
+@instrumented("categories")
+def get_categories(fingerprint):
+    logger.info("Starting categories import...")
+    grist = get_grist_client()
     
     try:
-        response = requests.get(url, headers=headers)
-        print(f"[CATEGORY_LIST] API Response Status: {response.status_code}")
+        records = list(fingerprint.track(
+            Isell_PRODUCT_CATEGORIES,
+            grist.iter_table(Isell_PRODUCT_CATEGORIES, columns=CATEGORY_COLUMNS)
+        ))
+        logger.info(f"Total records received: {len(records)}")
         
-        records = response.json().get("records", [])
-        print(f"[CATEGORY_LIST] Total records received: {len(records)}")
+        if not records:
+            # Bo'sh javobda barcha kategoriyalar o'chib ketmasligi uchun
+            logger.warning("No categories found")
+            return {"error": "No categories found", "message": "Failed to import categories"}
         
-        created_count = 0
-        existing_count = 0
+        if fingerprint.unchanged():
+            return unchanged_result(fingerprint)
         
-        for category in records:
-            fields = category.get("fields", {})
-            category_name = fields.get("name")
-            category_desc = fields.get("description")
-            
-            print(f"[CATEGORY_LIST] Processing category: {category_name}")
-            
-            category_obj, created = Categories.objects.get_or_create(
-                name=category_name,
-                defaults={"description": category_desc}
-            )
-            
-            if created:
-                created_count += 1
-                print(f"[CATEGORY_LIST] ✓ Created new category: {category_name}")
-            else:
-                existing_count += 1
-                print(f"[CATEGORY_LIST] - Category already exists: {category_name}")
-        
-        print(f"[CATEGORY_LIST] Import completed! Created: {created_count}, Existing: {existing_count}")
+        saved = save_category_records(records)
+        fingerprint.save()
+        logger.info(
+            f"Import completed! Created: {saved['created']}, Updated: {saved['updated']}, "
+            f"Unchanged: {saved['unchanged']}, Deactivated: {saved['deactivated']}"
+        )
         return {
             "message": "Categories added successfully",
-            "created": created_count,
-            "existing": existing_count,
+            "created": saved["created"],
+            "updated": saved["updated"],
+            "unchanged": saved["unchanged"],
+            "deactivated": saved["deactivated"],
+            "changed_category_ids": saved["changed_category_ids"],
             "total": len(records)
         }
         
+    except GristAPIError as e:
+        logger.error(f"Grist API request failed: {e}")
+        return {"error": str(e), "message": "Failed to import categories"}
     except Exception as e:
-        print(f"[CATEGORY_LIST] ERROR: {str(e)}")
+        logger.exception(f"Categories import failed: {e}")
         return {"error": str(e), "message": "Failed to import categories"}
-
-
-
-
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+
+from apps.v1.products.models import GristSyncState
+
+logger = logging.getLogger(__name__)
+
+# Fingerprint tekshiruvini o'chirish uchun ISell_GRIST_FINGERPRINTS=0
+FINGERPRINTS_ENABLED = os.getenv('ISell_GRIST_FINGERPRINTS', '1') not in ('0', 'false', 'False')
+
+
+def row_hash(fields):
+    """Grist qatori maydonlarining ixcham (16 belgili) hash i"""
+    payload = json.dumps(fields, sort_keys=True, default=str, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class TableFingerprint:
+    """Jadval fingerprinti: qatorlar soni + (id, qator hash) ketma-ketligining digest i"""
+
+    def __init__(self):
+        self.count = 0
+        self._digest = hashlib.sha256()
+
+    def add(self, record_id, fields):
+        value = row_hash(fields)
+        self.count += 1
+        self._digest.update(f"{record_id}:{value};".encode("utf-8"))
+        return value
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+
+class StageFingerprint:
+    """Import bosqichining kirish ma'lumotlari (o'z jadvallari va bog'liq bosqichlar) fingerprinti"""
+
+    def __init__(self, stage, force=False):
+        self.stage = stage
+        self.force = force
+        self.tables = {}
+        self.groups = {}
+        self._upstream = None
+
+    def track(self, table_name, records, group_by=None):
+        table = self.tables.setdefault(table_name, TableFingerprint())
+        for record in records:
+            record["row_hash"] = table.add(record.get("id"), record.get("fields", {}))
+            if group_by is not None:
+                self.add_to_group(group_by(record), record["row_hash"])
+            yield record
+
+    def add_to_group(self, key, value):
+        """Guruh (masalan product_name) hash iga qator hash ini qo'shish"""
+        if key is None:
+            return
+        key = str(key)
+        self.groups[key] = row_hash([self.groups.get(key), value])
+
+    @property
+    def row_count(self):
+        return sum(table.count for table in self.tables.values())
+
+    def upstream(self):
+        if self._upstream is None:
+            from apps.v1.products.services.grist_sync import STAGE_DEPENDENCIES
+            dependencies = STAGE_DEPENDENCIES.get(self.stage, [])
+            self._upstream = dict(
+                GristSyncState.objects.filter(stage__in=dependencies).values_list('stage', 'fingerprint')
+            )
+        return self._upstream
+
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        for table_name in sorted(self.tables):
+            table = self.tables[table_name]
+            digest.update(f"table:{table_name}:{table.count}:{table.hexdigest()};".encode("utf-8"))
+        for stage, fingerprint in sorted(self.upstream().items()):
+            digest.update(f"upstream:{stage}:{fingerprint};".encode("utf-8"))
+        return digest.hexdigest()
+
+    def enabled(self):
+        """unchanged() tekshiruvi bajariladimi (force=True yoki ISell_GRIST_FINGERPRINTS=0 bo'lsa yo'q)"""
+        return not self.force and FINGERPRINTS_ENABLED
+
+    def unchanged(self):
+        """Oxirgi muvaffaqiyatli importdan beri kirish ma'lumotlari o'zgarmagan bo'lsa True"""
+        if not self.enabled():
+            return False
+        return GristSyncState.objects.filter(stage=self.stage, fingerprint=self.fingerprint()).exists()
+
+    def group_digests(self):
+        # Guruh hash i bog'liq bosqichlarning shu guruhdagi hash i (guruhlari bo'lmasa - butun fingerprinti) bilan
+        from apps.v1.products.services.grist_sync import STAGE_DEPENDENCIES
+        shared = []
+        keyed = []
+        for stage, fingerprint, groups in GristSyncState.objects.filter(
+            stage__in=STAGE_DEPENDENCIES.get(self.stage, [])
+        ).order_by('stage').values_list('stage', 'fingerprint', 'groups'):
+            if groups:
+                keyed.append(groups)
+            else:
+                shared.append(f"{stage}:{fingerprint}")
+        return {
+            key: row_hash([shared, value] + [groups.get(key) for groups in keyed])
+            for key, value in self.groups.items()
+        }
+
+    def changed_groups(self):
+        """
+        Oxirgi importdan beri o'zgargan yoki yo'qolgan guruhlar kalitlari;
+        hammasini qayta ishlash kerak bo'lsa None (force, oldingi holat yo'q).
+        """
+        if not self.enabled():
+            return None
+        previous = GristSyncState.objects.filter(stage=self.stage).values_list('groups', flat=True).first()
+        if not previous:
+            return None
+        current = self.group_digests()
+        changed = {key for key, value in current.items() if previous.get(key) != value}
+        return changed | (previous.keys() - current.keys())
+
+    def save(self):
+        GristSyncState.objects.update_or_create(
+            stage=self.stage,
+            defaults={
+                "fingerprint": self.fingerprint(),
+                "row_count": self.row_count,
+                "tables": {name: {"rows": table.count, "digest": table.hexdigest()} for name, table in self.tables.items()},
+                "groups": self.group_digests(),
+            }
+        )
+
+    def summary(self, unchanged=False):
+        return {
+            "fingerprint": self.fingerprint()[:16],
+            "rows": self.row_count,
+            "unchanged": unchanged,
+        }
+
+
+def unchanged_result(fingerprint):
+    """Kirish ma'lumotlari o'zgarmagan bosqich uchun natija"""
+    logger.info(f"{fingerprint.stage}: Grist data unchanged ({fingerprint.row_count} rows), skipping")
+    return {
+        "success": True,
+        "message": "Данные в Grist не изменились - импорт пропущен",
+        "unchanged_table": True,
+        "total_processed": 0,
+    }
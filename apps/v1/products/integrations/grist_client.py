@@ -0,0 +1,344 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Django settings dan BASE_DIR ni olish
+try:
+    from django.conf import settings
+    BASE_DIR = settings.BASE_DIR
+except:
+    BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent.parent
+
+try:
+    from dotenv import load_dotenv
+    env_path = BASE_DIR / '.env'
+    if env_path.exists():
+        load_dotenv(dotenv_path=env_path, override=True)
+    else:
+        load_dotenv(override=True)
+except ImportError:
+    load_dotenv = None
+except Exception:
+    pass
+
+
+class GristAPIError(Exception):
+    """Grist API returned a non-successful response or could not be reached"""
+
+    def __init__(self, message, status_code=None, detail=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class GristClient:
+    """Shared Grist API client: pooled session, timeouts, bounded retries and request stats"""
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url=None, api_key=None, doc_id=None, timeout=None,
+                 max_retries=None, backoff=None, pool_size=None):
+        self.base_url = (base_url or os.getenv('ISell_GRIST_URL') or "https://isell.getgrist.com").rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv('ISell_API_KEY')
+        self.doc_id = doc_id if doc_id is not None else os.getenv('ISell_DOC_ID')
+        # (connect, read) sekundlarda
+        self.timeout = timeout or (
+            float(os.getenv('ISell_GRIST_CONNECT_TIMEOUT', 5)),
+            float(os.getenv('ISell_GRIST_READ_TIMEOUT', 60)),
+        )
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('ISell_GRIST_MAX_RETRIES', 3))
+        self.backoff = backoff if backoff is not None else float(os.getenv('ISell_GRIST_BACKOFF', 0.5))
+        self.max_backoff = 10.0
+        pool_size = pool_size or int(os.getenv('ISell_GRIST_POOL_SIZE', 10))
+        # Ustunlarni /sql orqali tanlash (o'chirish uchun ISell_GRIST_USE_SQL=0)
+        self.use_sql = os.getenv('ISell_GRIST_USE_SQL', '1') not in ('0', 'false', 'False')
+        self.page_size = int(os.getenv('ISell_GRIST_PAGE_SIZE', 1000))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Accept": "application/json",
+        })
+
+        self._lock = threading.Lock()
+        self._stats = self._empty_stats()
+
+    # URL lar
+
+    def doc_url(self):
+        return f"{self.base_url}/api/docs/{self.doc_id}"
+
+    def records_url(self, table_name):
+        return f"{self.doc_url()}/tables/{table_name}/records"
+
+    def attachment_url(self, attachment_id):
+        return f"{self.doc_url()}/attachments/{attachment_id}/download"
+
+    def sql_url(self):
+        return f"{self.doc_url()}/sql"
+
+    # Statistika
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "requests": 0,
+            "retries": 0,
+            "errors": 0,
+            "bytes": 0,
+            "seconds": 0.0,
+        }
+
+    def _record(self, seconds, size=0, retried=False, failed=False):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["seconds"] += seconds
+            self._stats["bytes"] += size
+            if retried:
+                self._stats["retries"] += 1
+            if failed:
+                self._stats["errors"] += 1
+
+    def _record_bytes(self, size):
+        with self._lock:
+            self._stats["bytes"] += size
+
+    def stats(self):
+        """Snapshot of accumulated request counters"""
+        with self._lock:
+            return dict(self._stats)
+
+    def stats_since(self, snapshot):
+        """Counters accumulated since an earlier ``stats()`` snapshot"""
+        current = self.stats()
+        delta = {key: current[key] - snapshot.get(key, 0) for key in current}
+        delta["seconds"] = round(delta["seconds"], 3)
+        return delta
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = self._empty_stats()
+
+    # HTTP
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.max_backoff)
+                except ValueError:
+                    pass
+        return min(self.backoff * (2 ** attempt), self.max_backoff)
+
+    def request(self, method, url, **kwargs):
+        """Send a request with timeout and bounded retry (raises GristAPIError)"""
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                elapsed = time.monotonic() - started
+                if attempt < self.max_retries:
+                    self._record(elapsed, retried=True)
+                    time.sleep(self._retry_delay(attempt))
+                    continue
+                self._record(elapsed, failed=True)
+                raise GristAPIError(f"Grist API request failed: {str(e)}")
+
+            elapsed = time.monotonic() - started
+            size = len(response.content) if not kwargs.get("stream") else 0
+
+            if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                self._record(elapsed, size, retried=True)
+                response.close()
+                time.sleep(self._retry_delay(attempt, response))
+                continue
+
+            if response.status_code != 200:
+                self._record(elapsed, size, failed=True)
+                try:
+                    detail = response.json()
+                except ValueError:
+                    detail = response.text
+                raise GristAPIError(
+                    f"Grist API Error: {response.status_code}",
+                    status_code=response.status_code,
+                    detail=detail
+                )
+
+            self._record(elapsed, size)
+            return response
+
+    @staticmethod
+    def _quote(identifier):
+        return '"' + str(identifier).replace('"', '""') + '"'
+
+    @staticmethod
+    def _sql_value(value):
+        # Grist Bool ustunlarni SQLite da 0/1 sifatida saqlaydi
+        if isinstance(value, bool):
+            return int(value)
+        return value
+
+    LIST_TYPES = ("RefList", "Attachments")
+
+    @classmethod
+    def _decode_sql_cell(cls, value, column_type=None):
+        """/sql qiymatini /records ko'rinishiga keltirish (Bool 0/1 -> bool, RefList/Attachments JSON -> ["L", ...])"""
+        if value is None:
+            return value
+        if column_type == "Bool":
+            return bool(value)
+        if column_type in cls.LIST_TYPES and isinstance(value, str):
+            try:
+                decoded = json.loads(value)
+            except ValueError:
+                return value
+            if isinstance(decoded, list):
+                return ["L", *decoded]
+        return value
+
+    def _fetch_sql_page(self, table_name, filter, columns, after, limit, column_types=None, order_by=None):
+        order_by = list(order_by or [])
+        select_columns = ["id", *dict.fromkeys(c for c in [*order_by, *columns] if c != "id")]
+        select = ", ".join(self._quote(column) for column in select_columns)
+        # Keyset: (IFNULL(order_by...), id) > oxirgi sahifaning oxirgi qatori; NULL lar '' sifatida tartiblanadi
+        keys = [f"IFNULL({self._quote(column)}, '')" for column in order_by] + [self._quote("id")]
+        args = []
+        conditions = []
+        if after is not None:
+            conditions.append(f"({', '.join(keys)}) > ({', '.join('?' for _ in keys)})")
+            args.extend(after)
+        for column, values in (filter or {}).items():
+            values = list(values)
+            if not values:
+                conditions.append("0")
+                continue
+            placeholders = ", ".join("?" for _ in values)
+            conditions.append(f"{self._quote(column)} IN ({placeholders})")
+            args.extend(self._sql_value(value) for value in values)
+        sql = (
+            f"SELECT {select} FROM {self._quote(table_name)} "
+            f"WHERE {' AND '.join(conditions) or '1'} ORDER BY {', '.join(keys)} LIMIT {int(limit)}"
+        )
+
+        response = self.request("POST", self.sql_url(), json={"sql": sql, "args": args})
+
+        records = []
+        after = None
+        for row in response.json().get("records", []):
+            fields = row.get("fields", {})
+            record_id = fields.pop("id", None)
+            after = [*("" if fields.get(column) is None else fields[column] for column in order_by), record_id]
+            records.append({
+                "id": record_id,
+                "fields": {
+                    key: self._decode_sql_cell(value, (column_types or {}).get(key))
+                    for key, value in fields.items()
+                    if key in columns
+                }
+            })
+        return records, after
+
+    def _fetch_records(self, table_name, filter, columns, order_by=None):
+        params = {}
+        if filter:
+            params["filter"] = json.dumps(filter)
+        if order_by:
+            params["sort"] = ",".join([*order_by, "id"])
+
+        response = self.request("GET", self.records_url(table_name), params=params)
+        records = response.json().get("records", [])
+
+        if columns:
+            columns = set(columns)
+            for record in records:
+                fields = record.get("fields", {})
+                record["fields"] = {key: value for key, value in fields.items() if key in columns}
+
+        return records
+
+    def iter_table(self, table_name, filter=None, columns=None, page_size=None, column_types=None, order_by=None):
+        """Yield ``{"id", "fields"}`` records page by page (keyset pages via /sql when ``columns`` is given)"""
+        if not table_name:
+            raise GristAPIError("Grist table name is not configured")
+
+        page_size = page_size or self.page_size
+
+        if columns and self.use_sql:
+            after = None
+            first_page = True
+            while True:
+                try:
+                    page, after = self._fetch_sql_page(
+                        table_name, filter, columns, after, page_size, column_types, order_by
+                    )
+                except GristAPIError as e:
+                    if first_page and e.status_code in (400, 403, 404):
+                        logger.warning(
+                            f"Grist refused /sql for {table_name} ({e.status_code}), reading the whole table via /records"
+                        )
+                        break
+                    raise
+                first_page = False
+                yield from page
+                if len(page) < page_size:
+                    return
+
+        yield from self._fetch_records(table_name, filter, columns, order_by)
+
+    def fetch_table(self, table_name, filter=None, columns=None, column_types=None):
+        """Fetch all records of a Grist table as a list (see ``iter_table``)"""
+        return list(self.iter_table(table_name, filter=filter, columns=columns, column_types=column_types))
+
+    def download_attachment(self, attachment_id):
+        """Download attachment bytes"""
+        response = self.request("GET", self.attachment_url(attachment_id))
+        return response.content
+
+    def iter_attachment(self, attachment_id, chunk_size=64 * 1024):
+        """Stream attachment bytes in ``chunk_size`` pieces"""
+        response = self.request("GET", self.attachment_url(attachment_id), stream=True)
+        try:
+            for chunk in response.iter_content(chunk_size):
+                self._record_bytes(len(chunk))
+                yield chunk
+        except requests.RequestException as e:
+            raise GristAPIError(f"Grist attachment download failed: {str(e)}")
+        finally:
+            response.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_grist_client():
+    """Process-wide shared GristClient"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GristClient()
+    return _client
+
+
+def set_grist_client(client):
+    """Replace the shared client (e.g. to point importers at a local stand-in)"""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,455 @@
+import io
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+
+# Integratsiya modullari o'qiydigan jadvallar (env nomi -> standart jadval nomi)
+TABLE_ENV_DEFAULTS = {
+    "ISell_PRODUCT_CATEGORIES": "Product_categories",
+    "ISell_PRODUCT_PRICE": "Product_price",
+    "ISell_PRODUCT_VARIATIONS": "Product_variations",
+    "ISell_PROPERTY": "Property",
+    "ISell_PROPERTY_VALUE": "Property_value",
+    "ISell_PRODUCT_PROPERTY_VALUE": "Product_property_value",
+    "ISell_TARIFFS": "Tariffs",
+    "ISell_RISK_CATEGORY": "Risk_category",
+    "ISell_PRICE_CATEGORY": "Price_category",
+    "ISell_PRODUCT_ADVANCED_PAYMENT_ASSESSMENT": "Advanced_payment_assessment",
+    "ISell_APPLICATION": "Application",
+    "ISell_PRODUCTS": "Products",
+}
+
+COLORS = ["Black", "White", "Blue", "Green", "Gold", "Silver", "Purple", "Red"]
+STORAGES = ["64GB", "128GB", "256GB", "512GB", "1TB"]
+SIMS = ["Dual SIM", "SIM + eSIM", "eSIM"]
+CATEGORIES = ["Smartfonlar", "Planshetlar", "Noutbuklar", "Soatlar", "Quloqchinlar", "Aksessuarlar"]
+PROPERTIES = [("Ekran", "text"), ("Protsessor", "text"), ("Batareya", "text"), ("Kamera", "text"), ("Og'irlik", "text")]
+
+
+def table_names():
+    """Jadval nomlari: env o'rnatilgan bo'lsa o'sha, aks holda standart nom"""
+    return {env: os.getenv(env) or default for env, default in TABLE_ENV_DEFAULTS.items()}
+
+
+def generate_synthetic_tables(products=200, variations=2000, inactive_ratio=0.5, seed=42):
+    """Build a synthetic ``{table_name: records}`` Grist document shaped like the ISell tables"""
+    rng = random.Random(seed)
+    names = table_names()
+    tables = {}
+
+    tables[names["ISell_PRODUCT_CATEGORIES"]] = [
+        {"id": i, "fields": {"name": name, "description": f"{name} bo'limi"}}
+        for i, name in enumerate(CATEGORIES, start=1)
+    ]
+
+    properties = [
+        {"id": i, "fields": {"name": name, "type": kind}}
+        for i, (name, kind) in enumerate(PROPERTIES, start=1)
+    ]
+    tables[names["ISell_PROPERTY"]] = properties
+
+    property_values = []
+    for prop in properties:
+        for n in range(1, 9):
+            property_values.append({
+                "id": len(property_values) + 1,
+                "fields": {"property_id": prop["id"], "value": f"{prop['fields']['name']} {n}"}
+            })
+    tables[names["ISell_PROPERTY_VALUE"]] = property_values
+
+    variation_rows = []
+    price_rows = []
+    product_property_rows = []
+    attachment_id = 0
+    per_product = max(variations // max(products, 1), 1)
+
+    for product_id in range(1, products + 1):
+        product_name = f"Model {product_id}"
+        category_name = CATEGORIES[product_id % len(CATEGORIES)]
+        base_price = rng.randrange(100, 2000) * 10000
+
+        for n in range(per_product):
+            if len(variation_rows) >= variations:
+                break
+            used = rng.random() < 0.2
+            color = rng.choice(COLORS)
+            storage = rng.choice(STORAGES)
+            sim = rng.choice(SIMS)
+            attachment_id += 1
+            variation_id = len(variation_rows) + 1
+            variation_name = f"{product_name} {color} {storage} {'B/U' if used else 'NEW'} #{variation_id}"
+            variation_rows.append({
+                "id": variation_id,
+                "fields": {
+                    "fully_defined": True,
+                    "name": variation_name,
+                    "product_name": product_name,
+                    "used": used,
+                    "color": color,
+                    "storage": storage,
+                    "sim": sim,
+                    "picture": ["L", attachment_id],
+                }
+            })
+            price_rows.append({
+                "id": len(price_rows) + 1,
+                "fields": {
+                    "actual": True,
+                    "product_name": product_name,
+                    "product_id": product_id,
+                    "variation_name": variation_name,
+                    "variation_id": variation_id,
+                    "category_name": category_name,
+                    "price": base_price + n * 10000,
+                }
+            })
+            for prop in properties:
+                value = rng.choice([v for v in property_values if v["fields"]["property_id"] == prop["id"]])
+                product_property_rows.append({
+                    "id": len(product_property_rows) + 1,
+                    "fields": {
+                        "product_name": product_name,
+                        "variation_id": variation_id,
+                        "value_id": value["id"],
+                        "property_id": prop["id"],
+                    }
+                })
+
+    # Eskirgan narx tarixi (actual=False)
+    history = int(len(price_rows) * inactive_ratio / max(1 - inactive_ratio, 0.01))
+    for _ in range(history):
+        sample = rng.choice(price_rows)["fields"]
+        price_rows.append({
+            "id": len(price_rows) + 1,
+            "fields": dict(sample, actual=False, price=sample["price"] - 50000)
+        })
+    # Grist'da bo'lgani kabi qatorlar aralash tartibda
+    rng.shuffle(price_rows)
+    for i, row in enumerate(price_rows, start=1):
+        row["id"] = i
+
+    # fully_defined=False qoralama variationlar
+    for _ in range(variations // 10):
+        variation_rows.append({
+            "id": len(variation_rows) + 1,
+            "fields": {"fully_defined": False, "name": "", "product_name": None, "used": False,
+                       "color": None, "storage": None, "sim": None, "picture": None}
+        })
+
+    tables[names["ISell_PRODUCT_VARIATIONS"]] = variation_rows
+    tables[names["ISell_PRODUCT_PRICE"]] = price_rows
+    tables[names["ISell_PRODUCT_PROPERTY_VALUE"]] = product_property_rows
+
+    tables[names["ISell_TARIFFS"]] = [
+        {"id": i, "fields": {"name": f"{count} oy", "payments_count": count, "offset": 0,
+                             "type": "installment", "coefficient": 1 + count * 0.04}}
+        for i, count in enumerate([3, 6, 9, 12, 18, 24], start=1)
+    ]
+
+    risk = [{"id": i, "fields": {"category": name}} for i, name in enumerate(["A", "B", "C", "D"], start=1)]
+    price_categories = [{"id": i, "fields": {"category": name}} for i, name in enumerate(["Low", "Mid", "High"], start=1)]
+    tables[names["ISell_RISK_CATEGORY"]] = risk
+    tables[names["ISell_PRICE_CATEGORY"]] = price_categories
+    tables[names["ISell_PRODUCT_ADVANCED_PAYMENT_ASSESSMENT"]] = [
+        {"id": (r["id"] - 1) * len(price_categories) + p["id"],
+         "fields": {"risk_category": r["id"], "price_category": p["id"],
+                    "percentage": round(0.05 * r["id"] + 0.05 * p["id"], 2)}}
+        for r in risk for p in price_categories
+    ]
+    tables[names["ISell_PRODUCTS"]] = [
+        {"id": product_id, "fields": {"price_category_id": rng.choice(price_categories)["id"]}}
+        for product_id in range(1, products + 1)
+    ]
+    tables[names["ISell_APPLICATION"]] = [
+        {"id": i, "fields": {"products": ["L", *rng.sample(range(1, products + 1), min(3, products))],
+                             "risk_category_id": rng.choice(risk)["id"]}}
+        for i in range(1, max(products // 2, 1) + 1)
+    ]
+
+    return tables
+
+
+class GristStandin:
+    """In-process stand-in for the Grist document API (``/records``, ``/sql`` and attachments)"""
+
+    def __init__(self, tables, doc_id="standin", attachments_dir=None, image_size=800,
+                 latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.doc_id = doc_id
+        self.attachments_dir = Path(attachments_dir) if attachments_dir else None
+        self.image_size = image_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+        self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.column_kinds = {}
+        for table_name, records in tables.items():
+            self.load_table(table_name, records)
+
+    @classmethod
+    def from_fixtures(cls, path, **kwargs):
+        """Load tables recorded by ``record_fixtures`` (``tables.json`` + ``attachments/``)"""
+        path = Path(path)
+        with open(path / "tables.json", encoding="utf-8") as f:
+            tables = json.load(f)
+        attachments_dir = path / "attachments"
+        kwargs.setdefault("attachments_dir", attachments_dir if attachments_dir.exists() else None)
+        return cls(tables, **kwargs)
+
+    # Ma'lumotlar
+
+    @staticmethod
+    def _kind(values):
+        values = [value for value in values if value is not None]
+        if values and all(isinstance(value, bool) for value in values):
+            return "bool"
+        if values and all(isinstance(value, list) and value[:1] == ["L"] for value in values):
+            return "list"
+        return "any"
+
+    def load_table(self, table_name, records):
+        columns = []
+        for record in records:
+            for key in record.get("fields", {}):
+                if key not in columns:
+                    columns.append(key)
+        kinds = {
+            column: self._kind([record.get("fields", {}).get(column) for record in records])
+            for column in columns
+        }
+        self.column_kinds[table_name] = kinds
+
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        with self._lock:
+            self.db.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            self.db.execute(f'CREATE TABLE "{table_name}" (id INTEGER PRIMARY KEY{", " + quoted if columns else ""})')
+            placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+            self.db.executemany(
+                f'INSERT INTO "{table_name}" VALUES ({placeholders})',
+                [
+                    [record.get("id"), *[self._encode(record.get("fields", {}).get(column)) for column in columns]]
+                    for record in records
+                ]
+            )
+            self.db.commit()
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, list):
+            return json.dumps(value[1:] if value[:1] == ["L"] else value)
+        if isinstance(value, dict):
+            return json.dumps(value)
+        return value
+
+    def _decode(self, table_name, column, value):
+        kind = self.column_kinds.get(table_name, {}).get(column)
+        if value is None:
+            return None
+        if kind == "bool":
+            return bool(value)
+        if kind == "list":
+            return ["L", *json.loads(value)]
+        return value
+
+    def records(self, table_name, filter=None, limit=None, sort=None):
+        if table_name not in self.column_kinds:
+            return None
+        kinds = self.column_kinds[table_name]
+        sql = f'SELECT * FROM "{table_name}"'
+        args = []
+        conditions = []
+        for column, values in (filter or {}).items():
+            if column not in kinds and column != "id":
+                return None
+            placeholders = ", ".join("?" for _ in values) or "NULL"
+            conditions.append(f'"{column}" IN ({placeholders})')
+            args.extend(self._encode(value) for value in values)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        order = []
+        for column in (sort or "id").split(","):
+            name = column.lstrip("-")
+            if name not in kinds and name != "id":
+                return None
+            order.append(f'"{name}"{" DESC" if column.startswith("-") else ""}')
+        sql += " ORDER BY " + ", ".join(order)
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            cursor = self.db.execute(sql, args)
+            names = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+        return [
+            {
+                "id": row[0],
+                "fields": {name: self._decode(table_name, name, value) for name, value in zip(names[1:], row[1:])}
+            }
+            for row in rows
+        ]
+
+    def sql(self, statement, args):
+        if not re.match(r"^\s*select\b", statement, re.IGNORECASE):
+            raise ValueError("Only SELECT statements are allowed")
+        with self._lock:
+            cursor = self.db.execute(statement, args or [])
+            names = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+        return [{"fields": dict(zip(names, row))} for row in rows]
+
+    def attachment(self, attachment_id):
+        if self.attachments_dir:
+            path = self.attachments_dir / str(attachment_id)
+            if path.exists():
+                return path.read_bytes()
+            return None
+
+        from PIL import Image
+
+        rng = random.Random(attachment_id)
+        image = Image.new("RGB", (self.image_size, self.image_size), tuple(rng.randrange(256) for _ in range(3)))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+        return buffer.getvalue()
+
+    # HTTP
+
+    def make_handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json"):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with standin._lock:
+                    standin.request_count += 1
+                    standin.bytes_sent += len(body)
+
+            def _before(self):
+                delay = standin.latency + standin.random.uniform(0, standin.jitter)
+                if delay:
+                    time.sleep(delay)
+                if standin.error_rate and standin.random.random() < standin.error_rate:
+                    self._send(503, {"error": "Injected error"})
+                    return False
+                return True
+
+            def _doc_path(self, path):
+                prefix = f"/api/docs/{standin.doc_id}/"
+                if not path.startswith(prefix):
+                    return None
+                return path[len(prefix):]
+
+            def do_GET(self):
+                if not self._before():
+                    return
+                parsed = urlparse(self.path)
+                rest = self._doc_path(parsed.path)
+                if rest is None:
+                    return self._send(404, {"error": "Document not found"})
+
+                match = re.match(r"^tables/([^/]+)/records$", rest)
+                if match:
+                    query = parse_qs(parsed.query)
+                    filter = json.loads(query["filter"][0]) if "filter" in query else None
+                    limit = query.get("limit", [None])[0]
+                    sort = query.get("sort", [None])[0]
+                    records = standin.records(match.group(1), filter=filter, limit=limit, sort=sort)
+                    if records is None:
+                        return self._send(404, {"error": f"Table not found: {match.group(1)}"})
+                    return self._send(200, {"records": records})
+
+                match = re.match(r"^attachments/(\d+)/download$", rest)
+                if match:
+                    content = standin.attachment(int(match.group(1)))
+                    if content is None:
+                        return self._send(404, {"error": "Attachment not found"})
+                    return self._send(200, content, "image/jpeg")
+
+                return self._send(404, {"error": "Not found"})
+
+            def do_POST(self):
+                if not self._before():
+                    return
+                rest = self._doc_path(urlparse(self.path).path)
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if rest != "sql":
+                    return self._send(404, {"error": "Not found"})
+                try:
+                    records = standin.sql(payload.get("sql", ""), payload.get("args"))
+                except (ValueError, sqlite3.Error) as e:
+                    return self._send(400, {"error": str(e)})
+                return self._send(200, {"statement": payload.get("sql"), "records": records})
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=0):
+        """Start serving in a daemon thread; returns the running server"""
+        server = ThreadingHTTPServer((host, port), self.make_handler())
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+    @staticmethod
+    def base_url(server):
+        host, port = server.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def record_fixtures(client, path, with_attachments=False):
+    """
+    Record every configured Grist table (and optionally attachments) from
+    a live document into ``path`` for later use with ``GristStandin``.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    tables = {}
+    for env_name in TABLE_ENV_DEFAULTS:
+        table_name = os.getenv(env_name)
+        if table_name:
+            tables[table_name] = client.fetch_table(table_name)
+
+    with open(path / "tables.json", "w", encoding="utf-8") as f:
+        json.dump(tables, f, ensure_ascii=False)
+
+    attachments = 0
+    if with_attachments:
+        attachments_dir = path / "attachments"
+        attachments_dir.mkdir(exist_ok=True)
+        attachment_ids = set()
+        for records in tables.values():
+            for record in records:
+                picture = record.get("fields", {}).get("picture")
+                if isinstance(picture, list) and picture[:1] == ["L"]:
+                    attachment_ids.update(picture[1:])
+        for attachment_id in attachment_ids:
+            (attachments_dir / str(attachment_id)).write_bytes(client.download_attachment(attachment_id))
+            attachments += 1
+
+    return {"tables": {name: len(records) for name, records in tables.items()}, "attachments": attachments}
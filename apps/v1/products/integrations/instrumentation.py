@@ -0,0 +1,148 @@
+import functools
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+from django.db import connection
+
+from apps.v1.products.integrations.fingerprints import StageFingerprint
+from apps.v1.products.integrations.grist_client import get_grist_client
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc importni sezilarli sekinlashtiradi - yoqish uchun ISell_IMPORT_TRACE_MEMORY=1
+TRACE_MEMORY = os.getenv('ISell_IMPORT_TRACE_MEMORY', '0') in ('1', 'true', 'True')
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_starts = 0
+_tracing_owned = False
+
+
+def _start_tracing():
+    """(boshlang'ich xotira, start raqami, boshqa bosqich allaqachon o'lchanayotganmi)"""
+    global _tracing_users, _tracing_starts, _tracing_owned
+    with _tracing_lock:
+        shared = _tracing_users > 0
+        if not shared:
+            _tracing_owned = not tracemalloc.is_tracing()
+            if _tracing_owned:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+        _tracing_users += 1
+        _tracing_starts += 1
+        return tracemalloc.get_traced_memory()[0], _tracing_starts, shared
+
+
+def _stop_tracing(start_number):
+    """(eng yuqori xotira, bosqich davomida boshqa bosqich ham o'lchanganmi)"""
+    global _tracing_users
+    with _tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        shared = _tracing_starts != start_number
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+        return peak, shared
+
+
+class ImportMetrics:
+    """Bitta import bosqichining o'lchovlari: vaqt, Grist HTTP, SQL, qatorlar va (ixtiyoriy) xotira"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.wall_seconds = 0.0
+        self.http = {"seconds": 0.0, "requests": 0, "bytes": 0}
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self._memory_start = None
+        self._memory_peak = None
+
+    def _execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_queries += 1
+            self.sql_seconds += time.perf_counter() - started
+
+    def __enter__(self):
+        self._grist = get_grist_client()
+        self._grist_stats = self._grist.stats()
+        if TRACE_MEMORY:
+            self._memory_start, self._tracing_start, self._memory_shared = _start_tracing()
+        self._sql_wrapper = connection.execute_wrapper(self._execute)
+        self._sql_wrapper.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall_seconds = time.perf_counter() - self._started
+        self._sql_wrapper.__exit__(exc_type, exc, tb)
+        if TRACE_MEMORY:
+            # tracemalloc cho'qqisi butun jarayonniki - parallel bosqichlarda bu bosqichga tegishli emas
+            peak, shared = _stop_tracing(self._tracing_start)
+            if not (shared or self._memory_shared):
+                self._memory_peak = peak
+        self.http = self._grist.stats_since(self._grist_stats)
+        return False
+
+    def summary(self, result=None):
+        rows = result_rows(result)
+        metrics = {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "http_seconds": self.http["seconds"],
+            "http_requests": self.http["requests"],
+            "http_bytes": self.http["bytes"],
+            "sql_queries": self.sql_queries,
+            "sql_seconds": round(self.sql_seconds, 3),
+            "rows": rows,
+            "rows_per_second": round(rows / self.wall_seconds, 1) if self.wall_seconds else None,
+        }
+        if self._memory_peak is not None:
+            metrics["memory_peak_mb"] = round(max(self._memory_peak - self._memory_start, 0) / (1024 * 1024), 2)
+        return metrics
+
+
+def result_rows(result):
+    """Bosqich hajmi: Grist'dan o'qilgan qatorlar (fingerprint), bo'lmasa qayta ishlanganlar soni"""
+    if not isinstance(result, dict):
+        return 0
+    fingerprint = result.get("fingerprint")
+    if isinstance(fingerprint, dict) and fingerprint.get("rows"):
+        return fingerprint["rows"]
+    for key in ("total_processed", "total"):
+        if isinstance(result.get(key), int):
+            return result[key]
+    return 0
+
+
+def instrumented(stage):
+    """Import bosqichi dekoratori: func(fingerprint) natijasiga fingerprint, grist va metrics qo'shiladi"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(force=False):
+            metrics = ImportMetrics(stage)
+            fingerprint = StageFingerprint(stage, force=force)
+            result = None
+            try:
+                with metrics:
+                    result = func(fingerprint)
+            finally:
+                success = isinstance(result, dict) and result.get("success", "error" not in result)
+                if success:
+                    result["fingerprint"] = fingerprint.summary(unchanged=bool(result.get("unchanged_table")))
+                    result["grist"] = metrics.http
+                summary = metrics.summary(result)
+                logger.info(
+                    f"{stage}: import stage finished in {summary['wall_seconds']}s",
+                    extra={"stage": stage, "success": bool(success), "metrics": summary},
+                )
+            if isinstance(result, dict):
+                result["metrics"] = summary
+            return result
+        return wrapper
+    return decorator
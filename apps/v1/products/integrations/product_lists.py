@@ -1,33 +1,22 @@
-import requests
+import hashlib
+import json
+import logging
 import os
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from django.core.files.base import ContentFile
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.core.files import File
 from django.db import transaction
+from django.utils import timezone
 
 from apps.v1.products.models import Categories, Products, ProductIDs, ProductDetails, ProductProperties, ProductCharacteristics, ProductImages
+from apps.v1.products.integrations.grist_client import get_grist_client, GristAPIError
+from apps.v1.products.integrations.fingerprints import unchanged_result
+from apps.v1.products.integrations.instrumentation import instrumented
+from apps.v1.products.services.image_variants import generate_variants
 
-# Django settings dan BASE_DIR ni olish
-try:
-    from django.conf import settings
-    BASE_DIR = settings.BASE_DIR
-except:
-    BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent.parent
-
-try:
-    from dotenv import load_dotenv
-    env_path = BASE_DIR / '.env'
-    if env_path.exists():
-        load_dotenv(dotenv_path=env_path, override=True)
-    else:
-        load_dotenv(override=True)
-except ImportError:
-    load_dotenv = None
-except Exception:
-    pass
-
-API_KEY = os.getenv('ISell_API_KEY')
-DOC_ID = os.getenv('ISell_DOC_ID')
+logger = logging.getLogger(__name__)
 
 ISell_PRODUCT_VARIATIONS_TABLE_NAME = os.getenv('ISell_PRODUCT_VARIATIONS')
 Isell_PRODUCT_PRICE = os.getenv('ISell_PRODUCT_PRICE')
@@ -36,21 +25,63 @@ ISell_PROPERTY = os.getenv('ISell_PROPERTY')
 ISell_PROPERTY_VALUE = os.getenv('ISell_PROPERTY_VALUE')
 ISell_PRODUCT_PROPERTY_VALUE = os.getenv('ISell_PRODUCT_PROPERTY_VALUE')
 
-def get_url(table_name):
-    return f"https://isell.getgrist.com/api/docs/{DOC_ID}/tables/{table_name}/records"
+# Har bir bosqich o'qiydigan ustunlar (Grist'dan faqat shular olinadi)
+PRODUCT_PRICE_COLUMNS = ["actual", "product_name", "product_id", "variation_name", "variation_id", "category_name", "price"]
+VARIATION_COLUMNS = ["fully_defined", "name", "product_name", "used", "color", "storage", "sim"]
+VARIATION_IMAGE_COLUMNS = ["fully_defined", "name", "product_name", "picture"]
+PROPERTY_COLUMNS = ["name", "type"]
+PRODUCT_PROPERTY_VALUE_COLUMNS = ["product_name", "variation_id", "value_id", "property_id"]
+PROPERTY_VALUE_COLUMNS = ["property_id", "value"]
 
-headers = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Accept": "application/json"
-}
+# /sql orqali o'qilganda qayta tiklanadigan ustun turlari (Bool 0/1, Attachments JSON)
+PRODUCT_PRICE_TYPES = {"actual": "Bool"}
+VARIATION_TYPES = {"fully_defined": "Bool", "used": "Bool", "picture": "Attachments"}
 
+# bulk_create/bulk_update uchun bitta tranzaksiyadagi yozuvlar soni
+BULK_BATCH_SIZE = 500
 
-def get_all_actual_true_products(response):
-    actual_products = []
-    for product in response.get("records", []):
+# Rasm yuklash: parallel workerlar, bir vaqtda navbatdagi attachmentlar soni
+# va har bir worker xotirada ushlaydigan maksimal hajm (undan kattasi diskka yoziladi)
+IMAGE_DOWNLOAD_WORKERS = int(os.getenv('ISell_IMAGE_DOWNLOAD_WORKERS', 10))
+IMAGE_DOWNLOAD_WINDOW = int(os.getenv('ISell_IMAGE_DOWNLOAD_WINDOW', IMAGE_DOWNLOAD_WORKERS * 2))
+IMAGE_CHUNK_SIZE = 64 * 1024
+IMAGE_SPOOL_MAX_SIZE = 1024 * 1024
+
+# Grist jadvali bir marta o'qilib shu vaqtinchalik faylga yoziladi (undan kattasi diskka tushadi)
+RECORD_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def spool_records(records):
+    """Grist yozuvlarini JSON qatorlar ko'rinishida SpooledTemporaryFile ga yozish"""
+    spool = tempfile.SpooledTemporaryFile(max_size=RECORD_SPOOL_MAX_SIZE, mode="w+", encoding="utf-8")
+    try:
+        for record in records:
+            spool.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str))
+            spool.write("\n")
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+def iter_spooled(spool, product_names=None):
+    """spool_records yozuvlarini qayta o'qish (product_names berilsa faqat shu productlarniki)"""
+    spool.seek(0)
+    for line in spool:
+        record = json.loads(line)
+        if product_names is None or record_product_name(record) in product_names:
+            yield record
+
+
+def record_product_name(record):
+    return record.get("fields", {}).get("product_name")
+
+
+def get_all_actual_true_products(records):
+    """Faqat actual=True yozuvlarni oqim (generator) ko'rinishida qaytarish"""
+    for product in records:
         if product.get("fields", {}).get("actual") == True:
-            actual_products.append(product.get("fields"))
-    return actual_products
+            yield product.get("fields")
 
 
 def process_products(products_data):
@@ -69,9 +100,7 @@ def process_products(products_data):
                 "used_products": []
             }
         
-        if "NEW" in variation_name.upper():
-            grouped_products[product_name]["new_products"].append(product_data)
-        elif "B/U" in variation_name.upper():
+        if is_used_variation(variation_name):
             grouped_products[product_name]["used_products"].append(product_data)
         else:
             grouped_products[product_name]["new_products"].append(product_data)
@@ -79,151 +108,323 @@ def process_products(products_data):
     return grouped_products
 
 
-def save_products_to_db(grouped_products):
+def iter_product_batches(products_data, batch_size=BULK_BATCH_SIZE):
+    """product_name bo'yicha tartiblangan qatorlarni batch_size tadan productli bo'laklarga ajratish"""
+    batch = []
+    names = set()
+    for product_data in products_data:
+        product_name = product_data.get("product_name")
+        if product_name not in names and len(names) >= batch_size:
+            yield process_products(batch)
+            batch = []
+            names = set()
+        names.add(product_name)
+        batch.append(product_data)
+    if batch:
+        yield process_products(batch)
+
+
+def save_products_to_db(grouped_products, seen_product_ids=None, changed_product_ids=None, indexes=None):
+    """Narx jadvalidan kelgan productlarni bulk upsert qilish (seen/changed ID lar to'plamlarga yoziladi)"""
     created_count = 0
+    updated_count = 0
     skipped_count = 0
-    product_ids_saved = 0
+    
+    if indexes is None:
+        indexes = load_product_indexes()
+    categories = indexes["categories"]
+    new_products_by_key = indexes["new_products_by_key"]
+    used_products_by_variation = indexes["used_products_by_variation"]
+    existing_product_ids = indexes["product_id_keys"]
+    
+    # 1. Yetishmayotgan kategoriyalar
+    category_names = {
+        row.get("category_name")
+        for groups in grouped_products.values()
+        for rows in groups.values()
+        for row in rows
+        if row.get("category_name")
+    }
+    missing_categories = [Categories(name=name) for name in category_names if name not in categories]
+    if missing_categories:
+        with transaction.atomic():
+            Categories.objects.bulk_create(missing_categories, batch_size=BULK_BATCH_SIZE)
+        for category in missing_categories:
+            categories[category.name] = category
+    
+    # 2. Productlar va ProductIDs rejasini xotirada tuzish
+    products_to_create = []
+    products_to_update = {}
+    pending_product_ids = []
+    # Import qatorlariga mos kelgan (yaratilgan yoki topilgan) productlar
+    seen_products = []
+    
+    def apply_row(product, product_name, row, category):
+        seen_products.append(product)
+        if product.pk is None:
+            # Shu importda yaratilayotgan product - faqat qiymatlarni yangilaymiz
+            update_product_fields(product, product_name, category, row)
+            return "pending"
+        if update_product_fields(product, product_name, category, row):
+            products_to_update[product.pk] = product
+            return "updated"
+        return "skipped"
     
     for product_name, product_groups in grouped_products.items():
         if product_groups["new_products"]:
             first_product = product_groups["new_products"][0]
+            category = categories.get(first_product.get("category_name"))
             
-            try:
-                category_name = first_product.get("category_name")
-                category = None
-                if category_name:
-                    category, _ = Categories.objects.get_or_create(
-                        name=category_name
-                    )
-                
-                if not category:
-                    skipped_count += 1
-                    continue
-                
-                existing_product = Products.objects.filter(
-                    name=product_name,
-                    category=category
-                ).first()
-                
-                if not existing_product:
-                    new_product = Products.objects.create(
-                        name=product_name,
-                        category=category,
-                        price=first_product.get("price"),
-                        grist_product_id=first_product.get("product_id"),
-                        actual=True
-                    )
+            if not category:
+                skipped_count += 1
+            else:
+                key = (product_name, category.id)
+                product = new_products_by_key.get(key)
+                if product is None:
+                    product = build_product(product_name, category, first_product)
+                    new_products_by_key[key] = product
+                    products_to_create.append(product)
+                    seen_products.append(product)
                     created_count += 1
-                    
-                    for product_data in product_groups["new_products"]:
-                        var_name = product_data.get("variation_name")
-                        var_id = product_data.get("variation_id")
-                        if var_name:
-                            ProductIDs.objects.get_or_create(
-                                product=new_product,
-                                variation_name=var_name,
-                                variation_id=var_id
-                            )
-                            product_ids_saved += 1
                 else:
-                    for product_data in product_groups["new_products"]:
-                        var_name = product_data.get("variation_name")
-                        var_id = product_data.get("variation_id")
-                        if var_name:
-                            ProductIDs.objects.get_or_create(
-                                product=existing_product,
-                                variation_name=var_name,
-                                variation_id=var_id
-                            )
-                            product_ids_saved += 1
-                    skipped_count += 1
-                    
-            except Exception as e:
-                skipped_count += 1
+                    outcome = apply_row(product, product_name, first_product, category)
+                    if outcome == "updated":
+                        updated_count += 1
+                    elif outcome == "skipped":
+                        skipped_count += 1
+                
+                for product_data in product_groups["new_products"]:
+                    var_name = product_data.get("variation_name")
+                    if var_name:
+                        pending_product_ids.append((product, var_name, to_grist_id(product_data.get("variation_id"))))
         
         for product_data in product_groups["used_products"]:
-            try:
-                category_name = product_data.get("category_name")
-                category = None
-                if category_name:
-                    category, _ = Categories.objects.get_or_create(
-                        name=category_name
-                    )
-                
-                if not category:
-                    skipped_count += 1
-                    continue
-                
-                bu_product = Products.objects.create(
-                    name=product_name,
-                    category=category,
-                    price=product_data.get("price"),
-                    grist_product_id=product_data.get("product_id"),
-                    actual=True
-                )
-                created_count += 1
-                
-                var_name = product_data.get("variation_name")
-                var_id = product_data.get("variation_id")
-                if var_name:
-                    ProductIDs.objects.get_or_create(
-                        product=bu_product,
-                        variation_name=var_name,
-                        variation_id=var_id
-                    )
-                    product_ids_saved += 1
-                    
-            except Exception as e:
+            category = categories.get(product_data.get("category_name"))
+            if not category:
                 skipped_count += 1
+                continue
+            
+            var_name = product_data.get("variation_name")
+            var_id = to_grist_id(product_data.get("variation_id"))
+            variation_key = var_id or var_name
+            
+            product = used_products_by_variation.get(variation_key) if variation_key else None
+            if product is None:
+                product = build_product(product_name, category, product_data)
+                products_to_create.append(product)
+                seen_products.append(product)
+                created_count += 1
+                if variation_key:
+                    used_products_by_variation[variation_key] = product
+            else:
+                outcome = apply_row(product, product_name, product_data, category)
+                if outcome == "updated":
+                    updated_count += 1
+                elif outcome == "skipped":
+                    skipped_count += 1
+            
+            if var_name:
+                pending_product_ids.append((product, var_name, var_id))
+    
+    # 3. O'zgarishlarni bo'laklab yozish
+    for chunk in chunked(products_to_create):
+        with transaction.atomic():
+            Products.objects.bulk_create(chunk)
+    
+    now = timezone.now()
+    for product in products_to_update.values():
+        product.updated_at = now
+    for chunk in chunked(list(products_to_update.values())):
+        with transaction.atomic():
+            Products.objects.bulk_update(
+                chunk, ["name", "category", "price", "grist_product_id", "actual", "updated_at"]
+            )
+    
+    product_ids_to_create = []
+    for product, var_name, var_id in pending_product_ids:
+        key = (product.pk, var_name, var_id)
+        if key in existing_product_ids:
+            continue
+        existing_product_ids.add(key)
+        product_ids_to_create.append(ProductIDs(product=product, variation_name=var_name, variation_id=var_id))
+    
+    for chunk in chunked(product_ids_to_create):
+        with transaction.atomic():
+            ProductIDs.objects.bulk_create(chunk, ignore_conflicts=True)
+    
+    if seen_product_ids is not None:
+        seen_product_ids.update(product.pk for product in seen_products)
+    if changed_product_ids is not None:
+        changed_product_ids.update(product.pk for product in products_to_create)
+        changed_product_ids.update(products_to_update)
     
-    return created_count, skipped_count, product_ids_saved
+    return created_count, updated_count, skipped_count, len(product_ids_to_create)
+
+
+def deactivate_unseen_products(seen_product_ids, product_names=None, changed_product_ids=None):
+    """Import qatorlarida topilmagan productlarni actual=False qilish (product_names - tekshiriladigan doira)"""
+    products = Products.objects.filter(actual=True)
+    if product_names is not None:
+        products = products.filter(name__in=product_names)
+    products = products.exclude(pk__in=seen_product_ids)
+    if changed_product_ids is None:
+        return products.update(actual=False, updated_at=timezone.now())
+    product_ids = list(products.values_list('pk', flat=True))
+    changed_product_ids.update(product_ids)
+    for chunk in chunked(product_ids):
+        Products.objects.filter(pk__in=chunk).update(actual=False, updated_at=timezone.now())
+    return len(product_ids)
 
 
-def get_product_variations():
+def is_used_variation(variation_name):
+    """B/U (ishlatilgan) variationmi - NEW bo'lmagan va B/U belgisi bor"""
+    variation_name = (variation_name or "").upper()
+    return "NEW" not in variation_name and "B/U" in variation_name
+
+
+def to_price(value):
+    if value in (None, ""):
+        return None
     try:
-        url = get_url(ISell_PRODUCT_VARIATIONS_TABLE_NAME)
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
-            return None
-        
-        variations = []
-        for record in response.json().get("records", []):
-            fields = record.get("fields", {})
-            if fields.get("fully_defined") == True:
-                variations.append(fields)
-        
-        return variations
-        
-    except Exception as e:
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
         return None
 
 
-def get_product_variations_for_images():
-    """Rasmlar uchun variations olish (ID va fields bilan)"""
-    try:
-        url = get_url(ISell_PRODUCT_VARIATIONS_TABLE_NAME)
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
-            return None
-        
-        variations = []
-        for record in response.json().get("records", []):
-            fields = record.get("fields", {})
-            if fields.get("fully_defined") == True:
-                # ID ni fields ichiga qo'shamiz
-                fields['variation_record_id'] = record.get("id")
-                variations.append(fields)
-        
-        return variations
-        
-    except Exception as e:
+def to_grist_id(value):
+    if value in (None, ""):
         return None
+    return str(value)
+
 
+def chunked(items, size=BULK_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
-def process_variations_by_product(variations):
+
+def build_product(product_name, category, product_data):
+    return Products(
+        name=product_name,
+        category=category,
+        price=to_price(product_data.get("price")),
+        grist_product_id=to_grist_id(product_data.get("product_id")),
+        actual=True
+    )
+
+
+def update_product_fields(product, product_name, category, product_data):
+    """Grist qatoridagi qiymatlarni productga yozish; o'zgarish bo'lsa True"""
+    values = {
+        "name": product_name,
+        "category_id": category.id,
+        "price": to_price(product_data.get("price")),
+        "grist_product_id": to_grist_id(product_data.get("product_id")),
+        "actual": True,
+    }
+    changed = False
+    for field, value in values.items():
+        if getattr(product, field) != value:
+            setattr(product, field, value)
+            changed = True
+    return changed
+
+
+def load_product_indexes():
+    """Mavjud kategoriyalar, productlar va ProductIDs ni bir necha so'rov bilan xotiraga yuklash"""
+    categories = {}
+    for category in Categories.objects.order_by("id"):
+        if category.name:
+            categories.setdefault(category.name, category)
+    
+    products = {
+        product.pk: product
+        for product in Products.objects.only(
+            "id", "name", "category_id", "price", "grist_product_id", "actual"
+        ).order_by("id")
+    }
+    
+    used_product_ids = set()
+    used_products_by_variation = {}
+    product_id_keys = set()
+    for product_id, variation_name, variation_id in ProductIDs.objects.order_by("id").values_list(
+        "product_id", "variation_name", "variation_id"
+    ):
+        product_id_keys.add((product_id, variation_name, variation_id))
+        if is_used_variation(variation_name):
+            used_product_ids.add(product_id)
+            variation_key = variation_id or variation_name
+            if variation_key and product_id in products:
+                used_products_by_variation.setdefault(variation_key, products[product_id])
+    
+    new_products_by_key = {}
+    for product in products.values():
+        if product.pk not in used_product_ids:
+            new_products_by_key.setdefault((product.name, product.category_id), product)
+    
+    return {
+        "categories": categories,
+        "new_products_by_key": new_products_by_key,
+        "used_products_by_variation": used_products_by_variation,
+        "product_id_keys": product_id_keys,
+    }
+
+
+def get_variation_records(columns):
+    """fully_defined variations yozuvlarini sahifalab olish"""
+    return get_grist_client().iter_table(
+        ISell_PRODUCT_VARIATIONS_TABLE_NAME,
+        filter={"fully_defined": [True]},
+        columns=columns,
+        column_types=VARIATION_TYPES
+    )
+
+
+def variation_fields(records):
+    """fully_defined variation yozuvlarining fields i"""
+    for record in records:
+        fields = record.get("fields", {})
+        if fields.get("fully_defined") == True:
+            yield fields
+
+
+def variation_image_fields(records):
+    """Rasmlar uchun variation fields (variation_record_id bilan)"""
+    for record in records:
+        fields = record.get("fields", {})
+        if fields.get("fully_defined") == True:
+            # ID ni fields ichiga qo'shamiz
+            fields['variation_record_id'] = record.get("id")
+            yield fields
+
+
+def product_id_rows(product_names=None):
+    rows = ProductIDs.objects.select_related('product').order_by('id')
+    if product_names is not None:
+        rows = rows.filter(product__name__in=product_names)
+    return rows
+
+
+def load_variation_products(product_names=None):
+    """ProductIDs ni productlari bilan bitta so'rovda yuklash: (variation_name, product_name) -> product"""
+    variation_products = {}
+    for product_id_obj in product_id_rows(product_names):
+        key = (product_id_obj.variation_name, product_id_obj.product.name)
+        variation_products.setdefault(key, product_id_obj.product)
+    return variation_products
+
+
+def load_products_by_variation_id(product_names=None):
+    """ProductIDs ni productlari bilan bitta so'rovda yuklash: (product_name, variation_id) -> product"""
+    variation_products = {}
+    for product_id_obj in product_id_rows(product_names):
+        key = (product_id_obj.product.name, product_id_obj.variation_id)
+        variation_products.setdefault(key, product_id_obj.product)
+    return variation_products
+
+
+def process_variations_by_product(variations, product_names=None):
     variations_by_product = {}
+    variation_products = load_variation_products(product_names)
     
     for variation in variations:
         variation_name = variation.get("name")
@@ -233,202 +434,279 @@ def process_variations_by_product(variations):
         if not variation_name:
             continue
         
-        try:
-            product_id_obj = ProductIDs.objects.filter(
-                variation_name=variation_name,
-                product__name=product_name
-            ).first()
-            
-            if not product_id_obj:
-                continue
-            
-            product = product_id_obj.product
-            product_key = f"{product.id}_{'bu' if used else 'new'}"
-            
-            if product_key not in variations_by_product:
-                variations_by_product[product_key] = {
-                    "product": product,
-                    "used": used,
-                    "variations": []
-                }
-            
-            variations_by_product[product_key]["variations"].append(variation)
-            
-        except Exception as e:
+        product = variation_products.get((variation_name, product_name))
+        if not product:
             continue
+        
+        product_key = f"{product.id}_{'bu' if used else 'new'}"
+        
+        if product_key not in variations_by_product:
+            variations_by_product[product_key] = {
+                "product": product,
+                "used": used,
+                "variations": []
+            }
+        
+        variations_by_product[product_key]["variations"].append(variation)
     
     return variations_by_product
 
 
-def save_product_details(variations_by_product):
-    details_created = 0
-    details_skipped = 0
-    
-    for product_key, data in variations_by_product.items():
+def save_product_details(variations_by_product, changed_product_ids=None):
+    """Variationlardagi color/storage/sim kombinatsiyalarini ProductDetails ga bulk saqlash"""
+    wanted = {}
+    for data in variations_by_product.values():
         product = data["product"]
-        used = data["used"]
-        variations = data["variations"]
-        
-        try:
-            if used == False:
-                unique_combinations = {}
-                
-                for variation in variations:
-                    color = variation.get("color", "")
-                    storage = variation.get("storage", "")
-                    sim = variation.get("sim", "")
-                    
-                    key = f"{color}_{storage}_{sim}"
-                    
-                    if key not in unique_combinations:
-                        unique_combinations[key] = variation
-                
-                for variation in unique_combinations.values():
-                    color = variation.get("color")
-                    storage = variation.get("storage")
-                    sim = variation.get("sim")
-                    
-                    try:
-                        detail, created = ProductDetails.objects.get_or_create(
-                            product=product,
-                            color=color,
-                            storage=storage,
-                            sim_card=sim
-                        )
-                        
-                        if created:
-                            details_created += 1
-                        else:
-                            details_skipped += 1
-                    except Exception as e:
-                        pass
-                        
-            elif used == True:
-                for variation in variations:
-                    color = variation.get("color")
-                    storage = variation.get("storage")
-                    sim = variation.get("sim")
-                    
-                    detail, created = ProductDetails.objects.get_or_create(
-                        product=product,
-                        color=color,
-                        storage=storage,
-                        sim_card=sim
-                    )
-                    
-                    if created:
-                        details_created += 1
-                    else:
-                        details_skipped += 1
-                    
-        except Exception as e:
-            details_skipped += len(variations)
+        for variation in data["variations"]:
+            key = (product.id, variation.get("color"), variation.get("storage"), variation.get("sim"))
+            wanted.setdefault(key, product)
+    
+    product_ids = {key[0] for key in wanted}
+    existing = set(
+        ProductDetails.objects.filter(product_id__in=product_ids).values_list(
+            'product_id', 'color', 'storage', 'sim_card'
+        )
+    )
+    
+    details_to_create = [
+        ProductDetails(product=product, color=color, storage=storage, sim_card=sim)
+        for (product_id, color, storage, sim), product in wanted.items()
+        if (product_id, color, storage, sim) not in existing
+    ]
     
+    for chunk in chunked(details_to_create):
+        with transaction.atomic():
+            ProductDetails.objects.bulk_create(chunk, ignore_conflicts=True)
+    if changed_product_ids is not None:
+        changed_product_ids.update(detail.product_id for detail in details_to_create)
+    
+    details_created = len(details_to_create)
+    details_skipped = len(wanted) - details_created
     return details_created, details_skipped
 
 
-def get_products():
-    print("[PRODUCT_LISTS] Starting products import...")
+def get_price_records(grist):
+    """Narx jadvalining actual qatorlari product_name bo'yicha tartiblangan sahifalarda"""
+    return grist.iter_table(
+        Isell_PRODUCT_PRICE,
+        filter={"actual": [True]},
+        columns=PRODUCT_PRICE_COLUMNS,
+        column_types=PRODUCT_PRICE_TYPES,
+        order_by=["product_name"]
+    )
+
+
+@instrumented("products")
+def get_products(fingerprint):
+    """
+    Narx jadvalini import qilish: jadval bir marta o'qiladi (spool_records), o'zgarmagan
+    bo'lsa ORM ishisiz chiqiladi, aks holda faqat qatorlari o'zgargan productlar yoziladi.
+    """
+    logger.info("Starting products import...")
+    grist = get_grist_client()
     try:
-        url = get_url(Isell_PRODUCT_PRICE)
-        print(f"[PRODUCT_LISTS] API URL: {url}")
-        response = requests.get(url, headers=headers)
-        print(f"[PRODUCT_LISTS] API Response Status: {response.status_code}")
-        
-        if response.status_code != 200:
-            print(f"[PRODUCT_LISTS] ERROR: API returned status {response.status_code}")
-            return {
-                "success": False,
-                "message": f"API Error: {response.status_code}"
-            }
-        
-        actual_products = get_all_actual_true_products(response.json())
-        print(f"[PRODUCT_LISTS] Total actual products found: {len(actual_products)}")
-        
-        if not actual_products:
-            print("[PRODUCT_LISTS] WARNING: No actual products found")
+        try:
+            spool = spool_records(fingerprint.track(
+                Isell_PRODUCT_PRICE, get_price_records(grist), group_by=record_product_name
+            ))
+        except GristAPIError as e:
+            logger.error(f"API returned status {e.status_code}")
             return {
                 "success": False,
-                "message": "Актуальные продукты не найдены"
+                "message": f"API Error: {e.status_code}"
             }
         
-        grouped_products = process_products(actual_products)
-        print(f"[PRODUCT_LISTS] Products grouped into {len(grouped_products)} unique products")
-        
-        created_count, skipped_count, product_ids_saved = save_products_to_db(grouped_products)
-        print(f"[PRODUCT_LISTS] Import completed! Created: {created_count}, Skipped: {skipped_count}, Product IDs saved: {product_ids_saved}")
+        with spool:
+            if not fingerprint.row_count:
+                logger.warning("No actual products found")
+                return {
+                    "success": False,
+                    "message": "Актуальные продукты не найдены"
+                }
+            if fingerprint.unchanged():
+                return unchanged_result(fingerprint)
+            
+            # None - barcha productlar (birinchi yoki majburiy import)
+            product_names = fingerprint.changed_groups()
+            seen_product_ids = set()
+            changed_product_ids = set()
+            totals = [0, 0, 0, 0]
+            product_count = 0
+            indexes = load_product_indexes()
+            records = iter_spooled(spool, product_names)
+            for grouped_products in iter_product_batches(get_all_actual_true_products(records)):
+                product_count += len(grouped_products)
+                counts = save_products_to_db(grouped_products, seen_product_ids, changed_product_ids, indexes)
+                totals = [total + count for total, count in zip(totals, counts)]
+        logger.info(f"Changed products: {product_count}")
+        
+        created_count, updated_count, skipped_count, product_ids_saved = totals
+        deactivated_count = deactivate_unseen_products(
+            seen_product_ids,
+            product_names=sorted(product_names) if product_names is not None else None,
+            changed_product_ids=changed_product_ids
+        )
+        fingerprint.save()
+        logger.info(
+            f"Import completed! Created: {created_count}, Updated: {updated_count}, Skipped: {skipped_count}, "
+            f"Deactivated: {deactivated_count}, Product IDs saved: {product_ids_saved}"
+        )
         
         return {
             "success": True,
             "message": "Продукты импортированы успешно",
             "created": created_count,
+            "updated": updated_count,
             "skipped": skipped_count,
+            "deactivated": deactivated_count,
             "product_ids_saved": product_ids_saved,
-            "total_processed": created_count + skipped_count
+            "changed_product_ids": sorted(changed_product_ids),
+            "total_processed": created_count + updated_count + skipped_count
         }
         
     except Exception as e:
-        print(f"[PRODUCT_LISTS] ERROR: {str(e)}")
+        logger.exception(f"Products import failed: {e}")
         return {
             "success": False,
             "message": f"Error: {str(e)}"
         }
 
 
-def import_product_details():
-    print("[PRODUCT_LISTS] Starting product details import...")
+@instrumented("details")
+def import_product_details(fingerprint):
+    logger.info("Starting product details import...")
     try:
-        variations = get_product_variations()
-        print(f"[PRODUCT_LISTS] Total variations retrieved: {len(variations) if variations else 0}")
-        
-        if not variations:
-            print("[PRODUCT_LISTS] WARNING: No variations found")
-            return {
-                "success": False,
-                "message": "Вариации не найдены"
-            }
-        
-        variations_by_product = process_variations_by_product(variations)
-        print(f"[PRODUCT_LISTS] Variations grouped by {len(variations_by_product)} products")
+        with spool_records(fingerprint.track(
+            ISell_PRODUCT_VARIATIONS_TABLE_NAME, get_variation_records(VARIATION_COLUMNS), group_by=record_product_name
+        )) as spool:
+            if not fingerprint.row_count:
+                logger.warning("No variations found")
+                return {
+                    "success": False,
+                    "message": "Вариации не найдены"
+                }
+            if fingerprint.unchanged():
+                return unchanged_result(fingerprint)
+            
+            product_names = fingerprint.changed_groups()
+            variations_by_product = process_variations_by_product(
+                variation_fields(iter_spooled(spool, product_names)), product_names
+            )
+        logger.info(f"Variations grouped by {len(variations_by_product)} products")
         
-        details_created, details_skipped = save_product_details(variations_by_product)
-        print(f"[PRODUCT_LISTS] Details import completed! Created: {details_created}, Skipped: {details_skipped}")
+        changed_product_ids = set()
+        details_created, details_skipped = save_product_details(variations_by_product, changed_product_ids)
+        fingerprint.save()
+        logger.info(f"Details import completed! Created: {details_created}, Skipped: {details_skipped}")
         
         return {
             "success": True,
             "message": "Детали продуктов импортированы успешно",
             "details_created": details_created,
             "details_skipped": details_skipped,
+            "changed_product_ids": sorted(changed_product_ids),
             "total_processed": details_created + details_skipped
         }
         
     except Exception as e:
-        print(f"[PRODUCT_LISTS] ERROR in import_product_details: {str(e)}")
+        logger.exception(f"import_product_details failed: {e}")
         return {
             "success": False,
             "message": f"Error: {str(e)}"
         }
 
 
-def get_product_properties_from_grist():
-    """Grist'dan Product_properties table ma'lumotlarini olish"""
+def apply_price_rows(records):
+    """Grist webhook: o'zgargan narx qatorlari productlarining barcha narx qatorlarini qayta qo'llash"""
+    variation_ids = sorted({
+        to_grist_id(record.get("fields", {}).get("variation_id")) for record in records
+    } - {None})
+    product_names = {record.get("fields", {}).get("product_name") for record in records}
+    for ids in chunked(variation_ids):
+        product_names.update(
+            ProductIDs.objects.filter(variation_id__in=ids).values_list("product__name", flat=True)
+        )
+    product_names = sorted(product_names - {None, ""})
+    
+    grist = get_grist_client()
+    price_rows = {}
+    for names in chunked(product_names):
+        for record in grist.iter_table(
+            Isell_PRODUCT_PRICE, filter={"product_name": names},
+            columns=PRODUCT_PRICE_COLUMNS, column_types=PRODUCT_PRICE_TYPES
+        ):
+            price_rows[record["id"]] = record
+    for record in records:
+        price_rows[record["id"]] = record
+    
+    # Jadval tartibi (id) - to'liq importdagi "birinchi qator" bilan bir xil
+    rows = list(get_all_actual_true_products(price_rows[row_id] for row_id in sorted(price_rows)))
+    seen_product_ids = set()
+    changed_product_ids = set()
+    created_count = updated_count = skipped_count = product_ids_saved = 0
+    if rows:
+        created_count, updated_count, skipped_count, product_ids_saved = save_products_to_db(
+            process_products(rows), seen_product_ids, changed_product_ids
+        )
+    deactivated_count = deactivate_unseen_products(seen_product_ids, product_names, changed_product_ids)
+    
+    return {
+        "created": created_count,
+        "updated": updated_count,
+        "skipped": skipped_count,
+        "deactivated": deactivated_count,
+        "product_ids_saved": product_ids_saved,
+        "products": len(product_names),
+        "changed_product_ids": sorted(changed_product_ids),
+    }
+
+
+def apply_variation_rows(records):
+    """Grist webhook orqali kelgan variation qatorlaridan ProductDetails ni to'ldirish"""
+    variations = [
+        record.get("fields", {}) for record in records
+        if record.get("fields", {}).get("fully_defined") == True
+    ]
+    details_created = details_skipped = 0
+    changed_product_ids = set()
+    if variations:
+        details_created, details_skipped = save_product_details(
+            process_variations_by_product(variations), changed_product_ids
+        )
+    
+    return {
+        "created": details_created,
+        "skipped": details_skipped,
+        "ignored": len(records) - len(variations),
+        "changed_product_ids": sorted(changed_product_ids),
+    }
+
+
+def get_product_properties_from_grist(fingerprint=None):
+    """Grist'dan Product_properties table ma'lumotlarini olish (Grist xatosida None)"""
     try:
-        url = get_url(ISell_PROPERTY)
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
-            return None
+        records = get_grist_client().iter_table(ISell_PROPERTY, columns=PROPERTY_COLUMNS)
+        if fingerprint:
+            records = fingerprint.track(ISell_PROPERTY, records)
+        return list(records)
         
-        return response.json().get("records", [])
-        
-    except Exception as e:
+    except GristAPIError as e:
+        logger.error(f"Failed to fetch {ISell_PROPERTY} from Grist: {e}", exc_info=True)
         return None
 
 
-def save_product_properties(properties_data):
-    """ProductProperties modeliga ma'lumotlarni saqlash"""
-    created_count = 0
-    updated_count = 0
+def save_product_properties(properties_data, changed_property_ids=None):
+    """
+    ProductProperties modeliga ma'lumotlarni saqlash (mavjudlari bilan solishtirib, bulk).
+    changed_property_ids ga nomi/turi o'zgargan propertylar yoziladi.
+    """
+    existing = {}
+    for property_obj in ProductProperties.objects.order_by('id'):
+        existing.setdefault(property_obj.grist_property_id, property_obj)
+    
+    properties_to_create = []
+    properties_to_update = []
+    seen = set()
     
     for record in properties_data:
         grist_id = record.get("id")
@@ -436,111 +714,141 @@ def save_product_properties(properties_data):
         name = fields.get("name")
         property_type = fields.get("type")
         
-        if not grist_id or not name:
+        if not grist_id or not name or str(grist_id) in seen:
             continue
+        seen.add(str(grist_id))
         
-        try:
-            property_obj, created = ProductProperties.objects.update_or_create(
+        row_hash = record.get("row_hash")
+        property_obj = existing.get(str(grist_id))
+        if property_obj is None:
+            properties_to_create.append(ProductProperties(
                 grist_property_id=str(grist_id),
-                defaults={
-                    "name": name,
-                    "type": property_type
-                }
-            )
-            
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
-                
-        except Exception as e:
+                name=name,
+                type=property_type,
+                grist_hash=row_hash
+            ))
+        elif row_hash and property_obj.grist_hash == row_hash:
+            # Grist qatori oxirgi importdan beri o'zgarmagan
             continue
+        elif property_obj.name != name or property_obj.type != property_type or property_obj.grist_hash != row_hash:
+            property_obj.name = name
+            property_obj.type = property_type
+            property_obj.grist_hash = row_hash
+            property_obj.updated_at = timezone.now()
+            properties_to_update.append(property_obj)
     
-    return created_count, updated_count
+    with transaction.atomic():
+        ProductProperties.objects.bulk_create(properties_to_create, batch_size=BULK_BATCH_SIZE)
+        ProductProperties.objects.bulk_update(
+            properties_to_update, ["name", "type", "grist_hash", "updated_at"], batch_size=BULK_BATCH_SIZE
+        )
+    if changed_property_ids is not None:
+        changed_property_ids.update(property_obj.pk for property_obj in properties_to_update)
+    
+    return len(properties_to_create), len(properties_to_update)
 
 
-def import_product_properties():
+@instrumented("properties")
+def import_product_properties(fingerprint):
     """Product properties import qilish"""
-    print("[PRODUCT_LISTS] Starting product properties import...")
+    logger.info("Starting product properties import...")
     try:
-        properties = get_product_properties_from_grist()
-        print(f"[PRODUCT_LISTS] Total properties retrieved: {len(properties) if properties else 0}")
+        properties = get_product_properties_from_grist(fingerprint)
+        logger.info(f"Total properties retrieved: {len(properties) if properties else 0}")
         
         if not properties:
-            print("[PRODUCT_LISTS] WARNING: No properties found")
+            logger.warning("No properties found")
             return {
                 "success": False,
                 "message": "Свойства продуктов не найдены"
             }
         
-        created_count, updated_count = save_product_properties(properties)
-        print(f"[PRODUCT_LISTS] Properties import completed! Created: {created_count}, Updated: {updated_count}")
+        if fingerprint.unchanged():
+            return unchanged_result(fingerprint)
+        
+        changed_property_ids = set()
+        created_count, updated_count = save_product_properties(properties, changed_property_ids)
+        fingerprint.save()
+        logger.info(f"Properties import completed! Created: {created_count}, Updated: {updated_count}")
         
         return {
             "success": True,
             "message": "Свойства продуктов импортированы успешно",
             "created": created_count,
             "updated": updated_count,
+            "changed_property_ids": sorted(changed_property_ids),
             "total_processed": created_count + updated_count
         }
         
     except Exception as e:
-        print(f"[PRODUCT_LISTS] ERROR in import_product_properties: {str(e)}")
+        logger.exception(f"import_product_properties failed: {e}")
         return {
             "success": False,
             "message": f"Error: {str(e)}"
         }
 
 
-def get_product_property_values_from_grist():
-    """Grist'dan Product_property_value table ma'lumotlarini olish"""
-    try:
-        url = get_url(ISell_PRODUCT_PROPERTY_VALUE)
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
-            return None
-        
-        return response.json().get("records", [])
-        
-    except Exception as e:
-        return None
+def get_product_property_values_from_grist(fingerprint=None):
+    """Grist'dan Product_property_value table ma'lumotlarini sahifalab olish"""
+    records = get_grist_client().iter_table(ISell_PRODUCT_PROPERTY_VALUE, columns=PRODUCT_PROPERTY_VALUE_COLUMNS)
+    if fingerprint:
+        records = fingerprint.track(ISell_PRODUCT_PROPERTY_VALUE, records)
+    return records
 
 
-def get_property_values_from_grist():
-    """Grist'dan Property_values table ma'lumotlarini olish"""
-    try:
-        url = get_url(ISell_PROPERTY_VALUE)
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
-            return None
-        
-        return response.json().get("records", [])
-        
-    except Exception as e:
-        return None
+def get_property_values_from_grist(fingerprint=None):
+    """Grist'dan Property_values table ma'lumotlarini sahifalab olish"""
+    records = get_grist_client().iter_table(ISell_PROPERTY_VALUE, columns=PROPERTY_VALUE_COLUMNS)
+    if fingerprint:
+        records = fingerprint.track(ISell_PROPERTY_VALUE, records)
+    return records
 
 
-def process_characteristics_data(product_property_values, property_values):
-    """Product characteristics ma'lumotlarini qayta ishlash"""
-    characteristics_to_save = []
-    
-    # Property values ni dictionary ga aylantirish (value_id bo'yicha)
-    property_values_dict = {}
-    for record in property_values:
+def load_property_values(records, counters):
+    """Property_values jadvali: value_id -> (property_id, value, row_hash)"""
+    counters.setdefault("property_values", 0)
+    property_values = {}
+    for record in records:
+        counters["property_values"] += 1
         value_id = record.get("id")
         fields = record.get("fields", {})
         property_id = fields.get("property_id")
-        value = fields.get("value")
         
         if value_id and property_id:
-            property_values_dict[value_id] = {
-                "property_id": property_id,
-                "value": value
-            }
+            # Qidiruv jadvali (join ning bir tomoni) - ixcham tuple
+            property_values[value_id] = (property_id, fields.get("value"), record.get("row_hash"))
+    return property_values
+
+
+def group_characteristic_rows(fingerprint, records, property_values, counters):
+    """Product_property_value qatorlari hash ini (ishlatgan Property_value hash i bilan) product_name guruhiga qo'shish"""
+    counters.setdefault("product_property_values", 0)
+    for record in records:
+        counters["product_property_values"] += 1
+        fields = record.get("fields", {})
+        fingerprint.add_to_group(fields.get("product_name"), record.get("row_hash"))
+        value = property_values.get(fields.get("value_id"))
+        if value:
+            fingerprint.add_to_group(fields.get("product_name"), value[2])
+        yield record
+
+
+def process_characteristics_data(product_property_values, property_values, counters=None, product_names=None):
+    """Product_property_value qatorlaridan (product, property, value) ro'yxatini tuzish"""
+    characteristics_to_save = []
+    if counters is None:
+        counters = {}
+    counters.setdefault("products", set())
+    
+    # (product_name, variation_id) -> product va grist_property_id -> property
+    variation_products = load_products_by_variation_id(product_names)
+    # Diff doirasi - import qamragan barcha productlar (qatori qolmaganlari ham)
+    counters["products"].update(product.id for product in variation_products.values())
+    
+    properties = {}
+    for property_obj in ProductProperties.objects.order_by('id'):
+        properties.setdefault(property_obj.grist_property_id, property_obj)
     
-    # Product IDs bo'yicha guruhlash
     for record in product_property_values:
         fields = record.get("fields", {})
         product_name = fields.get("product_name")
@@ -551,49 +859,29 @@ def process_characteristics_data(product_property_values, property_values):
         if not all([product_name, variation_id, value_id, property_id]):
             continue
         
-        # ProductIDs dan product ni topish
-        try:
-            product_id_obj = ProductIDs.objects.filter(
-                product__name=product_name,
-                variation_id=str(variation_id)
-            ).first()
-            
-            if not product_id_obj:
-                continue
-            
-            product = product_id_obj.product
-            
-            # Property values dan value ni topish
-            if value_id in property_values_dict:
-                prop_value_data = property_values_dict[value_id]
-                
-                # Property_id tekshirish
-                if prop_value_data["property_id"] == property_id:
-                    value = prop_value_data["value"]
-                    
-                    # ProductProperties ni topish
-                    property_obj = ProductProperties.objects.filter(
-                        grist_property_id=str(property_id)
-                    ).first()
-                    
-                    if property_obj:
-                        characteristics_to_save.append({
-                            "product": product,
-                            "property": property_obj,
-                            "value": value
-                        })
-                        
-        except Exception as e:
+        product = variation_products.get((product_name, str(variation_id)))
+        if not product:
+            continue
+        
+        # Property values dan value ni topish va property_id ni tekshirish
+        prop_value_data = property_values.get(value_id)
+        if not prop_value_data or prop_value_data[0] != property_id:
             continue
+        
+        property_obj = properties.get(str(property_id))
+        if property_obj:
+            characteristics_to_save.append({
+                "product": product,
+                "property": property_obj,
+                "value": prop_value_data[1]
+            })
     
     return characteristics_to_save
 
 
-def save_product_characteristics(characteristics_data):
-    """ProductCharacteristics modeliga ma'lumotlarni saqlash"""
-    created_count = 0
-    skipped_count = 0
-    
+def save_product_characteristics(characteristics_data, product_ids=None):
+    """ProductCharacteristics ni product_ids doirasida Grist bilan bulk sinxronlash"""
+    wanted = set()
     for char_data in characteristics_data:
         product = char_data.get("product")
         property_obj = char_data.get("property")
@@ -601,115 +889,237 @@ def save_product_characteristics(characteristics_data):
         
         if not all([product, property_obj, value]):
             continue
-        
-        try:
-            # Aynan bir xil (product, property, value) kombinatsiyasi borligini tekshiramiz
-            existing = ProductCharacteristics.objects.filter(
-                product=product,
-                property=property_obj,
-                value=value
-            ).exists()
-            
-            if not existing:
-                # Yangi characteristic yaratamiz (har bir value alohida)
-                ProductCharacteristics.objects.create(
-                    product=product,
-                    property=property_obj,
-                    value=value
-                )
-                created_count += 1
-            else:
-                skipped_count += 1
-                
-        except Exception as e:
-            continue
+        wanted.add((product.id, property_obj.id, value))
+    
+    if product_ids is None:
+        product_ids = {product_id for product_id, _, _ in wanted}
     
-    return created_count, skipped_count
+    # Mavjud yozuvlar: (product, property, value) -> id; dublikatlar o'chiriladi
+    existing = {}
+    to_delete = []
+    for char_id, product_id, property_id, value in ProductCharacteristics.objects.filter(
+        product_id__in=product_ids
+    ).order_by('id').values_list('id', 'product_id', 'property_id', 'value'):
+        key = (product_id, property_id, value)
+        if key in existing or key not in wanted:
+            to_delete.append((char_id, product_id, property_id))
+        else:
+            existing[key] = char_id
+    
+    to_add = {}
+    for product_id, property_id, value in wanted - existing.keys():
+        to_add.setdefault((product_id, property_id), []).append(value)
+    
+    # O'chirilayotgan qatorni shu (product, property) ning yangi qiymati bilan qayta ishlatish
+    now = timezone.now()
+    characteristics_to_update = []
+    remaining_deletes = []
+    for char_id, product_id, property_id in to_delete:
+        values = to_add.get((product_id, property_id))
+        if values:
+            characteristics_to_update.append(ProductCharacteristics(id=char_id, value=values.pop(), updated_at=now))
+        else:
+            remaining_deletes.append(char_id)
+    
+    characteristics_to_create = [
+        ProductCharacteristics(product_id=product_id, property_id=property_id, value=value)
+        for (product_id, property_id), values in to_add.items()
+        for value in values
+    ]
+    
+    with transaction.atomic():
+        ProductCharacteristics.objects.bulk_create(characteristics_to_create, batch_size=BULK_BATCH_SIZE)
+        ProductCharacteristics.objects.bulk_update(
+            characteristics_to_update, ["value", "updated_at"], batch_size=BULK_BATCH_SIZE
+        )
+        for chunk in chunked(remaining_deletes):
+            ProductCharacteristics.objects.filter(id__in=chunk).delete()
+    
+    return {
+        "created": len(characteristics_to_create),
+        "updated": len(characteristics_to_update),
+        "deleted": len(remaining_deletes),
+        "skipped": len(existing),
+        "changed_product_ids": sorted(
+            {product_id for product_id, _ in to_add} | {product_id for _, product_id, _ in to_delete}
+        ),
+    }
 
 
-def import_product_characteristics():
+@instrumented("characteristics")
+def import_product_characteristics(fingerprint):
     """Product characteristics import qilish"""
-    print("[PRODUCT_LISTS] Starting product characteristics import...")
+    logger.info("Starting product characteristics import...")
     try:
-        # Product property values olish
-        product_property_values = get_product_property_values_from_grist()
-        print(f"[PRODUCT_LISTS] Product property values retrieved: {len(product_property_values) if product_property_values else 0}")
-        
-        if not product_property_values:
-            print("[PRODUCT_LISTS] WARNING: No product property values found")
-            return {
-                "success": False,
-                "message": "Product property values не найдены"
-            }
-        
-        # Property values olish
-        property_values = get_property_values_from_grist()
-        print(f"[PRODUCT_LISTS] Property values retrieved: {len(property_values) if property_values else 0}")
-        
-        if not property_values:
-            print("[PRODUCT_LISTS] WARNING: No property values found")
-            return {
-                "success": False,
-                "message": "Property values не найдены"
-            }
-        
-        # Ma'lumotlarni qayta ishlash
-        characteristics_data = process_characteristics_data(
-            product_property_values, 
-            property_values
-        )
-        print(f"[PRODUCT_LISTS] Processed characteristics data: {len(characteristics_data)}")
+        counters = {}
+        property_values = load_property_values(get_property_values_from_grist(fingerprint), counters)
+        with spool_records(group_characteristic_rows(
+            fingerprint, get_product_property_values_from_grist(fingerprint), property_values, counters
+        )) as spool:
+            logger.info(f"Product property values retrieved: {counters['product_property_values']}")
+            logger.info(f"Property values retrieved: {counters['property_values']}")
+            
+            if not counters["product_property_values"]:
+                logger.warning("No product property values found")
+                return {
+                    "success": False,
+                    "message": "Product property values не найдены"
+                }
+            
+            if not counters["property_values"]:
+                logger.warning("No property values found")
+                return {
+                    "success": False,
+                    "message": "Property values не найдены"
+                }
+            
+            if fingerprint.unchanged():
+                return unchanged_result(fingerprint)
+            
+            product_names = fingerprint.changed_groups()
+            characteristics_data = process_characteristics_data(
+                iter_spooled(spool, product_names), property_values, counters, product_names
+            )
+        logger.info(f"Processed characteristics data: {len(characteristics_data)}")
         
-        if not characteristics_data:
-            print("[PRODUCT_LISTS] WARNING: Failed to process characteristics data")
+        if not characteristics_data and product_names is None:
+            logger.warning("Failed to process characteristics data")
             return {
                 "success": False,
                 "message": "Не удалось обработать данные характеристик"
             }
         
         # Saqlash
-        created_count, skipped_count = save_product_characteristics(characteristics_data)
-        print(f"[PRODUCT_LISTS] Characteristics import completed! Created: {created_count}, Skipped: {skipped_count}")
+        saved = save_product_characteristics(characteristics_data, counters["products"])
+        fingerprint.save()
+        logger.info(
+            f"Characteristics import completed! Created: {saved['created']}, "
+            f"Updated: {saved['updated']}, Deleted: {saved['deleted']}, Skipped: {saved['skipped']}"
+        )
         
         return {
             "success": True,
             "message": "Характеристики продуктов импортированы успешно",
-            "created": created_count,
-            "skipped": skipped_count,
-            "total_processed": created_count + skipped_count,
-            "total_from_grist": len(product_property_values),
-            "total_to_save": len(characteristics_data)
+            "created": saved["created"],
+            "updated": saved["updated"],
+            "deleted": saved["deleted"],
+            "skipped": saved["skipped"],
+            "total_processed": saved["created"] + saved["updated"] + saved["skipped"],
+            "total_from_grist": counters["product_property_values"],
+            "total_to_save": len(characteristics_data),
+            "changed_product_ids": saved["changed_product_ids"]
         }
         
     except Exception as e:
-        print(f"[PRODUCT_LISTS] ERROR in import_product_characteristics: {str(e)}")
+        logger.exception(f"import_product_characteristics failed: {e}")
         return {
             "success": False,
             "message": f"Error: {str(e)}"
         }
 
 
-def download_image(attachment_id, timeout=30):
-    """Bitta rasmni yuklab olish"""
+def sync_product_characteristics(product_names, changed_product_property_values=(), changed_property_values=()):
+    """Berilgan productlar characteristics ini Grist bilan sinxronlash (webhook uchun)"""
+    grist = get_grist_client()
+    product_property_values = {}
+    for names in chunked(sorted(product_names)):
+        for record in grist.iter_table(
+            ISell_PRODUCT_PROPERTY_VALUE, filter={"product_name": names}, columns=PRODUCT_PROPERTY_VALUE_COLUMNS
+        ):
+            product_property_values[record["id"]] = record
+    for record in changed_product_property_values:
+        product_property_values[record["id"]] = record
+    
+    value_ids = sorted({
+        record["fields"]["value_id"] for record in product_property_values.values()
+        if record.get("fields", {}).get("value_id")
+    })
+    property_values = {}
+    for ids in chunked(value_ids):
+        for record in grist.iter_table(ISell_PROPERTY_VALUE, filter={"id": ids}, columns=PROPERTY_VALUE_COLUMNS):
+            property_values[record["id"]] = record
+    for record in changed_property_values:
+        property_values[record["id"]] = record
+    
+    counters = {}
+    characteristics_data = process_characteristics_data(
+        product_property_values.values(), load_property_values(property_values.values(), counters), counters,
+        product_names
+    )
+    saved = save_product_characteristics(characteristics_data, counters["products"])
+    saved["products"] = len(counters["products"])
+    return saved
+
+
+def apply_product_property_value_rows(records):
+    """Grist webhook: Product_property_value qatorlari o'zgargan productlar characteristics ini yangilash"""
+    product_names = {
+        record.get("fields", {}).get("product_name") for record in records
+    } - {None, ""}
+    return sync_product_characteristics(product_names, changed_product_property_values=records)
+
+
+def apply_property_value_rows(records):
+    """Grist webhook: Property_value qiymati o'zgarsa, uni ishlatadigan productlar characteristics ini yangilash"""
+    value_ids = sorted({record.get("id") for record in records if record.get("id")})
+    product_names = set()
+    for ids in chunked(value_ids):
+        for record in get_grist_client().iter_table(
+            ISell_PRODUCT_PROPERTY_VALUE, filter={"value_id": ids}, columns=["product_name"]
+        ):
+            product_names.add(record.get("fields", {}).get("product_name"))
+    return sync_product_characteristics(product_names - {None, ""}, changed_property_values=records)
+
+
+def download_image(attachment_id, product_ids, reusable_hashes):
+    """Bitta rasmni oqim ko'rinishida yuklab olib storage ga yozish (Grist/storage xatosida None)"""
+    image_field = ProductImages._meta.get_field("image")
+    saved_names = []
     try:
-        url = f"https://isell.getgrist.com/api/docs/{DOC_ID}/attachments/{attachment_id}/download"
-        response = requests.get(url, headers=headers, timeout=timeout)
+        with tempfile.SpooledTemporaryFile(max_size=IMAGE_SPOOL_MAX_SIZE) as spool:
+            digest = hashlib.sha256()
+            for chunk in get_grist_client().iter_attachment(attachment_id, IMAGE_CHUNK_SIZE):
+                digest.update(chunk)
+                spool.write(chunk)
+            content_hash = digest.hexdigest()
+            
+            files = {}
+            for product_id in product_ids:
+                if content_hash in reusable_hashes.get(product_id, {}):
+                    continue
+                spool.seek(0)
+                name = image_field.generate_filename(None, f"product_{product_id}_{attachment_id}.jpg")
+                files[product_id] = image_field.storage.save(
+                    name, File(spool, name=name), max_length=image_field.max_length
+                )
+                saved_names.append(files[product_id])
         
-        if response.status_code == 200:
-            return {
-                "success": True,
-                "content": response.content,
-                "attachment_id": attachment_id
-            }
-        return None
+        return {
+            "success": True,
+            "attachment_id": attachment_id,
+            "content_hash": content_hash,
+            "files": files
+        }
         
-    except Exception as e:
+    except (GristAPIError, OSError):
+        logger.warning(f"Image attachment {attachment_id} download failed", exc_info=True)
+        discard_files(image_field.storage, saved_names)
         return None
+    except Exception:
+        discard_files(image_field.storage, saved_names)
+        raise
+
+
+def discard_files(storage, names):
+    """Yarim yozilgan rasm fayllari qolib ketmasin"""
+    for name in names:
+        storage.delete(name)
 
 
-def extract_picture_ids_from_variations(variations_data):
+def extract_picture_ids_from_variations(variations_data, product_names=None):
     """Variations dan rasm ID larini olish va product bo'yicha guruhlash"""
     products_pictures = {}
+    variation_products = load_products_by_variation_id(product_names)
     
     for fields in variations_data:
         picture = fields.get("picture")
@@ -723,152 +1133,241 @@ def extract_picture_ids_from_variations(variations_data):
         if not product_name or not variation_id:
             continue
         
-        attachment_id = picture[1]
+        # Attachment ID ni satr ko'rinishida saqlaymiz (ProductImages.grist_attachment_id)
+        attachment_id = str(picture[1])
         
         # Product ni topish
-        try:
-            product_id_obj = ProductIDs.objects.filter(
-                variation_id=str(variation_id),
-                product__name=product_name
-            ).select_related('product').first()
-            
-            if not product_id_obj:
-                continue
-            
-            product = product_id_obj.product
-            
-            # NEW variantlari uchun guruhlash
-            if "NEW" in variation_name.upper():
-                if product.id not in products_pictures:
-                    products_pictures[product.id] = {
-                        "product": product,
-                        "attachment_ids": set()
-                    }
-                products_pictures[product.id]["attachment_ids"].add(attachment_id)
-            
-        except Exception as e:
+        product = variation_products.get((product_name, str(variation_id)))
+        if not product:
             continue
+        
+        # NEW variantlari uchun guruhlash
+        if "NEW" in variation_name.upper():
+            if product.id not in products_pictures:
+                products_pictures[product.id] = {
+                    "product": product,
+                    "attachment_ids": set()
+                }
+            products_pictures[product.id]["attachment_ids"].add(attachment_id)
     
     return products_pictures
 
 
-def save_images_bulk(products_pictures, downloaded_images):
-    """Rasmlarni bulk save qilish"""
-    created_count = 0
-    skipped_count = 0
-    
-    # Downloaded images ni dict ga aylantirish
-    images_dict = {img["attachment_id"]: img["content"] for img in downloaded_images if img}
+def load_existing_images(product_names=None):
+    """
+    Grist'dan import qilingan rasmlar: (product_id, attachment_id) -> ProductImages.
+    Bir xil kalitli dublikatlar alohida ro'yxatda qaytariladi.
+    """
+    existing = {}
+    duplicates = []
+    images = ProductImages.objects.filter(grist_attachment_id__isnull=False).order_by('id')
+    if product_names is not None:
+        images = images.filter(product__name__in=product_names)
+    for product_image in images:
+        key = (product_image.product_id, product_image.grist_attachment_id)
+        if key in existing:
+            duplicates.append(product_image)
+        else:
+            existing[key] = product_image
+    return existing, duplicates
+
+
+def save_downloaded_image(products, result, stale_images, reusable_hashes):
+    """Storage ga yozilgan rasm uchun ProductImages yozuvlarini yaratish"""
+    image_field = ProductImages._meta.get_field("image")
+    attachment_id = result["attachment_id"]
+    content_hash = result["content_hash"]
+    images_to_create = []
+    reused_count = 0
     
-    # Har bir product uchun
-    for product_id, data in products_pictures.items():
-        product = data["product"]
-        attachment_ids = data["attachment_ids"]
-        
-        # Mavjud rasmlar IDlarini olish (agar picture_id field bo'lsa)
-        existing_images = set(
-            ProductImages.objects.filter(product=product).values_list('id', flat=True)
-        )
-        
-        images_to_create = []
-        
-        for attachment_id in attachment_ids:
-            if attachment_id not in images_dict:
-                skipped_count += 1
-                continue
-            
-            image_content = images_dict[attachment_id]
+    for product in products:
+        name = result["files"].get(product.id)
+        if name is None:
+            reusable = None
+            for stale_image in stale_images.get(product.id, []):
+                if stale_image.content_hash == content_hash:
+                    reusable = stale_image
+                    break
             
-            # Image faylini yaratish
-            image_file = ContentFile(image_content)
+            if reusable:
+                stale_images[product.id].remove(reusable)
+                reusable.grist_attachment_id = attachment_id
+                reusable.save(update_fields=["grist_attachment_id", "updated_at"])
+                reused_count += 1
+                continue
             
-            # ProductImages obyektini yaratish (hali saqlamasdan)
-            product_image = ProductImages(product=product)
-            product_image.image.save(
-                f"product_{product.id}_{attachment_id}.jpg",
-                image_file,
-                save=True
-            )
-            created_count += 1
+            # Mos eski rasm boshqa attachmentga berib bo'lingan - uning faylidan nusxa olamiz
+            source_name = reusable_hashes[product.id][content_hash]
+            target_name = image_field.generate_filename(None, f"product_{product.id}_{attachment_id}.jpg")
+            with image_field.storage.open(source_name) as source:
+                name = image_field.storage.save(target_name, source, max_length=image_field.max_length)
+        
+        images_to_create.append(ProductImages(
+            product=product,
+            image=name,
+            grist_attachment_id=attachment_id,
+            content_hash=content_hash
+        ))
+    
+    ProductImages.objects.bulk_create(images_to_create)
+    return images_to_create, reused_count
+
+
+def delete_images(product_images):
+    """Rasm fayllarini storage dan va yozuvlarni bazadan o'chirish"""
+    for product_image in product_images:
+        if product_image.image:
+            product_image.image.delete(save=False)
     
-    return created_count, skipped_count
+    ids = [product_image.id for product_image in product_images]
+    for chunk in chunked(ids):
+        ProductImages.objects.filter(id__in=chunk).delete()
+    return len(ids)
 
 
-def import_product_images():
-    """Product rasmlarini import qilish (tez va samarali)"""
-    print("[PRODUCT_LISTS] Starting product images import...")
+@instrumented("images")
+def import_product_images(fingerprint):
+    """Product rasmlarini Grist attachment ID bo'yicha inkremental import qilish"""
+    logger.info("Starting product images import...")
     try:
-        # Variations olish (ID bilan)
-        variations = get_product_variations_for_images()
-        print(f"[PRODUCT_LISTS] Variations for images retrieved: {len(variations) if variations else 0}")
-        
-        if not variations:
-            print("[PRODUCT_LISTS] WARNING: No variations found for images")
-            return {
-                "success": False,
-                "message": "Вариации не найдены"
-            }
-        
-        # Picture ID larini olish va guruhlash
-        products_pictures = extract_picture_ids_from_variations(variations)
-        print(f"[PRODUCT_LISTS] Products with pictures: {len(products_pictures)}")
+        with spool_records(fingerprint.track(
+            ISell_PRODUCT_VARIATIONS_TABLE_NAME, get_variation_records(VARIATION_IMAGE_COLUMNS), group_by=record_product_name
+        )) as spool:
+            if fingerprint.row_count and fingerprint.unchanged():
+                return unchanged_result(fingerprint)
+            
+            # Variations (ID bilan) dan picture ID larini olish va guruhlash
+            product_names = fingerprint.changed_groups()
+            products_pictures = extract_picture_ids_from_variations(
+                variation_image_fields(iter_spooled(spool, product_names)), product_names
+            )
+        logger.info(f"Products with pictures: {len(products_pictures)}")
         
-        if not products_pictures:
-            print("[PRODUCT_LISTS] WARNING: No images found in variations")
+        if not products_pictures and product_names is None:
+            logger.warning("No images found in variations")
             return {
                 "success": False,
                 "message": "Изображения не найдены в вариациях"
             }
         
-        # Barcha unique attachment ID larini yig'ish
-        all_attachment_ids = set()
+        existing_images, duplicate_images = load_existing_images(product_names)
+        
+        # Attachment ID -> hali rasmi yo'q productlar (bitta rasm bir nechta productga tegishli bo'lishi mumkin)
+        attachment_products = {}
+        wanted = set()
+        unchanged_count = 0
         for data in products_pictures.values():
-            all_attachment_ids.update(data["attachment_ids"])
-        print(f"[PRODUCT_LISTS] Total unique attachment IDs: {len(all_attachment_ids)}")
-        
-        # Rasmlarni parallel yuklab olish (10 ta bir vaqtda)
-        print("[PRODUCT_LISTS] Downloading images in parallel (10 workers)...")
-        downloaded_images = []
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_id = {
-                executor.submit(download_image, att_id): att_id 
-                for att_id in all_attachment_ids
-            }
+            product = data["product"]
+            for attachment_id in data["attachment_ids"]:
+                wanted.add((product.id, attachment_id))
+                if (product.id, attachment_id) in existing_images:
+                    unchanged_count += 1
+                    continue
+                attachment_products.setdefault(attachment_id, []).append(product)
+        
+        # Variationdan yo'qolgan attachmentlarning rasmlari (product bo'yicha)
+        # va workerlar uchun ularning hash -> fayl nomi nusxasi (faqat o'qiladi)
+        stale_images = {}
+        reusable_hashes = {}
+        for key, product_image in existing_images.items():
+            if key not in wanted:
+                stale_images.setdefault(product_image.product_id, []).append(product_image)
+                if product_image.content_hash and product_image.image:
+                    reusable_hashes.setdefault(product_image.product_id, {})[product_image.content_hash] = product_image.image.name
+        
+        logger.info(f"Unchanged images: {unchanged_count}, attachments to download: {len(attachment_products)}")
+        
+        # Rasmlarni parallel yuklab olish: workerlar oqimni to'g'ridan-to'g'ri
+        # storage ga yozadi, navbatda esa IMAGE_DOWNLOAD_WINDOW tadan ko'p attachment bo'lmaydi
+        downloaded_count = 0
+        created_count = 0
+        reused_count = 0
+        skipped_count = 0
+        created_images = []
+        if attachment_products:
+            logger.info(f"Downloading images in parallel ({IMAGE_DOWNLOAD_WORKERS} workers)...")
+        with ThreadPoolExecutor(max_workers=IMAGE_DOWNLOAD_WORKERS) as executor:
+            pending = iter(attachment_products)
+            future_to_id = {}
+            
+            def submit(attachment_ids):
+                for att_id in attachment_ids:
+                    product_ids = [product.id for product in attachment_products[att_id]]
+                    future = executor.submit(download_image, att_id, product_ids, reusable_hashes)
+                    future_to_id[future] = att_id
+            
+            submit(islice(pending, IMAGE_DOWNLOAD_WINDOW))
             
             completed = 0
-            for future in as_completed(future_to_id):
-                result = future.result()
-                if result and result["success"]:
-                    downloaded_images.append(result)
-                completed += 1
-                if completed % 10 == 0:
-                    print(f"[PRODUCT_LISTS] Downloaded {completed}/{len(all_attachment_ids)} images...")
-        
-        print(f"[PRODUCT_LISTS] Total images downloaded: {len(downloaded_images)}")
-        
-        if not downloaded_images:
-            print("[PRODUCT_LISTS] ERROR: Failed to download any images")
+            while future_to_id:
+                done, _ = wait(future_to_id, return_when=FIRST_COMPLETED)
+                for future in done:
+                    attachment_id = future_to_id.pop(future)
+                    result = future.result()
+                    if result and result["success"]:
+                        downloaded_count += 1
+                        created, reused = save_downloaded_image(
+                            attachment_products[attachment_id],
+                            result,
+                            stale_images,
+                            reusable_hashes
+                        )
+                        created_images.extend(created)
+                        created_count += len(created)
+                        reused_count += reused
+                    else:
+                        skipped_count += len(attachment_products[attachment_id])
+                        # Yangi rasm olinmagan productlarning eski rasmlari saqlanib qoladi
+                        for product in attachment_products[attachment_id]:
+                            stale_images.pop(product.id, None)
+                    completed += 1
+                    if completed % 10 == 0:
+                        logger.info(f"Downloaded {completed}/{len(attachment_products)} images...")
+                    submit(islice(pending, 1))
+        
+        logger.info(f"Total images downloaded: {downloaded_count}")
+        
+        if attachment_products and not downloaded_count:
+            logger.error("Failed to download any images")
             return {
                 "success": False,
                 "message": "Не удалось загрузить изображения"
             }
         
-        # Rasmlarni saqlash
-        print("[PRODUCT_LISTS] Saving images to database...")
-        created_count, skipped_count = save_images_bulk(products_pictures, downloaded_images)
-        print(f"[PRODUCT_LISTS] Images import completed! Created: {created_count}, Skipped: {skipped_count}")
+        # Eskirgan va dublikat rasmlarni o'chirish
+        images_to_delete = duplicate_images + [image for images in stale_images.values() for image in images]
+        changed_product_ids = {image.product_id for image in created_images + images_to_delete}
+        deleted_count = delete_images(images_to_delete)
+        
+        # Yangi rasmlar uchun thumbnail/card/full variantlari (process pool da)
+        variants_result = generate_variants(created_images)
+        logger.info(f"Image variants generated: {variants_result['generated']}, failed: {variants_result['failed']}")
+        
+        # Yuklanmagan rasmlar bo'lsa, keyingi import ularni qayta urinishi uchun fingerprint saqlanmaydi
+        if not skipped_count:
+            fingerprint.save()
+        
+        logger.info(
+            f"Images import completed! Created: {created_count}, Reused: {reused_count}, "
+            f"Deleted: {deleted_count}, Unchanged: {unchanged_count}, Skipped: {skipped_count}"
+        )
         
         return {
             "success": True,
             "message": "Изображения продуктов импортированы успешно",
             "created": created_count,
+            "reused": reused_count,
+            "deleted": deleted_count,
+            "unchanged": unchanged_count,
             "skipped": skipped_count,
-            "total_downloaded": len(downloaded_images),
+            "variants": variants_result,
+            "changed_product_ids": sorted(changed_product_ids),
+            "total_downloaded": downloaded_count,
             "total_products": len(products_pictures)
         }
         
     except Exception as e:
-        print(f"[PRODUCT_LISTS] ERROR in import_product_images: {str(e)}")
+        logger.exception(f"import_product_images failed: {e}")
         return {
             "success": False,
             "message": f"Error: {str(e)}"
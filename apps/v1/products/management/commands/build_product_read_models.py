@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.v1.products.services.product_read_model import build_product_read_models, refresh_product_read_models
+
+
+class Command(BaseCommand):
+    help = "ProductReadModel (list/detail uchun oldindan render qilingan JSON) ni qayta hisoblash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', nargs='+', type=int, help="Faqat shu product ID lari")
+        parser.add_argument('--force', action='store_true', help="O'zgarmagan qatorlarni ham qayta yozish (qidiruv kalitlari bilan)")
+
+    def handle(self, *args, **options):
+        if options['products']:
+            result = refresh_product_read_models(Q(id__in=options['products']), force=options['force'])
+        else:
+            result = build_product_read_models(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Read model: created {result['created']}, updated {result['updated']}, unchanged {result['unchanged']}"
+        ))
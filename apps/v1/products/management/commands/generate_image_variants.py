@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.v1.products.models import ProductImages, Banner
+from apps.v1.products.services.image_variants import generate_variants
+
+
+class Command(BaseCommand):
+    help = "ProductImages va Banner rasmlari uchun thumbnail/card/full (WebP/JPEG) variantlarini yaratish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=['products', 'banners'], help="Faqat bitta model uchun")
+        parser.add_argument('--force', action='store_true', help="Mavjud variantlarni ham qayta yaratish")
+        parser.add_argument('--workers', type=int, help="Process pool hajmi (standart: ISell_IMAGE_VARIANT_WORKERS)")
+
+    def handle(self, *args, **options):
+        querysets = {
+            "products": ProductImages.objects.exclude(image='').exclude(image__isnull=True).order_by('id'),
+            "banners": Banner.objects.exclude(image='').exclude(image__isnull=True).order_by('id'),
+        }
+        for name, queryset in querysets.items():
+            if options['only'] and options['only'] != name:
+                continue
+            result = generate_variants(queryset, force=options['force'], workers=options['workers'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: generated {result['generated']}, failed {result['failed']}"
+            ))
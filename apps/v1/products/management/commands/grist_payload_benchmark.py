@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.v1.products.integrations.grist_client import GristClient, GristAPIError
+from apps.v1.products.integrations import product_lists
+
+
+class Command(BaseCommand):
+    help = "Grist jadvallarini to'liq va filtrlangan/proyeksiyalangan holda yuklab, payload hajmini solishtirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=1, help="Har bir so'rovni necha marta takrorlash")
+
+    def get_cases(self):
+        return [
+            (
+                "product_price",
+                product_lists.Isell_PRODUCT_PRICE,
+                {"actual": [True]},
+                product_lists.PRODUCT_PRICE_COLUMNS,
+            ),
+            (
+                "variations",
+                product_lists.ISell_PRODUCT_VARIATIONS_TABLE_NAME,
+                {"fully_defined": [True]},
+                product_lists.VARIATION_COLUMNS,
+            ),
+            (
+                "variation_images",
+                product_lists.ISell_PRODUCT_VARIATIONS_TABLE_NAME,
+                {"fully_defined": [True]},
+                product_lists.VARIATION_IMAGE_COLUMNS,
+            ),
+            (
+                "product_property_values",
+                product_lists.ISell_PRODUCT_PROPERTY_VALUE,
+                None,
+                product_lists.PRODUCT_PROPERTY_VALUE_COLUMNS,
+            ),
+        ]
+
+    def measure(self, client, repeat, table_name, filter=None, columns=None):
+        client.reset_stats()
+        rows = 0
+        started = time.monotonic()
+        for _ in range(repeat):
+            rows = len(client.fetch_table(table_name, filter=filter, columns=columns))
+        elapsed = time.monotonic() - started
+        stats = client.stats()
+        return {
+            "rows": rows,
+            "bytes": stats["bytes"] // repeat,
+            "seconds": elapsed / repeat,
+        }
+
+    def handle(self, *args, **options):
+        repeat = max(options['repeat'], 1)
+        client = GristClient()
+
+        self.stdout.write(f"Grist: {client.doc_url()}")
+        self.stdout.write(
+            f"{'stage':<26}{'full rows':>10}{'full KB':>12}{'full s':>9}"
+            f"{'rows':>10}{'KB':>12}{'s':>9}{'ratio':>8}"
+        )
+
+        for name, table_name, filter, columns in self.get_cases():
+            if not table_name:
+                self.stdout.write(self.style.WARNING(f"{name:<26}table is not configured"))
+                continue
+            try:
+                full = self.measure(client, repeat, table_name)
+                pushed = self.measure(client, repeat, table_name, filter=filter, columns=columns)
+            except GristAPIError as e:
+                self.stdout.write(self.style.ERROR(f"{name:<26}{str(e)}"))
+                continue
+
+            ratio = full["bytes"] / pushed["bytes"] if pushed["bytes"] else 0
+            self.stdout.write(
+                f"{name:<26}{full['rows']:>10}{full['bytes'] / 1024:>12.1f}{full['seconds']:>9.2f}"
+                f"{pushed['rows']:>10}{pushed['bytes'] / 1024:>12.1f}{pushed['seconds']:>9.2f}{ratio:>7.1f}x"
+            )
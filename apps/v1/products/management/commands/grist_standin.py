@@ -0,0 +1,133 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.v1.products.integrations.grist_client import GristClient, GristAPIError, set_grist_client
+from apps.v1.products.integrations.grist_standin import (
+    GristStandin, TABLE_ENV_DEFAULTS, generate_synthetic_tables, record_fixtures, table_names
+)
+
+
+class Command(BaseCommand):
+    help = "Lokal Grist stand-in serveri (yozib olingan yoki sintetik fixture'lar bilan) va import vaqtini o'lchash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8484)
+        parser.add_argument('--doc-id', default='standin')
+        parser.add_argument('--fixtures', help="record qilingan fixture papkasi (tables.json + attachments/)")
+        parser.add_argument('--record', help="Jonli Grist hujjatini shu papkaga yozib olish va chiqish")
+        parser.add_argument('--with-attachments', action='store_true', help="--record bilan rasmlarni ham yozib olish")
+        parser.add_argument('--products', type=int, default=200, help="Sintetik productlar soni")
+        parser.add_argument('--variations', type=int, default=2000, help="Sintetik variationlar soni")
+        parser.add_argument('--inactive-ratio', type=float, default=0.5, help="Narx jadvalidagi actual=False ulushi")
+        parser.add_argument('--image-size', type=int, default=800, help="Sintetik rasm o'lchami (px)")
+        parser.add_argument('--latency', type=float, default=0.0, help="Har bir so'rovga qo'shiladigan kechikish (ms)")
+        parser.add_argument('--jitter', type=float, default=0.0, help="Tasodifiy qo'shimcha kechikish (ms)")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="503 qaytariladigan so'rovlar ulushi (0..1)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--run-import', action='store_true',
+            help="Serverni fon rejimida ishga tushirib, get_products -> import_product_images pipeline vaqtini o'lchash"
+        )
+
+    def handle(self, *args, **options):
+        if options['record']:
+            return self.record(options)
+
+        standin = self.build_standin(options)
+
+        if options['run_import']:
+            server = standin.serve(options['host'], 0)
+            try:
+                self.run_import(standin, server, options)
+            finally:
+                server.shutdown()
+            return
+
+        server = standin.serve(options['host'], options['port'])
+        base_url = standin.base_url(server)
+        self.stdout.write(self.style.SUCCESS(f"Grist stand-in: {base_url}/api/docs/{standin.doc_id}"))
+        self.stdout.write("Importlarni shu serverga yo'naltirish uchun:")
+        self.stdout.write(f"  ISell_GRIST_URL={base_url}")
+        self.stdout.write(f"  ISell_DOC_ID={standin.doc_id}")
+        for env_name, table_name in table_names().items():
+            self.stdout.write(f"  {env_name}={table_name}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+
+    def record(self, options):
+        client = GristClient()
+        try:
+            result = record_fixtures(client, options['record'], with_attachments=options['with_attachments'])
+        except GristAPIError as e:
+            raise CommandError(str(e))
+        for table_name, count in result["tables"].items():
+            self.stdout.write(f"{table_name}: {count} rows")
+        self.stdout.write(self.style.SUCCESS(f"Attachments: {result['attachments']}; saved to {options['record']}"))
+
+    def build_standin(self, options):
+        kwargs = {
+            "doc_id": options['doc_id'],
+            "image_size": options['image_size'],
+            "latency": options['latency'] / 1000,
+            "jitter": options['jitter'] / 1000,
+            "error_rate": options['error_rate'],
+            "seed": options['seed'],
+        }
+        if options['fixtures']:
+            return GristStandin.from_fixtures(options['fixtures'], **kwargs)
+
+        tables = generate_synthetic_tables(
+            products=options['products'],
+            variations=options['variations'],
+            inactive_ratio=options['inactive_ratio'],
+            seed=options['seed'],
+        )
+        return GristStandin(tables, **kwargs)
+
+    def run_import(self, standin, server, options):
+        # Integratsiya modullari jadval nomlarini env'dan import vaqtida o'qiydi
+        missing = [env_name for env_name in TABLE_ENV_DEFAULTS if not os.getenv(env_name)]
+        if missing:
+            raise CommandError(
+                "Jadval nomlari env'da o'rnatilmagan: " + ", ".join(missing)
+                + ". Ularni .env ga qo'shing (standin standart nomlari: "
+                + ", ".join(f"{env}={TABLE_ENV_DEFAULTS[env]}" for env in missing) + ")"
+            )
+
+        from apps.v1.products.integrations.category_list import get_categories
+        from apps.v1.products.integrations.product_lists import (
+            get_products, import_product_details, import_product_properties,
+            import_product_characteristics, import_product_images
+        )
+
+        client = GristClient(base_url=standin.base_url(server), doc_id=standin.doc_id, backoff=0.05)
+        set_grist_client(client)
+
+        stages = [
+            ("categories", get_categories),
+            ("products", get_products),
+            ("details", import_product_details),
+            ("properties", import_product_properties),
+            ("characteristics", import_product_characteristics),
+            ("images", import_product_images),
+        ]
+        total_started = time.monotonic()
+        self.stdout.write(f"{'stage':<18}{'seconds':>10}{'http s':>10}{'requests':>10}{'KB':>12}  result")
+        for name, func in stages:
+            before = client.stats()
+            started = time.monotonic()
+            result = func()
+            elapsed = time.monotonic() - started
+            http = client.stats_since(before)
+            ok = result.get("success", "error" not in result)
+            self.stdout.write(
+                f"{name:<18}{elapsed:>10.2f}{http['seconds']:>10.2f}{http['requests']:>10}"
+                f"{http['bytes'] / 1024:>12.1f}  {'ok' if ok else result.get('message')}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Total: {time.monotonic() - total_started:.2f}s"))
@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.v1.products.services.grist_sync import (
+    STAGE_DEPENDENCIES, SUCCEEDED, critical_path, plan_waves, run_sync, stage_dependencies, with_dependencies
+)
+from apps.v1.products.services.import_jobs import stage_message, stage_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Grist importini bog'liqlik grafi bo'yicha parallel bajarish: "
+        "categories, tariffs, properties, advanced_payment -> products, quote_tables -> details, characteristics, images"
+    )
+
+    def add_arguments(self, parser):
+        stages = sorted(STAGE_DEPENDENCIES)
+        parser.add_argument('--stages', nargs='+', choices=stages, help="Faqat shu bosqichlar (standart: hammasi)")
+        parser.add_argument('--exclude', nargs='+', choices=stages, default=[], help="Bu bosqichlarni o'tkazib yuborish")
+        parser.add_argument('--with-deps', action='store_true', help="Tanlangan bosqichlarning bog'liqliklarini ham bajarish")
+        parser.add_argument('--workers', type=int, help="Parallel bosqichlar soni (standart: bosqichlar soni)")
+        parser.add_argument('--full', action='store_true', help="Fingerprint larni e'tiborsiz qoldirib to'liq import")
+        parser.add_argument('--dry-run', action='store_true', help="Faqat bajarilish rejasini ko'rsatish")
+        parser.add_argument('--profile', action='store_true', help="Bosqichlar vaqt jadvali va kritik yo'l")
+
+    def handle(self, *args, **options):
+        stages = set(options['stages'] or STAGE_DEPENDENCIES)
+        if options['with_deps']:
+            stages = with_dependencies(stages)
+        stages -= set(options['exclude'])
+        if not stages:
+            raise CommandError("Bajariladigan bosqich qolmadi")
+
+        if options['dry_run']:
+            for index, wave in enumerate(plan_waves(stages), start=1):
+                described = ", ".join(
+                    f"{name} (after {', '.join(stage_dependencies(name, stages))})"
+                    if stage_dependencies(name, stages) else name
+                    for name in wave
+                )
+                self.stdout.write(f"wave {index}: {described}")
+            return
+
+        def on_stage_done(name, outcome):
+            style = self.style.SUCCESS if outcome["status"] == SUCCEEDED else self.style.ERROR
+            rows = ", ".join(f"{key}={value}" for key, value in outcome["rows"].items())
+            if isinstance(outcome["result"], dict) and outcome["result"].get("unchanged_table"):
+                rows = "unchanged"
+            self.stdout.write(style(f"[GRIST_SYNC] {name}: {outcome['status']} in {outcome['seconds']:.2f}s {rows}"))
+
+        summary = run_sync(stages, workers=options['workers'], on_stage_done=on_stage_done, force=options['full'])
+        outcomes = summary["stages"]
+
+        if options['profile']:
+            self.print_profile(outcomes, stages, summary["wall_seconds"])
+
+        failed = sorted(name for name, outcome in outcomes.items() if outcome["status"] != SUCCEEDED)
+        if failed:
+            messages = [
+                f"{name}: {stage_message(outcomes[name]['result']) or outcomes[name]['status']}"
+                for name in failed
+            ]
+            raise CommandError("Grist sync failed - " + "; ".join(messages))
+        self.stdout.write(self.style.SUCCESS(f"Grist sync completed in {summary['wall_seconds']:.2f}s"))
+
+    def print_profile(self, outcomes, stages, wall_seconds):
+        self.stdout.write(
+            f"{'stage':<18}{'start':>9}{'end':>9}{'seconds':>10}{'http s':>9}{'http KB':>10}"
+            f"{'sql':>7}{'sql s':>8}{'rows/s':>10}{'mem MB':>9}  {'status':<10}after"
+        )
+        ordered = sorted(outcomes.items(), key=lambda item: (item[1].get("start", float("inf")), item[0]))
+        for name, outcome in ordered:
+            start = f"{outcome['start']:.2f}" if "start" in outcome else "-"
+            end = f"{outcome['end']:.2f}" if "end" in outcome else "-"
+            metrics = stage_metrics(outcome["result"]) or {}
+            self.stdout.write(
+                f"{name:<18}{start:>9}{end:>9}{outcome['seconds']:>10.2f}"
+                f"{self.metric(metrics, 'http_seconds', '.2f'):>9}"
+                f"{self.metric(metrics, 'http_bytes', '.0f', 1024):>10}"
+                f"{self.metric(metrics, 'sql_queries', 'd'):>7}"
+                f"{self.metric(metrics, 'sql_seconds', '.2f'):>8}"
+                f"{self.metric(metrics, 'rows_per_second', '.0f'):>10}"
+                f"{self.metric(metrics, 'memory_peak_mb', '.1f'):>9}"
+                f"  {outcome['status']:<10}{', '.join(stage_dependencies(name, stages)) or '-'}"
+            )
+        chain, chain_seconds = critical_path(outcomes, stages)
+        total = sum(outcome["seconds"] for outcome in outcomes.values())
+        self.stdout.write(f"Sum of stages:  {total:.2f}s")
+        self.stdout.write(f"Critical path:  {chain_seconds:.2f}s ({' -> '.join(chain)})")
+        self.stdout.write(f"Wall clock:     {wall_seconds:.2f}s")
+
+    @staticmethod
+    def metric(metrics, key, spec, divisor=None):
+        value = metrics.get(key)
+        if value is None:
+            return "-"
+        if divisor:
+            value = value / divisor
+        return format(value, spec)
@@ -0,0 +1,113 @@
+import json
+import sys
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from apps.v1.products.integrations.grist_client import GristAPIError, get_grist_client
+from apps.v1.products.models import GristWebhookEvent
+from apps.v1.products.services.grist_webhooks import WEBHOOK_SECRET, WEBHOOK_TABLES, process_webhook_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Grist webhook payload ini lokal qayta yuborish (jonli Grist siz): fayldan yoki "
+        "sozlangan Grist / stand-in dan ID bo'yicha olingan qatorlar webhook endpointiga POST qilinadi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=GristWebhookEvent.Table.values)
+        parser.add_argument('--file', help="Grist webhook payload JSON fayli ('-' - stdin)")
+        parser.add_argument('--ids', nargs='+', type=int, help="Grist jadvalidan shu ID dagi qatorlarni olish")
+        parser.add_argument(
+            '--set', action='append', default=[], metavar='COLUMN=VALUE',
+            help="Har bir qatorda ustun qiymatini almashtirish (JSON yoki matn), masalan --set price=1500000"
+        )
+        parser.add_argument('--repeat', type=int, default=1, help="Payload ni necha marta yuborish (burst)")
+        parser.add_argument('--url', help="Ishlayotgan server webhook URL i (standart: jarayon ichida test client)")
+        parser.add_argument('--secret', default=WEBHOOK_SECRET, help="Webhook secret (standart: ISell_GRIST_WEBHOOK_SECRET)")
+        parser.add_argument('--save', help="Tuzilgan payload ni shu faylga yozish")
+        parser.add_argument('--apply', action='store_true', help="Yuborilgach navbatdagi eventlarni darhol qo'llash")
+
+    def handle(self, *args, **options):
+        payload = self.build_payload(options)
+        if not payload:
+            raise CommandError("Payload bo'sh: --file yoki --ids bering")
+
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as fp:
+                json.dump(payload, fp, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Payload saved to {options['save']}")
+
+        headers = {"Authorization": f"Bearer {options['secret']}"} if options['secret'] else {}
+        for _ in range(options['repeat']):
+            status_code, body = self.post(options, payload, headers)
+            style = self.style.SUCCESS if status_code < 300 else self.style.ERROR
+            self.stdout.write(style(f"[GRIST_WEBHOOK] {options['table']}: {len(payload)} rows -> {status_code} {body}"))
+            if status_code >= 300:
+                raise CommandError("Webhook rejected the payload")
+
+        if options['apply']:
+            if options['url']:
+                self.stdout.write("--url bilan eventlar o'sha serverning import_worker ida qo'llanadi")
+                return
+            applied = 0
+            while True:
+                processed = process_webhook_events(stdout=self.stdout)
+                if not processed:
+                    break
+                applied += processed
+            self.stdout.write(self.style.SUCCESS(f"Applied events: {applied}"))
+
+    def build_payload(self, options):
+        if options['file']:
+            if options['file'] == '-':
+                payload = json.load(sys.stdin)
+            else:
+                with open(options['file'], encoding='utf-8') as fp:
+                    payload = json.load(fp)
+            if isinstance(payload, dict):
+                payload = payload.get("records", [])
+            # {"id", "fields"} ko'rinishidagi yozuvlar Grist webhook formatiga (tekis) keltiriladi
+            rows = [{"id": row["id"], **row["fields"]} if isinstance(row.get("fields"), dict) else dict(row) for row in payload]
+        elif options['ids']:
+            table_name = WEBHOOK_TABLES[options['table']]["grist_table"]
+            try:
+                records = get_grist_client().iter_table(table_name, filter={"id": options['ids']})
+                rows = [{"id": record["id"], **record.get("fields", {})} for record in records]
+            except GristAPIError as e:
+                raise CommandError(str(e))
+        else:
+            return []
+
+        overrides = {}
+        for item in options['set']:
+            column, _, value = item.partition('=')
+            if not column:
+                raise CommandError(f"Noto'g'ri --set: {item}")
+            try:
+                overrides[column] = json.loads(value)
+            except ValueError:
+                overrides[column] = value
+        for row in rows:
+            row.update(overrides)
+        return rows
+
+    def post(self, options, payload, headers):
+        if options['url']:
+            response = requests.post(options['url'], json=payload, headers=headers, timeout=30)
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text[:200]
+            return response.status_code, body
+
+        response = Client().post(
+            reverse('grist-webhook', args=[options['table']]),
+            data=json.dumps(payload),
+            content_type="application/json",
+            headers=headers,
+        )
+        return response.status_code, response.json()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.v1.products.services.import_jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Navbatdagi Grist import job larini va webhook eventlarini bajaruvchi worker (SELECT ... FOR UPDATE SKIP LOCKED)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Navbat bo'shagach chiqish")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Navbat bo'sh bo'lganda kutish (sekund)")
+
+    def handle(self, *args, **options):
+        processed = run_worker(once=options['once'], sleep=options['sleep'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Processed jobs: {processed}"))
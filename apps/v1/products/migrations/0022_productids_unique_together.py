@@ -0,0 +1,45 @@
+# Generated manually to remove duplicates before adding unique_together
+
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+
+def remove_duplicate_productids(apps, schema_editor):
+    ProductIDs = apps.get_model('products', 'ProductIDs')
+    
+    # Unikal kombinatsiyalarni saqlaymiz (eng eski yozuv qoladi)
+    seen_combinations = set()
+    to_delete = []
+    
+    all_ids = ProductIDs.objects.order_by('id').values_list('id', 'product_id', 'variation_name', 'variation_id')
+    
+    for pk, product_id, variation_name, variation_id in all_ids:
+        combination = (product_id, variation_name, variation_id)
+        
+        if combination in seen_combinations:
+            to_delete.append(pk)
+        else:
+            seen_combinations.add(combination)
+    
+    # Dublikatlarni o'chiramiz
+    if to_delete:
+        ProductIDs.objects.filter(id__in=to_delete).delete()
+        logger.info(f"Deleted {len(to_delete)} duplicate ProductIDs entries")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_productids, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='productids',
+            unique_together={('product', 'variation_name', 'variation_id')},
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated manually: ProductImages ga Grist attachment ID va kontent hash qo'shish
+
+import logging
+import re
+
+from django.db import migrations, models
+
+
+# Import qilingan fayllar nomi: products/product_<product_id>_<attachment_id>[_<suffix>].jpg
+IMPORTED_IMAGE_NAME = re.compile(r'(?:^|/)product_(\d+)_(\d+)(?:_[A-Za-z0-9]+)?\.jpg$')
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_attachment_ids(apps, schema_editor):
+    ProductImages = apps.get_model('products', 'ProductImages')
+    
+    # Avval import qilingan rasmlarga attachment ID ni fayl nomidan tiklaymiz,
+    # shunda keyingi import ularni qayta yuklab olmaydi
+    to_update = []
+    for product_image in ProductImages.objects.filter(grist_attachment_id__isnull=True).exclude(image='').only('id', 'product_id', 'image'):
+        match = IMPORTED_IMAGE_NAME.search(product_image.image.name or '')
+        if not match or int(match.group(1)) != product_image.product_id:
+            continue
+        product_image.grist_attachment_id = match.group(2)
+        to_update.append(product_image)
+    
+    if to_update:
+        ProductImages.objects.bulk_update(to_update, ['grist_attachment_id'], batch_size=500)
+        logger.info(f"Backfilled grist_attachment_id for {len(to_update)} ProductImages entries")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0022_productids_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimages',
+            name='grist_attachment_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='ID вложения в ГРИСТ'),
+        ),
+        migrations.AddField(
+            model_name='productimages',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='SHA-256 содержимого'),
+        ),
+        migrations.RunPython(backfill_attachment_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0023_productimages_grist_attachment_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banner',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Варианты изображения'),
+        ),
+        migrations.AddField(
+            model_name='productimages',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Варианты изображения'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:44
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0024_productimages_variants_banner_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('categories', 'Категории'), ('products', 'Продукты и детали'), ('characteristics', 'Свойства и характеристики'), ('images', 'Изображения'), ('advanced_payment', 'Advanced payment assessment'), ('tariffs', 'Тарифы')], max_length=32, verbose_name='Тип импорта')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('succeeded', 'Успешно'), ('failed', 'Ошибка')], db_index=True, default='queued', max_length=16, verbose_name='Статус')),
+                ('progress', models.JSONField(blank=True, default=dict, verbose_name='Прогресс по этапам')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Результат')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Ошибка')),
+                ('worker', models.CharField(blank=True, max_length=255, null=True, verbose_name='Обработчик')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата начала')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата завершения')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': '09. Задача импорта',
+                'verbose_name_plural': '09. Задачи импорта',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='products_im_status_876be6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0025_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GristSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(max_length=64, unique=True, verbose_name='Этап импорта')),
+                ('fingerprint', models.CharField(max_length=64, verbose_name='Отпечаток входных данных')),
+                ('row_count', models.IntegerField(default=0, verbose_name='Количество строк')),
+                ('tables', models.JSONField(blank=True, default=dict, verbose_name='Отпечатки таблиц')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата синхронизации')),
+            ],
+            options={
+                'verbose_name': '10. Состояние синхронизации ГРИСТ',
+                'verbose_name_plural': '10. Состояния синхронизации ГРИСТ',
+            },
+        ),
+        migrations.AddField(
+            model_name='productcategory',
+            name='grist_hash',
+            field=models.CharField(blank=True, max_length=16, null=True, verbose_name='Хэш строки ГРИСТ'),
+        ),
+        migrations.AddField(
+            model_name='productproperties',
+            name='grist_hash',
+            field=models.CharField(blank=True, max_length=16, null=True, verbose_name='Хэш строки ГРИСТ'),
+        ),
+    ]
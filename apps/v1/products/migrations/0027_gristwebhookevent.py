@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:52
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0026_gristsyncstate_grist_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GristWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(choices=[('price', 'Цены продуктов'), ('variations', 'Вариации'), ('product_property_values', 'Значения свойств продуктов'), ('property_values', 'Значения свойств'), ('tariffs', 'Тарифы')], max_length=32, verbose_name='Таблица ГРИСТ')),
+                ('records', models.JSONField(blank=True, default=list, verbose_name='Изменённые строки')),
+                ('row_count', models.IntegerField(default=0, verbose_name='Количество строк')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('processing', 'Обрабатывается'), ('applied', 'Применено'), ('failed', 'Ошибка')], db_index=True, default='queued', max_length=16, verbose_name='Статус')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Количество попыток')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Результат')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Ошибка')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата начала обработки')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата обработки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата получения')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': '11. Событие вебхука ГРИСТ',
+                'verbose_name_plural': '11. События вебхуков ГРИСТ',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='products_gr_status_8668f4_idx')],
+            },
+        ),
+    ]
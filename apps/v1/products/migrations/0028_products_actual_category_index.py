@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0027_gristwebhookevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['actual', 'category'], name='products_pr_actual_692051_idx'),
+        ),
+    ]
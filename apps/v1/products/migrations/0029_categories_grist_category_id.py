@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0028_products_actual_category_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categories',
+            name='grist_category_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='ID категории в ГРИСТ'),
+        ),
+        migrations.AddField(
+            model_name='categories',
+            name='grist_hash',
+            field=models.CharField(blank=True, max_length=16, null=True, verbose_name='Хэш строки ГРИСТ'),
+        ),
+        migrations.AddField(
+            model_name='categories',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='Активна'),
+        ),
+    ]
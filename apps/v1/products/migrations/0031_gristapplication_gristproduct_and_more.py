@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0030_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GristApplication',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grist_application_id', models.IntegerField(unique=True, verbose_name='ID заявки в ГРИСТ')),
+                ('risk_category_id', models.CharField(blank=True, max_length=255, null=True, verbose_name='ID рисковой категории в ГРИСТ')),
+                ('grist_hash', models.CharField(blank=True, max_length=16, null=True, verbose_name='Хэш строки ГРИСТ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': '13. Заявка ГРИСТ',
+                'verbose_name_plural': '13. Заявки ГРИСТ',
+            },
+        ),
+        migrations.CreateModel(
+            name='GristProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grist_product_id', models.IntegerField(unique=True, verbose_name='ID продукта в ГРИСТ')),
+                ('price_category_id', models.CharField(blank=True, max_length=255, null=True, verbose_name='ID ценовой категории в ГРИСТ')),
+                ('grist_hash', models.CharField(blank=True, max_length=16, null=True, verbose_name='Хэш строки ГРИСТ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': '15. Продукт ГРИСТ',
+                'verbose_name_plural': '15. Продукты ГРИСТ',
+            },
+        ),
+        migrations.AlterField(
+            model_name='gristwebhookevent',
+            name='table',
+            field=models.CharField(choices=[('price', 'Цены продуктов'), ('variations', 'Вариации'), ('product_property_values', 'Значения свойств продуктов'), ('property_values', 'Значения свойств'), ('tariffs', 'Тарифы'), ('applications', 'Заявки'), ('grist_products', 'Продукты ГРИСТ')], max_length=32, verbose_name='Таблица ГРИСТ'),
+        ),
+        migrations.CreateModel(
+            name='GristApplicationProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grist_product_id', models.IntegerField(db_index=True, verbose_name='ID продукта в ГРИСТ')),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products', to='products.gristapplication', verbose_name='Заявка')),
+            ],
+            options={
+                'verbose_name': '14. Продукт заявки ГРИСТ',
+                'verbose_name_plural': '14. Продукты заявок ГРИСТ',
+            },
+        ),
+    ]
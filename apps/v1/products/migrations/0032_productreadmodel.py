@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0031_gristapplication_gristproduct_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductReadModel',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='read_model', serialize=False, to='products.products', verbose_name='Продукт')),
+                ('name', models.CharField(blank=True, max_length=255, null=True, verbose_name='Название продукта')),
+                ('actual', models.BooleanField(default=True, verbose_name='Актуальный')),
+                ('payload', models.TextField(verbose_name='JSON продукта')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.categories', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': '16. Витрина продукта',
+                'verbose_name_plural': '16. Витрина продуктов',
+                'indexes': [models.Index(fields=['actual', 'category'], name='products_pr_actual_86b0c1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0032_productreadmodel'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productreadmodel',
+            name='products_pr_actual_86b0c1_idx',
+        ),
+        migrations.AddField(
+            model_name='productreadmodel',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Цена'),
+        ),
+        migrations.AddIndex(
+            model_name='productreadmodel',
+            index=models.Index(fields=['actual', 'category', 'product'], name='products_pr_actual_23696a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreadmodel',
+            index=models.Index(fields=['actual', 'price', 'product'], name='products_pr_actual_3f2f93_idx'),
+        ),
+    ]
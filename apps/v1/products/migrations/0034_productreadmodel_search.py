@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:11
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0033_remove_productreadmodel_products_pr_actual_86b0c1_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productreadmodel',
+            name='search_keywords',
+            field=models.TextField(blank=True, default='', verbose_name='Ключевые слова для поиска'),
+        ),
+        migrations.AddField(
+            model_name='productreadmodel',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, null=True, verbose_name='Поисковый вектор'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:11
+
+import logging
+
+import django.contrib.postgres.indexes
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+NAME_TRIGRAM_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['name'], name='products_readmodel_name_trgm', opclasses=['gin_trgm_ops']
+)
+
+
+def create_name_trigram_index(apps, schema_editor):
+    # pg_trgm postgresql-contrib paketida; u bo'lmasa (yoki huquq yetmasa) qidiruv trigram siz ishlaydi
+    try:
+        with transaction.atomic():
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            schema_editor.add_index(apps.get_model('products', 'ProductReadModel'), NAME_TRIGRAM_INDEX)
+    except DatabaseError as e:
+        logger.warning(f"pg_trgm is not available, name trigram index skipped: {e}")
+
+
+def drop_name_trigram_index(apps, schema_editor):
+    schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(NAME_TRIGRAM_INDEX.name)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0034_productreadmodel_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productreadmodel',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='products_pr_search__bba672_gin'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='productreadmodel', index=NAME_TRIGRAM_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_name_trigram_index, drop_name_trigram_index),
+            ],
+        ),
+    ]
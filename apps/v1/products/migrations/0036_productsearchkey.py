@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0035_productreadmodel_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=64, verbose_name='Поисковый ключ')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_keys', to='products.products', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': '17. Поисковый ключ продукта',
+                'verbose_name_plural': '17. Поисковые ключи продуктов',
+                'unique_together': {('product', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0036_productsearchkey'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='kind',
+            field=models.CharField(choices=[('categories', 'Категории'), ('products', 'Продукты и детали'), ('characteristics', 'Свойства и характеристики'), ('images', 'Изображения'), ('advanced_payment', 'Advanced payment assessment'), ('tariffs', 'Тарифы'), ('image_variants', 'Варианты изображений')], max_length=32, verbose_name='Тип импорта'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0037_alter_importjob_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='force',
+            field=models.BooleanField(default=False, verbose_name='Принудительный импорт'),
+        ),
+    ]
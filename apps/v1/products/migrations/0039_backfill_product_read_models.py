@@ -0,0 +1,14 @@
+# Generated manually to fill ProductReadModel for products imported before it existed
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Migratsiya joriy kodni (ProductsSerializer) import qilmasligi uchun to'ldirish import yo'liga ko'chirilgan:
+    # refresh_after_import read modeli yo'q productlarni qo'shadi (yoki build_product_read_models)
+
+    dependencies = [
+        ('products', '0038_importjob_force'),
+    ]
+
+    operations = []
@@ -0,0 +1,14 @@
+# Generated manually to drop Categories bookkeeping fields from pre-rendered product payloads
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Qayta render import yo'lida bajariladi: READ_MODEL_RENDER_VERSION saqlanganidan katta bo'lsa
+    # refresh_after_import butun katalogni qayta quradi (yoki build_product_read_models)
+
+    dependencies = [
+        ('products', '0039_backfill_product_read_models'),
+    ]
+
+    operations = []
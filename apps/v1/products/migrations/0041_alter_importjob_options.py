@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0040_rerender_product_read_models'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='importjob',
+            options={'ordering': ['-created_at'], 'verbose_name': '18. Задача импорта', 'verbose_name_plural': '18. Задачи импорта'},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0041_alter_importjob_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gristsyncstate',
+            name='groups',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Хэши групп строк'),
+        ),
+    ]
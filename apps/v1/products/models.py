@@ -1,10 +1,16 @@
 from tabnanny import verbose
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 
 class Categories(models.Model):
     name = models.CharField(max_length=255, null=True, blank=True, verbose_name="Название категории")
     description = models.TextField(null=True, blank=True, verbose_name="Описание категории")
+    grist_category_id = models.CharField(max_length=255, null=True, blank=True, db_index=True, verbose_name="ID категории в ГРИСТ")
+    grist_hash = models.CharField(max_length=16, null=True, blank=True, verbose_name="Хэш строки ГРИСТ")
+    is_active = models.BooleanField(default=True, verbose_name="Активна")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
     
@@ -23,6 +29,7 @@ class ProductCategory(models.Model):
     grist_product_category_id = models.CharField(max_length=255, null=True, blank=True, verbose_name="ID категории в ГРИСТ")
     grist_risk_category_id = models.CharField(max_length=255, null=True, blank=True, verbose_name="ID рисковой категории в ГРИСТ")
     grist_price_category_id = models.CharField(max_length=255, null=True, blank=True, verbose_name="ID цены категории в ГРИСТ")
+    grist_hash = models.CharField(max_length=16, null=True, blank=True, verbose_name="Хэш строки ГРИСТ")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
     
@@ -52,6 +59,10 @@ class Products(models.Model):
     class Meta:
         verbose_name = "03. Продукт"
         verbose_name_plural = "03. Продукты"
+        indexes = [
+            # Katalog faqat aktual productlarni (kategoriya bo'yicha) ko'rsatadi
+            models.Index(fields=['actual', 'category']),
+        ]
         
 
 class ProductIDs(models.Model):
@@ -67,11 +78,15 @@ class ProductIDs(models.Model):
     class Meta:
         verbose_name = "09. Вариация продукта"
         verbose_name_plural = "09. Вариации продукта"
+        unique_together = [['product', 'variation_name', 'variation_id']]
 
 
 class ProductImages(models.Model):
     product = models.ForeignKey(Products, on_delete=models.CASCADE, related_name="images", verbose_name="Продукт")
     image = models.ImageField(upload_to="products/", null=True, blank=True, verbose_name="Изображение")
+    grist_attachment_id = models.CharField(max_length=255, null=True, blank=True, db_index=True, verbose_name="ID вложения в ГРИСТ")
+    content_hash = models.CharField(max_length=64, null=True, blank=True, verbose_name="SHA-256 содержимого")
+    variants = models.JSONField(default=dict, blank=True, verbose_name="Варианты изображения")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
     
@@ -106,6 +121,7 @@ class ProductProperties(models.Model):
     name = models.CharField(max_length=255, null=True, blank=True, verbose_name="Название свойства")
     type = models.CharField(max_length=255, null=True, blank=True, verbose_name="Тип свойства")
     grist_property_id = models.CharField(max_length=255, null=True, blank=True, verbose_name="ID свойства в ГРИСТ")
+    grist_hash = models.CharField(max_length=16, null=True, blank=True, verbose_name="Хэш строки ГРИСТ")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
     
@@ -137,6 +153,7 @@ class Banner(models.Model):
     description = models.TextField(null=True, blank=True, verbose_name="Описание баннера")
     link = models.URLField(null=True, blank=True, verbose_name="Ссылка на баннер")
     image = models.ImageField(upload_to="banners/", null=True, blank=True, verbose_name="Изображение")
+    variants = models.JSONField(default=dict, blank=True, verbose_name="Варианты изображения")
     is_active = models.BooleanField(default=True, verbose_name="Активный")
     order = models.IntegerField(default=0, verbose_name="Порядок")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
@@ -147,4 +164,198 @@ class Banner(models.Model):
     
     class Meta:
         verbose_name = "08. Баннер"
-        verbose_name_plural = "08. Баннеры"
\ No newline at end of file
+        verbose_name_plural = "08. Баннеры"
+
+
+class ImportJob(models.Model):
+    
+    class Kind(models.TextChoices):
+        CATEGORIES = 'categories', 'Категории'
+        PRODUCTS = 'products', 'Продукты и детали'
+        CHARACTERISTICS = 'characteristics', 'Свойства и характеристики'
+        IMAGES = 'images', 'Изображения'
+        ADVANCED_PAYMENT = 'advanced_payment', 'Advanced payment assessment'
+        TARIFFS = 'tariffs', 'Тарифы'
+        IMAGE_VARIANTS = 'image_variants', 'Варианты изображений'
+    
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        SUCCEEDED = 'succeeded', 'Успешно'
+        FAILED = 'failed', 'Ошибка'
+    
+    kind = models.CharField(max_length=32, choices=Kind.choices, verbose_name="Тип импорта")
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED, db_index=True, verbose_name="Статус")
+    force = models.BooleanField(default=False, verbose_name="Принудительный импорт")
+    progress = models.JSONField(default=dict, blank=True, verbose_name="Прогресс по этапам")
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Результат")
+    error = models.TextField(null=True, blank=True, verbose_name="Ошибка")
+    worker = models.CharField(max_length=255, null=True, blank=True, verbose_name="Обработчик")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата начала")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата завершения")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.get_status_display()})"
+    
+    class Meta:
+        verbose_name = "18. Задача импорта"
+        verbose_name_plural = "18. Задачи импорта"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class GristSyncState(models.Model):
+    stage = models.CharField(max_length=64, unique=True, verbose_name="Этап импорта")
+    fingerprint = models.CharField(max_length=64, verbose_name="Отпечаток входных данных")
+    row_count = models.IntegerField(default=0, verbose_name="Количество строк")
+    tables = models.JSONField(default=dict, blank=True, verbose_name="Отпечатки таблиц")
+    groups = models.JSONField(default=dict, blank=True, verbose_name="Хэши групп строк")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата синхронизации")
+    
+    def __str__(self):
+        return f"{self.stage} ({self.row_count})"
+    
+    class Meta:
+        verbose_name = "10. Состояние синхронизации ГРИСТ"
+        verbose_name_plural = "10. Состояния синхронизации ГРИСТ"
+
+
+class GristWebhookEvent(models.Model):
+    
+    class Table(models.TextChoices):
+        PRICE = 'price', 'Цены продуктов'
+        VARIATIONS = 'variations', 'Вариации'
+        PRODUCT_PROPERTY_VALUES = 'product_property_values', 'Значения свойств продуктов'
+        PROPERTY_VALUES = 'property_values', 'Значения свойств'
+        TARIFFS = 'tariffs', 'Тарифы'
+        APPLICATIONS = 'applications', 'Заявки'
+        GRIST_PRODUCTS = 'grist_products', 'Продукты ГРИСТ'
+    
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'В очереди'
+        PROCESSING = 'processing', 'Обрабатывается'
+        APPLIED = 'applied', 'Применено'
+        FAILED = 'failed', 'Ошибка'
+    
+    table = models.CharField(max_length=32, choices=Table.choices, verbose_name="Таблица ГРИСТ")
+    records = models.JSONField(default=list, blank=True, verbose_name="Изменённые строки")
+    row_count = models.IntegerField(default=0, verbose_name="Количество строк")
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED, db_index=True, verbose_name="Статус")
+    attempts = models.IntegerField(default=0, verbose_name="Количество попыток")
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Результат")
+    error = models.TextField(null=True, blank=True, verbose_name="Ошибка")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата начала обработки")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата обработки")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата получения")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+    
+    def __str__(self):
+        return f"{self.get_table_display()} #{self.id} ({self.get_status_display()})"
+    
+    class Meta:
+        verbose_name = "11. Событие вебхука ГРИСТ"
+        verbose_name_plural = "11. События вебхуков ГРИСТ"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class DataVersion(models.Model):
+    name = models.CharField(max_length=64, unique=True, verbose_name="Набор данных")
+    version = models.BigIntegerField(default=0, verbose_name="Версия")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+    
+    class Meta:
+        verbose_name = "12. Версия данных"
+        verbose_name_plural = "12. Версии данных"
+
+
+class GristApplication(models.Model):
+    grist_application_id = models.IntegerField(unique=True, verbose_name="ID заявки в ГРИСТ")
+    risk_category_id = models.CharField(max_length=255, null=True, blank=True, verbose_name="ID рисковой категории в ГРИСТ")
+    grist_hash = models.CharField(max_length=16, null=True, blank=True, verbose_name="Хэш строки ГРИСТ")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+    
+    def __str__(self):
+        return f"Заявка #{self.grist_application_id}"
+    
+    class Meta:
+        verbose_name = "13. Заявка ГРИСТ"
+        verbose_name_plural = "13. Заявки ГРИСТ"
+
+
+class GristApplicationProduct(models.Model):
+    application = models.ForeignKey(GristApplication, on_delete=models.CASCADE, related_name='products', verbose_name="Заявка")
+    grist_product_id = models.IntegerField(db_index=True, verbose_name="ID продукта в ГРИСТ")
+    
+    def __str__(self):
+        return f"{self.application} - {self.grist_product_id}"
+    
+    class Meta:
+        verbose_name = "14. Продукт заявки ГРИСТ"
+        verbose_name_plural = "14. Продукты заявок ГРИСТ"
+
+
+class GristProduct(models.Model):
+    grist_product_id = models.IntegerField(unique=True, verbose_name="ID продукта в ГРИСТ")
+    price_category_id = models.CharField(max_length=255, null=True, blank=True, verbose_name="ID ценовой категории в ГРИСТ")
+    grist_hash = models.CharField(max_length=16, null=True, blank=True, verbose_name="Хэш строки ГРИСТ")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+    
+    def __str__(self):
+        return f"Продукт ГРИСТ #{self.grist_product_id}"
+    
+    class Meta:
+        verbose_name = "15. Продукт ГРИСТ"
+        verbose_name_plural = "15. Продукты ГРИСТ"
+
+
+class ProductReadModel(models.Model):
+    product = models.OneToOneField(Products, on_delete=models.CASCADE, primary_key=True, related_name="read_model", verbose_name="Продукт")
+    category = models.ForeignKey(Categories, on_delete=models.CASCADE, related_name="+", verbose_name="Категория")
+    name = models.CharField(max_length=255, null=True, blank=True, verbose_name="Название продукта")
+    actual = models.BooleanField(default=True, verbose_name="Актуальный")
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Цена")
+    payload = models.TextField(verbose_name="JSON продукта")
+    search_keywords = models.TextField(blank=True, default="", verbose_name="Ключевые слова для поиска")
+    search_vector = SearchVectorField(null=True, blank=True, verbose_name="Поисковый вектор")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+    
+    def __str__(self):
+        return self.name or "Неизвестный продукт"
+    
+    class Meta:
+        verbose_name = "16. Витрина продукта"
+        verbose_name_plural = "16. Витрина продуктов"
+        indexes = [
+            # Keyset pagination kalitlari: (category_id, id) va (price, id)
+            models.Index(fields=['actual', 'category', 'product']),
+            models.Index(fields=['actual', 'price', 'product']),
+            # Qidiruv: to'liq matn (tsvector) va nom bo'yicha xatoga chidamli (pg_trgm)
+            GinIndex(fields=['search_vector']),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='products_readmodel_name_trgm'),
+        ]
+
+
+class ProductSearchKey(models.Model):
+    product = models.ForeignKey(Products, on_delete=models.CASCADE, related_name="search_keys", verbose_name="Продукт")
+    key = models.CharField(max_length=64, db_index=True, verbose_name="Поисковый ключ")
+    
+    def __str__(self):
+        return self.key
+    
+    class Meta:
+        verbose_name = "17. Поисковый ключ продукта"
+        verbose_name_plural = "17. Поисковые ключи продуктов"
+        unique_together = [['product', 'key']]
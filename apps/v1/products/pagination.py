@@ -0,0 +1,138 @@
+import base64
+import json
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Indeksli kalit bo'yicha cursor (keyset) pagination: orderings - tartib nomi -> kalit maydonlari (oxirgisi unikal)"""
+
+    orderings = {}
+    default_ordering = None
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = "Неверный курсор"
+
+    def __init__(self, orderings=None, default_ordering=None):
+        if orderings is not None:
+            self.orderings = orderings
+        self.default_ordering = default_ordering or self.default_ordering or next(iter(self.orderings))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param) or self.default_ordering
+        if ordering.lstrip('-') not in self.orderings:
+            ordering = self.default_ordering
+        return ordering
+
+    def encode_cursor(self, ordering, reverse, key):
+        payload = json.dumps({"o": ordering, "r": reverse, "k": key}, default=str, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, token):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            ordering, reverse, key = payload["o"], bool(payload["r"]), list(payload["k"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(ordering, str) or ordering.lstrip('-') not in self.orderings:
+            raise NotFound(self.invalid_cursor_message)
+        if len(key) != len(self.orderings[ordering.lstrip('-')]):
+            raise NotFound(self.invalid_cursor_message)
+        return ordering, reverse, key
+
+    def parse_key(self, model, fields, key):
+        """
+        Cursor kaliti qiymatlarini model maydonlari turiga keltirish (masalan
+        narx matni -> Decimal). Tur mos kelmasa yoki qiymat bo'sh bo'lsa NotFound.
+        """
+        values = []
+        for field, value in zip(fields, key):
+            if value is None or isinstance(value, (bool, list, dict)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                values.append(model._meta.get_field(field).to_python(value))
+            except (FieldDoesNotExist, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def after(fields, key, descending):
+        """(f1, f2, ...) > key (descending bo'lsa <) sharti"""
+        lookup = "lt" if descending else "gt"
+        conditions = []
+        for index, field in enumerate(fields):
+            equal = {fields[i]: key[i] for i in range(index)}
+            conditions.append(Q(**equal, **{f"{field}__{lookup}": key[index]}))
+        return reduce(lambda left, right: left | right, conditions)
+
+    @staticmethod
+    def row_key(row, fields):
+        if isinstance(row, dict):
+            return [row[field] for field in fields]
+        return [getattr(row, field) for field in fields]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            self.ordering, reverse, key = self.decode_cursor(token)
+        else:
+            self.ordering, reverse, key = self.get_ordering(request), False, None
+
+        fields = self.orderings[self.ordering.lstrip('-')]
+        descending = self.ordering.startswith('-')
+        # Oldingi sahifa teskari tartibda olinadi va keyin qaytariladi
+        scan_descending = descending != reverse
+
+        if key is not None:
+            key = self.parse_key(queryset.model, fields, key)
+            queryset = queryset.filter(self.after(fields, key, scan_descending))
+        queryset = queryset.order_by(*(f"-{field}" if scan_descending else field for field in fields))
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Cursor dan kelingan bo'lsa, kelingan tomonda ham sahifa bor
+        if reverse:
+            has_next, has_previous = key is not None, has_more
+        else:
+            has_next, has_previous = has_more, key is not None
+        self.next_key = self.row_key(rows[-1], fields) if rows and has_next else None
+        self.previous_key = self.row_key(rows[0], fields) if rows and has_previous else None
+        return rows
+
+    def get_link(self, key, reverse):
+        if key is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        url = remove_query_param(url, self.ordering_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.ordering, reverse, key))
+
+    def get_next_link(self):
+        return self.get_link(self.next_key, False)
+
+    def get_previous_link(self):
+        return self.get_link(self.previous_key, True)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data})
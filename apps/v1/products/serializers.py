@@ -1,11 +1,13 @@
 from rest_framework import serializers
 from apps.v1.products.models import Categories, Products, ProductDetails, ProductIDs, ProductImages, ProductCharacteristics, ProductProperties, Banner
+from apps.v1.products.services.image_variants import VARIANT_FORMATS, VARIANT_SIZES
 
 
 class CategoriesSerializer(serializers.ModelSerializer):
     class Meta:
         model = Categories
-        fields = '__all__'  
+        # grist_category_id, grist_hash, is_active - import uchun xizmat maydonlari, API da ko'rsatilmaydi
+        fields = ['id', 'name', 'description', 'created_at', 'updated_at']
         
 
 class ProductDetailsSerializer(serializers.ModelSerializer):
@@ -19,12 +21,39 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
         ]
 
 
-class ProductImagesSerializer(serializers.ModelSerializer):
+class ImageVariantsMixin:
+    """Pre-generated image variants: {variant: {width, height, webp, jpeg}} with absolute URLs"""
+    
+    def get_variants(self, obj):
+        variants = obj.variants or {}
+        if not obj.image or variants.get("source") != obj.image.name:
+            return {}
+        
+        storage = obj.image.storage
+        request = self.context.get('request')
+        result = {}
+        for variant in VARIANT_SIZES:
+            data = variants.get(variant)
+            if not data:
+                continue
+            item = {"width": data.get("width"), "height": data.get("height")}
+            for key in VARIANT_FORMATS:
+                if data.get(key):
+                    url = storage.url(data[key])
+                    item[key] = request.build_absolute_uri(url) if request else url
+            result[variant] = item
+        return result
+
+
+class ProductImagesSerializer(ImageVariantsMixin, serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+    
     class Meta:
         model = ProductImages
         fields = [
             'id',
             'image',
+            'variants',
             'product'
         ]
 
@@ -114,7 +143,8 @@ class ProductDetailFilterSerializer(serializers.Serializer):
     characteristics = CharacteristicsGroupSerializer(many=True)
     
 
-class BannerSerializer(serializers.ModelSerializer):
+class BannerSerializer(ImageVariantsMixin, serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Banner
@@ -124,6 +154,7 @@ class BannerSerializer(serializers.ModelSerializer):
             'description',
             'link',
             'image',
+            'variants',
             'is_active',
             'order'
         ]
\ No newline at end of file
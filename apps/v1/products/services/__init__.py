@@ -0,0 +1,3 @@
+from .image_variants import generate_variants, render_variants
+
+__all__ = ['generate_variants', 'render_variants']
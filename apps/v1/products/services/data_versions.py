@@ -0,0 +1,21 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from apps.v1.products.models import DataVersion
+
+
+def get_version(name):
+    """Ma'lumotlar to'plamining joriy versiyasi (hali o'zgartirilmagan bo'lsa 0)"""
+    return DataVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+
+def bump_version(name):
+    """Versiyani atomik UPDATE bilan bittaga oshirish (barcha jarayonlardagi keshlar eskirgan bo'ladi)"""
+    if not DataVersion.objects.filter(name=name).update(version=F('version') + 1):
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(name=name, version=1)
+        except IntegrityError:
+            # Qatorni parallel jarayon yaratib ulgurdi
+            DataVersion.objects.filter(name=name).update(version=F('version') + 1)
+    return get_version(name)
@@ -0,0 +1,151 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from apps.v1.products.services.import_jobs import IMPORT_STAGES, import_lock, is_stage_success, stage_rows
+from apps.v1.products.services.product_read_model import refresh_after_import, suspend_signal_refresh
+
+logger = logging.getLogger(__name__)
+
+# Bosqich -> u kutadigan bosqichlar (natijasi bazaga yozilgan bo'lishi kerak)
+STAGE_DEPENDENCIES = {
+    "categories": [],
+    "tariffs": [],
+    "properties": [],
+    "advanced_payment": [],
+    # advanced_payment bilan bir xil import turi (bitta advisory lock) - parallel boshlanmasligi kerak
+    "quote_tables": ["advanced_payment"],
+    "products": ["categories"],
+    "details": ["products"],
+    "characteristics": ["products", "properties"],
+    "images": ["products"],
+    "variants": ["images"],
+}
+
+# Bosqich -> funksiya yo'li va import turi (advisory lock uchun) IMPORT_STAGES dan olinadi
+STAGE_FUNCTIONS = {name: path for stages in IMPORT_STAGES.values() for name, path in stages}
+STAGE_KINDS = {name: kind for kind, stages in IMPORT_STAGES.items() for name, _ in stages}
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def with_dependencies(stages):
+    """Tanlangan bosqichlarga ularning barcha bog'liqliklarini qo'shish"""
+    selected = set()
+    queue = list(stages)
+    while queue:
+        name = queue.pop()
+        if name in selected:
+            continue
+        selected.add(name)
+        queue.extend(STAGE_DEPENDENCIES[name])
+    return selected
+
+
+def stage_dependencies(name, stages):
+    # Tanlanmagan bog'liqliklar bazada allaqachon bor deb hisoblanadi
+    return [dependency for dependency in STAGE_DEPENDENCIES[name] if dependency in stages]
+
+
+def plan_waves(stages):
+    """Bosqichlarni to'lqinlarga ajratish (dry-run uchun): har bir to'lqin oldingilariga bog'liq"""
+    remaining = set(stages)
+    done = set()
+    waves = []
+    while remaining:
+        wave = sorted(name for name in remaining if set(stage_dependencies(name, stages)) <= done)
+        if not wave:
+            raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+        waves.append(wave)
+        done.update(wave)
+        remaining.difference_update(wave)
+    return waves
+
+
+def critical_path(outcomes, stages):
+    """Eng uzun (vaqt bo'yicha) bog'liqlik zanjiri: (bosqichlar, sekund)"""
+    best = {}
+
+    def longest(name):
+        if name not in best:
+            seconds = outcomes.get(name, {}).get("seconds", 0.0)
+            chains = [longest(dependency) for dependency in stage_dependencies(name, stages)]
+            chain, total = max(chains, key=lambda item: item[1], default=([], 0.0))
+            best[name] = (chain + [name], total + seconds)
+        return best[name]
+
+    return max((longest(name) for name in stages), key=lambda item: item[1], default=([], 0.0))
+
+
+def run_stage(name, origin, force=False):
+    """Bitta bosqichni o'z oqimida (va o'z DB ulanishida) bajarish (force=True - fingerprint e'tiborsiz)"""
+    started = time.monotonic()
+    try:
+        with import_lock(STAGE_KINDS[name]) as acquired:
+            if not acquired:
+                result = {"success": False, "message": "Импорт этого типа уже выполняется в другом процессе"}
+            else:
+                with suspend_signal_refresh():
+                    result = import_string(STAGE_FUNCTIONS[name])(force=force)
+    except Exception as e:
+        logger.exception(f"Sync stage {name} failed: {e}")
+        result = {"success": False, "message": f"Error: {str(e)}"}
+    finally:
+        # Oqim tugaganda ulanish yopiladi (Django har bir oqimga alohida ulanish ochadi)
+        connection.close()
+
+    finished = time.monotonic()
+    return {
+        "status": SUCCEEDED if is_stage_success(result) else FAILED,
+        "result": result,
+        "rows": stage_rows(result),
+        "start": round(started - origin, 3),
+        "end": round(finished - origin, 3),
+        "seconds": round(finished - started, 3),
+    }
+
+
+def run_sync(stages, workers=None, on_stage_done=None, force=False):
+    """Bosqichlarni bog'liqlik grafi bo'yicha parallel bajarish (kirishi muvaffaqiyatsiz bosqich "skipped")"""
+    stages = set(stages)
+    plan_waves(stages)  # sikl yo'qligini tekshirish
+
+    origin = time.monotonic()
+    outcomes = {}
+    pending = set(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers or len(stages) or 1) as executor:
+        while pending or running:
+            for name in sorted(pending):
+                dependencies = stage_dependencies(name, stages)
+                statuses = [outcomes[dependency]["status"] for dependency in dependencies if dependency in outcomes]
+                if any(status != SUCCEEDED for status in statuses):
+                    pending.discard(name)
+                    outcomes[name] = {"status": SKIPPED, "result": None, "rows": {}, "seconds": 0.0}
+                    if on_stage_done:
+                        on_stage_done(name, outcomes[name])
+                elif len(statuses) == len(dependencies):
+                    pending.discard(name)
+                    running[executor.submit(run_stage, name, origin, force)] = name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                outcomes[name] = future.result()
+                if on_stage_done:
+                    on_stage_done(name, outcomes[name])
+
+    # Read model barcha bosqichlardan keyin bir marta yangilanadi
+    refresh_after_import(
+        (STAGE_KINDS[name], outcome["result"]) for name, outcome in outcomes.items() if outcome["status"] != SKIPPED
+    )
+    return {"stages": outcomes, "wall_seconds": round(time.monotonic() - origin, 3)}
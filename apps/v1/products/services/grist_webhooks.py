@@ -0,0 +1,195 @@
+import logging
+import os
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.v1.products.models import GristWebhookEvent, ImportJob
+from apps.v1.products.services.import_jobs import import_lock
+from apps.v1.products.services.product_read_model import refresh_after_import, suspend_signal_refresh
+
+logger = logging.getLogger(__name__)
+
+
+# Webhook jadvali -> Grist jadvali, qo'llovchi funksiya va import turi (advisory lock uchun).
+# Tartib muhim: narx jadvali ProductIDs ni yaratadi, variations va characteristics ularga tayanadi.
+WEBHOOK_TABLES = {
+    GristWebhookEvent.Table.PRICE: {
+        "grist_table": os.getenv('ISell_PRODUCT_PRICE'),
+        "handler": "apps.v1.products.integrations.product_lists.apply_price_rows",
+        "kind": ImportJob.Kind.PRODUCTS,
+    },
+    GristWebhookEvent.Table.VARIATIONS: {
+        "grist_table": os.getenv('ISell_PRODUCT_VARIATIONS'),
+        "handler": "apps.v1.products.integrations.product_lists.apply_variation_rows",
+        "kind": ImportJob.Kind.PRODUCTS,
+    },
+    GristWebhookEvent.Table.PRODUCT_PROPERTY_VALUES: {
+        "grist_table": os.getenv('ISell_PRODUCT_PROPERTY_VALUE'),
+        "handler": "apps.v1.products.integrations.product_lists.apply_product_property_value_rows",
+        "kind": ImportJob.Kind.CHARACTERISTICS,
+    },
+    GristWebhookEvent.Table.PROPERTY_VALUES: {
+        "grist_table": os.getenv('ISell_PROPERTY_VALUE'),
+        "handler": "apps.v1.products.integrations.product_lists.apply_property_value_rows",
+        "kind": ImportJob.Kind.CHARACTERISTICS,
+    },
+    GristWebhookEvent.Table.TARIFFS: {
+        "grist_table": os.getenv('ISell_TARIFFS'),
+        "handler": "apps.v1.order.integrations.order_list.apply_tariff_rows",
+        "kind": ImportJob.Kind.TARIFFS,
+    },
+    GristWebhookEvent.Table.APPLICATIONS: {
+        "grist_table": os.getenv('ISell_APPLICATION'),
+        "handler": "apps.v1.order.integrations.advanced_payment_assessment.apply_application_rows",
+        "kind": ImportJob.Kind.ADVANCED_PAYMENT,
+    },
+    GristWebhookEvent.Table.GRIST_PRODUCTS: {
+        "grist_table": os.getenv('ISell_PRODUCTS'),
+        "handler": "apps.v1.order.integrations.advanced_payment_assessment.apply_grist_product_rows",
+        "kind": ImportJob.Kind.ADVANCED_PAYMENT,
+    },
+}
+
+WEBHOOK_SECRET = os.getenv('ISell_GRIST_WEBHOOK_SECRET')
+
+# Bitta o'tishda olinadigan eventlar soni; muvaffaqiyatsiz event necha marta va qancha
+# kutib qayta urinadi
+WEBHOOK_BATCH_SIZE = int(os.getenv('ISell_GRIST_WEBHOOK_BATCH_SIZE', 200))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('ISell_GRIST_WEBHOOK_MAX_ATTEMPTS', 5))
+WEBHOOK_RETRY_DELAY = timedelta(seconds=int(os.getenv('ISell_GRIST_WEBHOOK_RETRY_SECONDS', 30)))
+
+# Shuncha vaqtdan beri "processing" holatidagi webhook eventlari ishlovchisi o'lgan deb hisoblanadi
+STALE_JOB_TIMEOUT = timedelta(minutes=int(os.getenv('ISell_IMPORT_STALE_MINUTES', 60)))
+
+
+def normalize_records(payload):
+    """Grist webhook payload ini ``[{"id": ..., "fields": {...}}]`` ko'rinishiga keltirish"""
+    if isinstance(payload, dict):
+        payload = payload.get("records", [])
+    if not isinstance(payload, list):
+        raise ValueError("Webhook payload must be a list of records")
+
+    records = []
+    for row in payload:
+        if not isinstance(row, dict) or row.get("id") is None:
+            continue
+        if isinstance(row.get("fields"), dict):
+            fields = dict(row["fields"])
+        else:
+            fields = {key: value for key, value in row.items() if key not in ("id", "manualSort")}
+        records.append({"id": row["id"], "fields": fields})
+    return records
+
+
+def enqueue_webhook(table, payload):
+    """Webhook qatorlarini navbatga yozish (qo'llash import_worker da bajariladi)"""
+    records = normalize_records(payload)
+    return GristWebhookEvent.objects.create(table=table, records=records, row_count=len(records))
+
+
+def claim_webhook_events(limit=None):
+    """Navbatdagi eventlarni olish (SELECT ... FOR UPDATE SKIP LOCKED, eski eventlar birinchi)"""
+    with transaction.atomic():
+        events = list(
+            GristWebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=GristWebhookEvent.Status.QUEUED)
+            .filter(Q(processed_at__isnull=True) | Q(processed_at__lte=timezone.now() - WEBHOOK_RETRY_DELAY))
+            .order_by('created_at', 'id')[:limit or WEBHOOK_BATCH_SIZE]
+        )
+        if events:
+            GristWebhookEvent.objects.filter(id__in=[event.id for event in events]).update(
+                status=GristWebhookEvent.Status.PROCESSING, started_at=timezone.now(), updated_at=timezone.now()
+            )
+    return events
+
+
+def requeue_stale_events():
+    """Ishlovchisi to'xtab qolgan eventlarni qayta navbatga qo'yish"""
+    return GristWebhookEvent.objects.filter(
+        status=GristWebhookEvent.Status.PROCESSING,
+        started_at__lt=timezone.now() - STALE_JOB_TIMEOUT,
+    ).update(status=GristWebhookEvent.Status.QUEUED, started_at=None)
+
+
+def merge_records(events):
+    # Bir xil qator bir necha marta kelsa, oxirgi holati olinadi
+    merged = {}
+    for event in events:
+        for record in event.records:
+            merged.pop(record["id"], None)
+            merged[record["id"]] = record
+    return list(merged.values())
+
+
+def apply_events(table, events):
+    """Bitta jadval eventlarini birlashtirib bitta tranzaksiyada qo'llash"""
+    config = WEBHOOK_TABLES[table]
+    records = merge_records(events)
+    event_ids = [event.id for event in events]
+
+    with import_lock(config["kind"]) as acquired:
+        if not acquired:
+            GristWebhookEvent.objects.filter(id__in=event_ids).update(
+                status=GristWebhookEvent.Status.QUEUED, started_at=None,
+                processed_at=timezone.now(), updated_at=timezone.now()
+            )
+            return None
+
+        try:
+            with suspend_signal_refresh(), transaction.atomic():
+                result = import_string(config["handler"])(records)
+        except Exception as e:
+            logger.exception(f"Webhook rows for {table} ({len(records)} rows) failed: {e}")
+            for event in events:
+                event.attempts += 1
+                event.status = (
+                    GristWebhookEvent.Status.FAILED if event.attempts >= WEBHOOK_MAX_ATTEMPTS
+                    else GristWebhookEvent.Status.QUEUED
+                )
+                event.error = str(e)
+                event.started_at = None
+                event.processed_at = event.updated_at = timezone.now()
+            GristWebhookEvent.objects.bulk_update(
+                events, ["attempts", "status", "error", "started_at", "processed_at", "updated_at"]
+            )
+            return False
+
+    result["rows"] = len(records)
+    refresh_after_import([(config["kind"], result)])
+    GristWebhookEvent.objects.filter(id__in=event_ids).update(
+        status=GristWebhookEvent.Status.APPLIED,
+        result=result,
+        error=None,
+        processed_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+    logger.info(f"{table}: applied {len(events)} events ({len(records)} rows): {result}")
+    return True
+
+
+def process_webhook_events(limit=None, stdout=None):
+    """Navbatdagi webhook eventlarini jadval bo'yicha guruhlab qo'llash (qayta ishlanganlar sonini qaytaradi)"""
+    requeue_stale_events()
+    events = claim_webhook_events(limit)
+    if not events:
+        return 0
+
+    by_table = {}
+    for event in events:
+        by_table.setdefault(event.table, []).append(event)
+
+    processed = 0
+    for table in WEBHOOK_TABLES:
+        if table not in by_table:
+            continue
+        applied = apply_events(table, by_table[table])
+        if applied is not None:
+            processed += len(by_table[table])
+        if stdout:
+            state = {True: "applied", False: "failed", None: "requeued (import is running)"}[applied]
+            stdout.write(f"[GRIST_WEBHOOK] {table}: {len(by_table[table])} events {state}")
+    return processed
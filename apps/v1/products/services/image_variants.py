@@ -0,0 +1,197 @@
+import io
+import logging
+import multiprocessing
+import os
+import posixpath
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Variant nomi -> maksimal tomon (px); rasm kattalashtirilmaydi
+VARIANT_SIZES = {
+    "thumbnail": 200,
+    "card": 600,
+    "full": 1600,
+}
+# Format kaliti -> (Pillow format, fayl kengaytmasi)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+}
+VARIANT_QUALITY = 80
+
+IMAGE_VARIANT_WORKERS = int(os.getenv('ISell_IMAGE_VARIANT_WORKERS', os.cpu_count() or 2))
+
+
+def render_variants(content):
+    """Rasm baytlaridan barcha variantlarni yaratish (process pool ichida - storage va DB ga tegmaydi)"""
+    with Image.open(io.BytesIO(content)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+    variants = {}
+    for variant, max_side in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        files = {}
+        for key, (pil_format, _extension) in VARIANT_FORMATS.items():
+            output = resized
+            if pil_format == "JPEG" and output.mode == "RGBA":
+                # JPEG da shaffoflik yo'q - oq fonga joylashtiramiz
+                background = Image.new("RGB", output.size, (255, 255, 255))
+                background.paste(output, mask=output.getchannel("A"))
+                output = background
+            buffer = io.BytesIO()
+            if pil_format == "WEBP":
+                output.save(buffer, pil_format, quality=VARIANT_QUALITY, method=4)
+            else:
+                output.save(buffer, pil_format, quality=VARIANT_QUALITY, optimize=True, progressive=True)
+            files[key] = buffer.getvalue()
+
+        variants[variant] = {
+            "width": resized.width,
+            "height": resized.height,
+            "files": files,
+        }
+    return variants
+
+
+def needs_variants(instance, force=False):
+    """Rasm bor va variantlari joriy fayldan yaratilmagan bo'lsa True"""
+    if not instance.image:
+        return False
+    return force or (instance.variants or {}).get("source") != instance.image.name
+
+
+def variant_file_names(variants):
+    """variants JSON dagi barcha variant fayl nomlari"""
+    names = []
+    for variant in VARIANT_SIZES:
+        data = (variants or {}).get(variant) or {}
+        names.extend(data[key] for key in VARIANT_FORMATS if data.get(key))
+    return names
+
+
+def delete_variant_files(storage, variants):
+    for name in variant_file_names(variants):
+        storage.delete(name)
+
+
+def store_variants(instance, rendered):
+    """Variantlarni storage ga yozish va instance.variants ni yangilash (faqat shu ustun)"""
+    field = instance.image.field
+    storage = instance.image.storage
+    source_name = instance.image.name
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+
+    variants = {"source": source_name}
+    for variant, data in rendered.items():
+        stored = {"width": data["width"], "height": data["height"]}
+        for key, content in data["files"].items():
+            extension = VARIANT_FORMATS[key][1]
+            name = posixpath.join(directory, "variants", f"{stem}_{variant}.{extension}")
+            stored[key] = storage.save(name, ContentFile(content), max_length=field.max_length)
+        variants[variant] = stored
+
+    delete_variant_files(storage, instance.variants)
+    instance.variants = variants
+    type(instance).objects.filter(pk=instance.pk).update(variants=variants)
+
+
+def read_image(instance):
+    with instance.image.storage.open(instance.image.name, "rb") as image_file:
+        return image_file.read()
+
+
+def generate_variants(instances, force=False, workers=None):
+    """ProductImages/Banner yozuvlari uchun thumbnail/card/full variantlarini yaratish"""
+    pending = [instance for instance in instances if needs_variants(instance, force)]
+    generated = 0
+    failed = 0
+
+    if len(pending) == 1:
+        instance = pending[0]
+        try:
+            store_variants(instance, render_variants(read_image(instance)))
+            generated += 1
+        except Exception as e:
+            logger.warning(f"Image variants failed for {instance.image.name}: {e}")
+            failed += 1
+        return {"generated": generated, "failed": failed}
+
+    if not pending:
+        return {"generated": generated, "failed": failed}
+
+    workers = workers or IMAGE_VARIANT_WORKERS
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        queue = iter(pending)
+        future_to_instance = {}
+
+        def submit(count):
+            # Fayli o'qilmagan rasmlar o'rniga navbatdagisi olinadi
+            nonlocal failed
+            for instance in queue:
+                try:
+                    content = read_image(instance)
+                except Exception as e:
+                    logger.warning(f"Image variants: failed to read {instance.image.name}: {e}")
+                    failed += 1
+                    continue
+                future_to_instance[executor.submit(render_variants, content)] = instance
+                count -= 1
+                if not count:
+                    return
+
+        submit(workers * 2)
+        while future_to_instance:
+            done, _ = wait(future_to_instance, return_when=FIRST_COMPLETED)
+            for future in done:
+                instance = future_to_instance.pop(future)
+                try:
+                    store_variants(instance, future.result())
+                    generated += 1
+                except Exception as e:
+                    logger.warning(f"Image variants failed for {instance.image.name}: {e}")
+                    failed += 1
+                submit(1)
+
+    return {"generated": generated, "failed": failed}
+
+
+def generate_pending_variants(force=False):
+    """
+    Variantlari yo'q yoki eskirgan ProductImages/Banner rasmlari uchun variantlar
+    ("image_variants" job bosqichi; force=True - hammasi qayta yaratiladi).
+    """
+    from apps.v1.products.models import Banner, ProductImages
+
+    generated = 0
+    failed = 0
+    changed_product_ids = set()
+    for model in (ProductImages, Banner):
+        queryset = (
+            model.objects.exclude(image='').exclude(image__isnull=True)
+            .only('id', 'image', 'variants', *(['product'] if model is ProductImages else [])).order_by('id')
+        )
+        pending = [instance for instance in queryset.iterator() if needs_variants(instance, force)]
+        result = generate_variants(pending, force=force)
+        generated += result["generated"]
+        failed += result["failed"]
+        if model is ProductImages:
+            changed_product_ids.update(instance.product_id for instance in pending)
+    # Hech narsa yaratilmagan bo'lsa read model qayta render qilinmaydi
+    return {
+        "success": True,
+        "generated": generated,
+        "failed": failed,
+        "unchanged_table": not generated,
+        "changed_product_ids": sorted(changed_product_ids),
+    }
@@ -0,0 +1,329 @@
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.v1.products.models import ImportJob
+from apps.v1.products.services.product_read_model import refresh_after_import, suspend_signal_refresh
+
+logger = logging.getLogger(__name__)
+
+# Import turi -> ketma-ket bajariladigan bosqichlar (nomi, funksiya yo'li)
+IMPORT_STAGES = {
+    ImportJob.Kind.CATEGORIES: [
+        ("categories", "apps.v1.products.integrations.category_list.get_categories"),
+    ],
+    ImportJob.Kind.PRODUCTS: [
+        ("products", "apps.v1.products.integrations.product_lists.get_products"),
+        ("details", "apps.v1.products.integrations.product_lists.import_product_details"),
+    ],
+    ImportJob.Kind.CHARACTERISTICS: [
+        ("properties", "apps.v1.products.integrations.product_lists.import_product_properties"),
+        ("characteristics", "apps.v1.products.integrations.product_lists.import_product_characteristics"),
+    ],
+    ImportJob.Kind.IMAGES: [
+        ("images", "apps.v1.products.integrations.product_lists.import_product_images"),
+    ],
+    ImportJob.Kind.ADVANCED_PAYMENT: [
+        ("advanced_payment", "apps.v1.order.integrations.advanced_payment_assessment.get_advanced_payment_assessment"),
+        ("quote_tables", "apps.v1.order.integrations.advanced_payment_assessment.import_quote_tables"),
+    ],
+    ImportJob.Kind.TARIFFS: [
+        ("tariffs", "apps.v1.order.integrations.order_list.get_tariffs"),
+    ],
+    ImportJob.Kind.IMAGE_VARIANTS: [
+        ("variants", "apps.v1.products.services.image_variants.generate_pending_variants"),
+    ],
+}
+
+# Bosqich natijasidagi qator hisoblagichlari
+ROW_COUNT_KEYS = ("created", "updated", "reused", "deleted", "deactivated", "skipped", "existing", "unchanged", "generated")
+
+# Bajarilayotgan job ning updated_at ustuni shu oraliqda yangilanadi (heartbeat);
+# heartbeat HEARTBEAT_TIMEOUT dan beri kelmagan job ishlovchisi o'lgan deb hisoblanadi
+HEARTBEAT_INTERVAL = int(os.getenv('ISell_IMPORT_HEARTBEAT_SECONDS', 30))
+HEARTBEAT_TIMEOUT = timedelta(seconds=int(os.getenv('ISell_IMPORT_HEARTBEAT_TIMEOUT_SECONDS', 300)))
+
+# Shu oraliqda muvaffaqiyatli tugagan import qayta so'ralsa, oxirgi natija qaytariladi
+IMPORT_COOLDOWN = timedelta(seconds=int(os.getenv('ISell_IMPORT_COOLDOWN_SECONDS', 60)))
+
+# Advisory lock nomlar fazosi: import bajarilishi va navbatga qo'yish alohida qulflanadi
+LOCK_NAMESPACE_RUN = 1
+LOCK_NAMESPACE_ENQUEUE = 2
+
+ACTIVE_STATUSES = (ImportJob.Status.QUEUED, ImportJob.Status.RUNNING)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def is_stage_success(result):
+    if not isinstance(result, dict):
+        return result is not None
+    return result.get("success", "error" not in result)
+
+
+def stage_rows(result):
+    """Bosqich natijasidan qator hisoblagichlarini ajratib olish"""
+    if not isinstance(result, dict):
+        return {}
+    return {key: result[key] for key in ROW_COUNT_KEYS if isinstance(result.get(key), int)}
+
+
+def stage_metrics(result):
+    """Bosqich o'lchovlari (instrumented dekoratori yozadi): vaqt, HTTP, SQL, xotira"""
+    if not isinstance(result, dict):
+        return None
+    return result.get("metrics")
+
+
+def stage_message(result):
+    """Muvaffaqiyatsiz bosqich xabari (integratsiyalar "message" yoki "error" qaytaradi)"""
+    if not isinstance(result, dict):
+        return None
+    return result.get("error") or result.get("message")
+
+
+def lock_key(kind):
+    # pg_advisory_lock(int4, int4) ikkinchi argumenti uchun barqaror musbat son
+    return zlib.crc32(f"isell-import:{kind}".encode("utf-8")) & 0x7fffffff
+
+
+@contextmanager
+def import_lock(kind):
+    """Import turi bo'yicha jarayonlararo qulf (session advisory lock, band bo'lsa False)"""
+    key = lock_key(kind)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s, %s)", [LOCK_NAMESPACE_RUN, key])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s, %s)", [LOCK_NAMESPACE_RUN, key])
+
+
+def locked_kinds():
+    """Boshqa jarayonda import qulfi band bo'lgan import turlari (pg_locks dan)"""
+    kinds = {lock_key(kind): kind for kind in ImportJob.Kind.values}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT objid FROM pg_locks WHERE locktype = 'advisory' AND granted AND classid = %s AND objsubid = 2",
+            [LOCK_NAMESPACE_RUN]
+        )
+        return {kinds[row[0]] for row in cursor.fetchall() if row[0] in kinds}
+
+
+def enqueue_import(kind, force=False):
+    """Import job ni navbatga qo'yish (single-flight): (job, "created" | "attached" | "cached")"""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [LOCK_NAMESPACE_ENQUEUE, lock_key(kind)])
+
+        active = ImportJob.objects.filter(kind=kind, status__in=ACTIVE_STATUSES).order_by('created_at', 'id')
+        if force:
+            # Bajarilayotgan oddiy job fingerprint larni hisobga oladi - unga ulanib bo'lmaydi
+            active = active.filter(Q(status=ImportJob.Status.QUEUED) | Q(force=True))
+        active = active.first()
+        if active:
+            if force and not active.force:
+                active.force = True
+                active.save(update_fields=["force", "updated_at"])
+            return active, "attached"
+
+        if not force and IMPORT_COOLDOWN:
+            recent = ImportJob.objects.filter(
+                kind=kind,
+                status=ImportJob.Status.SUCCEEDED,
+                finished_at__gte=timezone.now() - IMPORT_COOLDOWN,
+            ).order_by('-finished_at').first()
+            if recent:
+                return recent, "cached"
+
+        job = create_job(kind, force=force)
+    return job, "created"
+
+
+def create_job(kind, force=False):
+    return ImportJob.objects.create(
+        kind=kind,
+        force=force,
+        progress={name: {"status": ImportJob.Status.QUEUED} for name, _ in IMPORT_STAGES[kind]},
+    )
+
+
+def enqueue_variant_generation():
+    """Admin da saqlangan rasmlar uchun "image_variants" job i (signal on_commit dan)"""
+    kind = ImportJob.Kind.IMAGE_VARIANTS
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [LOCK_NAMESPACE_ENQUEUE, lock_key(kind)])
+        queued = ImportJob.objects.filter(kind=kind, status=ImportJob.Status.QUEUED).order_by('created_at', 'id').first()
+        return queued or create_job(kind)
+
+
+def claim_next_job(worker=None, exclude_kinds=()):
+    """
+    Navbatdagi eng eski job ni olish (SELECT ... FOR UPDATE SKIP LOCKED).
+    Import qulfi boshqa jarayonda band bo'lgan turlar o'tkazib yuboriladi.
+    """
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ImportJob.Status.QUEUED)
+            .exclude(kind__in=locked_kinds() | set(exclude_kinds))
+            .order_by('created_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ImportJob.Status.RUNNING
+        job.worker = worker or worker_name()
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "worker", "started_at", "updated_at"])
+    return job
+
+
+def requeue_stale_jobs():
+    """Heartbeat i HEARTBEAT_TIMEOUT dan beri yangilanmagan job larni qayta navbatga qo'yish"""
+    return ImportJob.objects.filter(
+        status=ImportJob.Status.RUNNING,
+        updated_at__lt=timezone.now() - HEARTBEAT_TIMEOUT,
+    ).update(status=ImportJob.Status.QUEUED, worker=None, started_at=None, updated_at=timezone.now())
+
+
+@contextmanager
+def heartbeat(job):
+    """Job bajarilayotganda uning updated_at ini alohida oqimda HEARTBEAT_INTERVAL da yangilash"""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(HEARTBEAT_INTERVAL):
+                try:
+                    # Job boshqa worker ga o'tgan bo'lsa (requeue) uni tirik ko'rsatmaymiz
+                    ImportJob.objects.filter(
+                        pk=job.pk, status=ImportJob.Status.RUNNING, worker=job.worker
+                    ).update(updated_at=timezone.now())
+                except Exception as e:
+                    logger.warning(f"Import job #{job.pk} heartbeat failed: {e}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"import-job-{job.pk}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def save_progress(job):
+    # Faqat progress ustuni - status endpoint har bosqichdan keyin yangi holatni ko'radi
+    ImportJob.objects.filter(pk=job.pk).update(progress=job.progress, updated_at=timezone.now())
+
+
+def run_job(job):
+    """Job bosqichlarini ketma-ket bajarish (holati job.progress ga, muvaffaqiyatsizda qolganlari o'tkaziladi)"""
+    with heartbeat(job):
+        return execute_job(job)
+
+
+def execute_job(job):
+    results = {}
+    failed_stage = None
+
+    for name, path in IMPORT_STAGES[job.kind]:
+        stage = job.progress.setdefault(name, {})
+        if failed_stage:
+            stage["status"] = "skipped"
+            continue
+
+        stage.update({"status": ImportJob.Status.RUNNING, "started_at": timezone.now().isoformat()})
+        save_progress(job)
+
+        started = time.monotonic()
+        try:
+            with suspend_signal_refresh():
+                result = import_string(path)(force=job.force)
+        except Exception as e:
+            logger.exception(f"Import job #{job.pk} stage {name} failed: {e}")
+            result = {"success": False, "message": f"Error: {str(e)}"}
+
+        succeeded = is_stage_success(result)
+        stage.update({
+            "status": ImportJob.Status.SUCCEEDED if succeeded else ImportJob.Status.FAILED,
+            "finished_at": timezone.now().isoformat(),
+            "seconds": round(time.monotonic() - started, 3),
+            "rows": stage_rows(result),
+            "metrics": stage_metrics(result),
+        })
+        results[name] = result
+        if not succeeded:
+            stage["message"] = stage_message(result)
+            failed_stage = name
+
+    # Katalog o'zgargan bo'lsa list/detail javoblari bir marta qayta render qilinadi
+    refresh_after_import((job.kind, result) for result in results.values())
+
+    job.status = ImportJob.Status.FAILED if failed_stage else ImportJob.Status.SUCCEEDED
+    job.result = results
+    job.error = job.progress[failed_stage].get("message") if failed_stage else None
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "progress", "result", "error", "finished_at", "updated_at"])
+    return job
+
+
+def run_worker(once=False, sleep=2.0, stdout=None):
+    """
+    Navbatdagi job larni olib bajarish (once=True bo'lsa navbat bo'shaguncha).
+    Job navbati bo'sh bo'lganda Grist webhook eventlari qo'llanadi.
+    """
+    from apps.v1.products.services.grist_webhooks import process_webhook_events
+
+    worker = worker_name()
+    processed = 0
+    # Claim dan keyin qulfi band bo'lib chiqqan turlar - navbat bo'shaguncha o'tkazib yuboriladi
+    busy_kinds = set()
+    while True:
+        close_old_connections()
+        requeue_stale_jobs()
+        job = claim_next_job(worker, exclude_kinds=busy_kinds)
+        if job is None:
+            busy_kinds.clear()
+            if process_webhook_events(stdout=stdout):
+                continue
+            if once:
+                return processed
+            time.sleep(sleep)
+            continue
+
+        with import_lock(job.kind) as acquired:
+            if not acquired:
+                # Shu turdagi import boshqa jarayonda (masalan grist_sync) bajarilmoqda
+                ImportJob.objects.filter(pk=job.pk).update(
+                    status=ImportJob.Status.QUEUED, worker=None, started_at=None, updated_at=timezone.now()
+                )
+                busy_kinds.add(job.kind)
+                if stdout:
+                    stdout.write(f"[IMPORT_WORKER] job #{job.id} ({job.kind}) is locked elsewhere, requeued")
+                continue
+
+            if stdout:
+                stdout.write(f"[IMPORT_WORKER] {worker} started job #{job.id} ({job.kind})")
+            run_job(job)
+        processed += 1
+        if stdout:
+            stdout.write(f"[IMPORT_WORKER] job #{job.id} finished: {job.status}")
@@ -0,0 +1,88 @@
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from django.db import transaction
+
+from apps.v1.products.models import ProductCategory
+from apps.v1.products.services.data_versions import bump_version, get_version
+
+logger = logging.getLogger(__name__)
+
+MATRIX_VERSION_NAME = "percentage_matrix"
+
+# Boshqa jarayonlardagi o'zgarishlar (import worker, boshqa web worker) shu
+# oraliqdan kechikmay ko'rinadi; oraliq ichida matritsa so'rovsiz qaytariladi
+VERSION_CHECK_INTERVAL = float(os.getenv('ISell_MATRIX_VERSION_CHECK_SECONDS', 5))
+
+
+class PercentageMatrix:
+    """(grist risk id, grist price id) -> foiz matritsasi (ProductCategory jadvalining o'zgarmas nusxasi)"""
+
+    __slots__ = ("version", "cells")
+
+    def __init__(self, version, cells):
+        self.version = version
+        self.cells = MappingProxyType(dict(cells))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def percentage(self, risk_category_id, price_category_id):
+        """Katak foizi yoki katak yo'q bo'lsa None (foizi bo'sh katak 0)"""
+        return self.cells.get((str(risk_category_id), str(price_category_id)))
+
+
+_matrix = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def load_percentage_matrix(version):
+    cells = {}
+    rows = (
+        ProductCategory.objects
+        .filter(grist_risk_category_id__isnull=False, grist_price_category_id__isnull=False)
+        .order_by('id')
+        .values_list('grist_risk_category_id', 'grist_price_category_id', 'percentage')
+    )
+    for risk_category_id, price_category_id, percentage in rows:
+        # Takroriy juftlikda eng eski yozuv (avvalgi .get() dan farqli - xatosiz)
+        cells.setdefault((risk_category_id, price_category_id), percentage or 0)
+    logger.info(f"Percentage matrix v{version} loaded: {len(cells)} cells")
+    return PercentageMatrix(version, cells)
+
+
+def get_percentage_matrix():
+    """
+    Jarayon ichidagi matritsa. Versiya VERSION_CHECK_INTERVAL da bir marta
+    tekshiriladi va faqat u o'zgarganda jadval qayta yuklanadi.
+    """
+    global _matrix, _checked_at
+    matrix = _matrix
+    now = time.monotonic()
+    if matrix is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return matrix
+
+    with _lock:
+        if _matrix is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+            return _matrix
+        version = get_version(MATRIX_VERSION_NAME)
+        if _matrix is None or _matrix.version != version:
+            _matrix = load_percentage_matrix(version)
+        _checked_at = now
+        return _matrix
+
+
+def reset_local_matrix():
+    global _checked_at
+    # Keyingi murojaatda versiya darhol tekshiriladi
+    _checked_at = 0.0
+
+
+def invalidate_percentage_matrix():
+    """ProductCategory o'zgargandan keyin chaqiriladi: versiyani oshiradi"""
+    bump_version(MATRIX_VERSION_NAME)
+    transaction.on_commit(reset_local_matrix)
@@ -0,0 +1,106 @@
+import bisect
+import logging
+import os
+import threading
+import time
+
+from apps.v1.products.models import Categories, ProductReadModel
+from apps.v1.products.services.data_versions import get_version
+from apps.v1.products.services.product_read_model import CATALOG_VERSION_NAME
+from apps.v1.products.services.search_keys import TOKENS, transliterate
+
+logger = logging.getLogger(__name__)
+
+# Boshqa jarayonlardagi katalog o'zgarishlari shu oraliqdan kechikmay ko'rinadi
+VERSION_CHECK_INTERVAL = float(os.getenv('ISell_AUTOCOMPLETE_VERSION_CHECK_SECONDS', 5))
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+CATEGORY = "category"
+PRODUCT = "product"
+
+
+def normalize(text):
+    """Kichik harf, kirill -> lotin, faqat harf/raqam so'zlari: "iPhone 15-Pro" -> "iphone 15 pro" """
+    return " ".join(TOKENS.findall(transliterate(text)))
+
+
+class PrefixIndex:
+    """Faol kategoriya va mahsulot nomlarining har bir so'zidan boshlanuvchi saralangan prefiks indeksi"""
+
+    __slots__ = ("version", "tiers", "size")
+
+    def __init__(self, version, items):
+        self.version = version
+        starts = []
+        inner = []
+        for kind, object_id, name in items:
+            words = normalize(name).split()
+            for position in range(len(words)):
+                entry = (" ".join(words[position:]), kind == PRODUCT, object_id, kind, name)
+                (inner if position else starts).append(entry)
+        self.tiers = []
+        for entries in (starts, inner):
+            entries.sort()
+            # bisect uchun kalitlar alohida ro'yxatda
+            self.tiers.append(([entry[0] for entry in entries], [entry[2:] for entry in entries]))
+        self.size = len(items)
+
+    def __len__(self):
+        return self.size
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        for keys, entries in self.tiers:
+            index = bisect.bisect_left(keys, prefix)
+            while index < len(keys) and len(results) < limit and keys[index].startswith(prefix):
+                object_id, kind, name = entries[index]
+                if (kind, object_id) not in seen:
+                    seen.add((kind, object_id))
+                    results.append({"type": kind, "id": object_id, "name": name})
+                index += 1
+        return results
+
+
+_index = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def load_prefix_index(version):
+    started = time.monotonic()
+    items = [
+        (CATEGORY, category_id, name)
+        for category_id, name in Categories.objects.filter(is_active=True).exclude(name__isnull=True).values_list('id', 'name')
+    ]
+    items.extend(
+        (PRODUCT, product_id, name)
+        for product_id, name in ProductReadModel.objects.filter(actual=True).exclude(name__isnull=True).values_list('product_id', 'name')
+    )
+    index = PrefixIndex(version, items)
+    logger.info(f"Autocomplete index v{version} built: {len(index)} names in {time.monotonic() - started:.3f}s")
+    return index
+
+
+def get_prefix_index():
+    """Jarayon ichidagi indeks (katalog versiyasi o'zgarganda qayta quriladi)"""
+    global _index, _checked_at
+    index = _index
+    now = time.monotonic()
+    if index is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return index
+
+    with _lock:
+        if _index is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+            return _index
+        version = get_version(CATALOG_VERSION_NAME)
+        if _index is None or _index.version != version:
+            _index = load_prefix_index(version)
+        _checked_at = now
+        return _index
+
@@ -0,0 +1,218 @@
+import json
+import logging
+import operator
+import threading
+from contextlib import contextmanager
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.renderers import JSONRenderer
+
+from apps.v1.products.integrations.product_lists import BULK_BATCH_SIZE
+from apps.v1.products.models import DataVersion, ImportJob, ProductReadModel, Products, ProductSearchKey
+from apps.v1.products.services.data_versions import bump_version, get_version
+from apps.v1.products.services.product_search import product_search_keywords, update_search_vectors
+from apps.v1.products.services.search_keys import replace_search_keys
+
+logger = logging.getLogger(__name__)
+
+# Shu turdagi importlar ProductsSerializer chiqishini o'zgartiradi
+READ_MODEL_KINDS = (
+    ImportJob.Kind.CATEGORIES,
+    ImportJob.Kind.PRODUCTS,
+    ImportJob.Kind.CHARACTERISTICS,
+    ImportJob.Kind.IMAGES,
+    ImportJob.Kind.IMAGE_VARIANTS,
+)
+
+# Bosqich/webhook natijasidagi o'zgargan ID lar -> Products filtri (refresh_after_import uchun)
+CHANGED_ID_LOOKUPS = {
+    "changed_product_ids": "id__in",
+    "changed_category_ids": "category_id__in",
+    "changed_property_ids": "characteristics__property_id__in",
+}
+
+# Oldindan tayyorlangan JSON dagi nisbiy media URL lar oldiga qo'yiladi;
+# javob berishda so'rovning scheme://host qiymati bilan almashtiriladi
+BASE_URL_MARKER = "{{isell:base_url}}"
+
+# Faol mahsulot/kategoriya nomlari o'zgarganda oshiriladi (autocomplete indeksi)
+CATALOG_VERSION_NAME = "catalog"
+
+# ProductsSerializer chiqishi o'zgarganda oshiriladi - saqlangan payload lar keyingi importda qayta render qilinadi
+READ_MODEL_RENDER_VERSION = 2
+READ_MODEL_RENDER_VERSION_NAME = "read_model_render"
+
+READ_MODEL_FIELDS = ["category", "name", "actual", "price", "payload", "search_keywords", "updated_at"]
+
+_local = threading.local()
+
+
+class MarkerRequest:
+    """Render paytida request o'rnida: build_absolute_uri nisbiy URL ga marker qo'shadi"""
+
+    def build_absolute_uri(self, location):
+        if location.startswith("/"):
+            return BASE_URL_MARKER + location
+        return location
+
+
+def render_product(product):
+    """ProductsSerializer chiqishi (list va detail javobi) JSON matn ko'rinishida"""
+    from apps.v1.products.serializers import ProductsSerializer
+
+    data = ProductsSerializer(product, context={"request": MarkerRequest()}).data
+    return JSONRenderer().render(data).decode("utf-8")
+
+
+def refresh_product_read_models(product_filter=None, force=False):
+    """ProductReadModel qatorlarini qayta hisoblash (product_filter - Products uchun Q, faqat farq qilganlari yoziladi)"""
+    products = Products.objects.select_related('category').prefetch_related(
+        'details', 'images', 'characteristics__property'
+    ).order_by('id')
+    existing = ProductReadModel.objects.all()
+    keyed = ProductSearchKey.objects.all()
+    if product_filter is not None:
+        products = products.filter(product_filter).distinct()
+        existing = existing.filter(product__in=products.values('id'))
+        keyed = keyed.filter(product__in=products.values('id'))
+    # Kalitlari yo'q productlar (masalan kalitlar jadvalidan oldin qurilgan read model) o'zgarmagan bo'lsa ham yoziladi
+    keyed_ids = set(keyed.values_list('product_id', flat=True).distinct())
+    existing = {
+        row[0]: row[1:]
+        for row in existing.values_list(
+            'product_id', 'category_id', 'name', 'actual', 'price', 'payload', 'search_keywords'
+        )
+    }
+
+    rows = []
+    key_texts = {}
+    created_count = 0
+    unchanged_count = 0
+    for product in products.iterator(chunk_size=BULK_BATCH_SIZE):
+        row = ProductReadModel(
+            product_id=product.id,
+            category_id=product.category_id,
+            name=product.name,
+            actual=product.actual,
+            # Narxsiz productlar keyset tartibida 0 sifatida (NULL lar tartibi bazaga bog'liq)
+            price=product.price or 0,
+            payload=render_product(product),
+            search_keywords=product_search_keywords(product),
+        )
+        key_text = " ".join(filter(None, [product.name, product.category.name if product.category_id else None]))
+        current = existing.get(product.id)
+        if not force and current == (row.category_id, row.name, row.actual, row.price, row.payload, row.search_keywords):
+            unchanged_count += 1
+            if product.id not in keyed_ids:
+                key_texts[product.id] = key_text
+            continue
+        if current is None:
+            created_count += 1
+        rows.append(row)
+        key_texts[product.id] = key_text
+
+    ProductReadModel.objects.bulk_create(
+        rows,
+        batch_size=BULK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=READ_MODEL_FIELDS,
+    )
+    update_search_vectors(row.product_id for row in rows)
+    replace_search_keys(key_texts)
+    if rows:
+        bump_version(CATALOG_VERSION_NAME)
+
+    result = {
+        "created": created_count,
+        "updated": len(rows) - created_count,
+        "unchanged": unchanged_count,
+    }
+    logger.info(f"Product read model refreshed: {result}")
+    return result
+
+
+def refresh_after_import(kind_results):
+    """Import/webhook natijalaridagi o'zgargan ID lar bo'yicha read model ni bir marta yangilash"""
+    changed = {key: set() for key in CHANGED_ID_LOOKUPS}
+    for kind, result in kind_results:
+        if not isinstance(result, dict):
+            continue
+        # ID ro'yxatlari job/event natijasida saqlanmaydi
+        ids = {key: result.pop(key, None) or () for key in CHANGED_ID_LOOKUPS}
+        if kind not in READ_MODEL_KINDS or result.get("unchanged_table"):
+            continue
+        for key, values in ids.items():
+            changed[key].update(values)
+
+    conditions = [Q(**{lookup: sorted(changed[key])}) for key, lookup in CHANGED_ID_LOOKUPS.items() if changed[key]]
+    try:
+        # Payload lar eski render versiyasida - butun katalog qayta quriladi
+        if read_model_render_stale():
+            return build_product_read_models()
+        # Read modeli hali qurilmagan productlar (masalan read model jadvalidan oldin import qilinganlar)
+        if Products.objects.filter(read_model__isnull=True).exists():
+            conditions.append(Q(read_model__isnull=True))
+        if not conditions:
+            return None
+        result = refresh_product_read_models(reduce(operator.or_, conditions))
+        # Kategoriya faolligi (is_active) payload ga kirmaydi - versiya alohida oshiriladi
+        bump_version(CATALOG_VERSION_NAME)
+        return result
+    except Exception as e:
+        logger.exception(f"Product read model refresh failed: {e}")
+        return None
+
+
+def read_model_render_stale():
+    """Saqlangan payload lar ProductsSerializer ning eski versiyasida render qilinganmi"""
+    return get_version(READ_MODEL_RENDER_VERSION_NAME) < READ_MODEL_RENDER_VERSION
+
+
+def build_product_read_models(force=False):
+    """Butun katalog read modelini qayta hisoblash va render versiyasini belgilash"""
+    result = refresh_product_read_models(force=force)
+    DataVersion.objects.update_or_create(
+        name=READ_MODEL_RENDER_VERSION_NAME, defaults={"version": READ_MODEL_RENDER_VERSION}
+    )
+    bump_version(CATALOG_VERSION_NAME)
+    return result
+
+
+@contextmanager
+def suspend_signal_refresh():
+    """Import ichida qatorma-qator signal yangilanishlari o'chiriladi (oxirida refresh_after_import)"""
+    _local.suspended = getattr(_local, "suspended", 0) + 1
+    try:
+        yield
+    finally:
+        _local.suspended -= 1
+
+
+def schedule_read_model_refresh(product_filter):
+    """Model signallari uchun: tranzaksiya tugagach shu mahsulotlarni qayta render qilish"""
+    if getattr(_local, "suspended", 0):
+        return
+    transaction.on_commit(lambda: refresh_product_read_models(product_filter))
+
+
+def schedule_catalog_invalidation():
+    """Read model ga ta'sir qilmaydigan katalog o'zgarishlari uchun (o'chirish, kategoriya nomi)"""
+    if getattr(_local, "suspended", 0):
+        return
+    transaction.on_commit(lambda: bump_version(CATALOG_VERSION_NAME))
+
+
+def read_model_response_body(payloads, request, envelope=None, extra=None):
+    """Saqlangan JSON larni serializer ishisiz javob matniga yig'ish (envelope - pagination)"""
+    if envelope is None:
+        body = payloads[0]
+    else:
+        head = json.dumps(envelope, ensure_ascii=False, separators=(",", ":"))[:-1]
+        tail = "".join(
+            f",{json.dumps(key)}:{json.dumps(value, ensure_ascii=False)}" for key, value in (extra or {}).items()
+        )
+        body = f'{head},"results":[{",".join(payloads)}]{tail}}}'
+    return body.replace(BASE_URL_MARKER, request.build_absolute_uri("/").rstrip("/"))
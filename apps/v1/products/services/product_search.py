@@ -0,0 +1,78 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+
+from apps.v1.products.integrations.product_lists import chunked
+from apps.v1.products.models import ProductReadModel
+from apps.v1.products.services.search_keys import search_keys_condition
+
+# Nomlar o'zbek/rus/ingliz aralash - stemming siz "simple" lug'at
+SEARCH_CONFIG = 'simple'
+
+# pg_trgm o'rnatilganmi (jarayon ichida bir marta tekshiriladi) - qarang migrations/0035
+_trigram_available = None
+
+
+def has_trigram_extension():
+    """pg_trgm kengaytmasi bazada bormi (postgresql-contrib siz serverlarda yo'q)"""
+    global _trigram_available
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigram_available = cursor.fetchone()[0]
+    return _trigram_available
+
+
+def product_search_keywords(product):
+    """Kategoriya nomi, xarakteristika va variatsiya qiymatlari (prefetch qilingan product dan)"""
+    values = [product.category.name if product.category_id else None]
+    values.extend(characteristic.value for characteristic in product.characteristics.all())
+    for detail in product.details.all():
+        values.extend([detail.color, detail.storage, detail.sim_card])
+    return " ".join(dict.fromkeys(str(value).strip() for value in values if value))
+
+
+def search_vector():
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('search_keywords', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(product_ids):
+    """ProductReadModel.search_vector ni name/search_keywords dan qayta hisoblash"""
+    for batch in chunked(list(product_ids)):
+        ProductReadModel.objects.filter(product_id__in=batch).update(search_vector=search_vector())
+
+
+def prefix_query(text):
+    """Har bir so'z prefiks sifatida: "iph 12" -> iph:* & 12:* (yozish jarayonida ham topiladi)"""
+    terms = re.findall(r"\w+", text)
+    if not terms:
+        return None
+    return SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_products(queryset, text):
+    """ProductReadModel queryset ini qidiruv matni bo'yicha filtrlash va saralash (tsvector, pg_trgm, transliteratsiya)"""
+    text = text.strip()
+    # Kirill/lotin yozilishidan qat'i nazar (айфон = ayfon = iphone)
+    keyed = search_keys_condition(text)
+    query = prefix_query(text)
+    matches = Q()
+    rank = Value(0.0, output_field=FloatField())
+    if has_trigram_extension():
+        matches |= Q(name__trigram_similar=text)
+        rank = TrigramSimilarity('name', text)
+    if keyed is not None:
+        matches |= keyed
+    if query is not None:
+        matches |= Q(search_vector=query)
+        rank = rank + SearchRank(F('search_vector'), query)
+    if not matches:
+        return queryset.none()
+    return queryset.filter(matches).annotate(search_rank=rank).order_by(
+        F('search_rank').desc(nulls_last=True), 'product_id'
+    )
@@ -0,0 +1,107 @@
+import operator
+import re
+import unicodedata
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.v1.products.integrations.product_lists import BULK_BATCH_SIZE, chunked
+from apps.v1.products.models import ProductSearchKey
+
+# Kirill (rus + o'zbek) -> lotin
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "j", "з": "z",
+    "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sh",
+    "ъ": "", "ы": "i", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",
+}
+
+# Talaffuzi bir xil harf birikmalari (tartib muhim: uzunlari avval). Unlilar
+# saqlanadi - faqat yozilishi har xil bo'lgan bir xil tovushlar birlashtiriladi
+PHONETIC_REPLACEMENTS = (
+    ("ph", "f"), ("kh", "h"), ("th", "t"), ("gh", "g"), ("ck", "k"), ("dj", "j"),
+    ("ce", "se"), ("ci", "si"), ("cy", "si"), ("c", "k"), ("q", "k"), ("w", "v"), ("x", "ks"),
+    ("y", "i"),
+)
+
+APOSTROPHES = re.compile(r"['`ʻʼ‘’]")
+REPEATS = re.compile(r"(.)\1+")
+TOKENS = re.compile(r"[a-z]+|\d+")
+
+MAX_KEY_LENGTH = 64
+# Bundan qisqa so'rov so'zlari faqat butun kalitga mos keladi ("mi" != "model")
+MIN_PREFIX_LENGTH = 3
+
+
+def transliterate(text):
+    """Kichik harf, kirill -> lotin, diakritika va apostroflar (o', g') olib tashlanadi"""
+    text = "".join(CYRILLIC_TO_LATIN.get(char, char) for char in (text or "").lower())
+    text = unicodedata.normalize("NFKD", APOSTROPHES.sub("", text))
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def phonetic_key(token):
+    """Transliteratsiya qilingan so'zning fonetik kaliti ("iphone", "ayfon", "айфон" -> "ifon")"""
+    if token.isdigit():
+        return token[:MAX_KEY_LENGTH]
+    if token.startswith("xi"):
+        # Pinyin: xiaomi = "сяоми"
+        token = "s" + token[1:]
+    for source, target in PHONETIC_REPLACEMENTS:
+        token = token.replace(source, target)
+    token = REPEATS.sub(r"\1", token)
+    if token.startswith("ai"):
+        token = token[1:]
+    if len(token) > 3 and token.endswith("e"):
+        token = token[:-1]
+    return token[:MAX_KEY_LENGTH]
+
+
+def search_keys(text):
+    """Matndagi har bir so'z uchun kalitlar (tartib saqlanadi, takrorlarsiz)"""
+    keys = (phonetic_key(token) for token in TOKENS.findall(transliterate(text)))
+    return list(dict.fromkeys(key for key in keys if key))
+
+
+def replace_search_keys(texts_by_product):
+    """Berilgan productlarning ProductSearchKey qatorlarini qayta yozish ({product_id: matn})"""
+    product_ids = list(texts_by_product)
+    with transaction.atomic():
+        for batch in chunked(product_ids):
+            ProductSearchKey.objects.filter(product_id__in=batch).delete()
+        ProductSearchKey.objects.bulk_create(
+            [
+                ProductSearchKey(product_id=product_id, key=key)
+                for product_id, text in texts_by_product.items()
+                for key in search_keys(text)
+            ],
+            batch_size=BULK_BATCH_SIZE
+        )
+
+
+def key_lookup(key):
+    # MIN_PREFIX_LENGTH dan qisqa kalit - aniq moslik, aks holda indeksli ``key LIKE 'ifon%'``
+    if len(key) < MIN_PREFIX_LENGTH:
+        return Q(key=key)
+    return Q(key__startswith=key)
+
+
+def search_keys_condition(text, field="product_id"):
+    """
+    So'rovdagi har bir so'z kaliti productning biror kalitiga mos kelishi kerak:
+    qisqa so'zlar butun kalitga, qolganlari kalit boshiga. Kalit chiqmasa None.
+    """
+    keys = search_keys(text)
+    if not keys:
+        return None
+    return reduce(operator.and_, (
+        Q(**{f"{field}__in": ProductSearchKey.objects.filter(key_lookup(key)).values('product_id')})
+        for key in keys
+    ))
+
+
+def filter_by_search_keys(queryset, text, field="product_id"):
+    condition = search_keys_condition(text, field)
+    return queryset.filter(condition) if condition is not None else None
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.v1.products.models import (
+    Categories, Products, ProductDetails, ProductImages, ProductProperties, ProductCharacteristics, Banner
+)
+from apps.v1.products.services.image_variants import delete_variant_files, needs_variants
+from apps.v1.products.services.import_jobs import enqueue_variant_generation
+from apps.v1.products.services.product_read_model import schedule_catalog_invalidation, schedule_read_model_refresh
+
+
+@receiver(post_save, sender=ProductImages)
+@receiver(post_save, sender=Banner)
+def create_image_variants(sender, instance, **kwargs):
+    """Rasm yangi yoki almashtirilgan bo'lsa, tranzaksiyadan keyin variantlar import worker navbatiga"""
+    if kwargs.get("raw") or not needs_variants(instance):
+        return
+    transaction.on_commit(enqueue_variant_generation)
+
+
+@receiver(post_delete, sender=ProductImages)
+@receiver(post_delete, sender=Banner)
+def delete_image_variants(sender, instance, **kwargs):
+    """Yozuv o'chirilganda variant fayllarini ham o'chirish"""
+    if instance.variants:
+        storage = sender._meta.get_field("image").storage
+        transaction.on_commit(lambda: delete_variant_files(storage, instance.variants))
+
+
+# Rasm variantlari import worker da yaratiladi; "image_variants" job i
+# tugagach read model qayta render qilinadi (refresh_after_import)
+@receiver(post_save, sender=Products)
+def refresh_product_read_model(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    schedule_read_model_refresh(Q(id=instance.pk))
+
+
+@receiver(post_save, sender=ProductDetails)
+@receiver(post_delete, sender=ProductDetails)
+@receiver(post_save, sender=ProductImages)
+@receiver(post_delete, sender=ProductImages)
+@receiver(post_save, sender=ProductCharacteristics)
+@receiver(post_delete, sender=ProductCharacteristics)
+def refresh_parent_read_model(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    schedule_read_model_refresh(Q(id=instance.product_id))
+
+
+@receiver(post_save, sender=Categories)
+def refresh_category_read_models(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    schedule_read_model_refresh(Q(category_id=instance.pk))
+    schedule_catalog_invalidation()
+
+
+@receiver(post_delete, sender=Products)
+@receiver(post_delete, sender=Categories)
+def invalidate_catalog(sender, instance, **kwargs):
+    schedule_catalog_invalidation()
+
+
+@receiver(post_save, sender=ProductProperties)
+def refresh_property_read_models(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    schedule_read_model_refresh(Q(characteristics__property_id=instance.pk))
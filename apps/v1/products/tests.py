@@ -1,3 +1,1012 @@
-from django.test import TestCase
+from contextlib import nullcontext
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.v1.products.integrations.category_list import get_categories, save_category_records
+from apps.v1.products.integrations.fingerprints import StageFingerprint
+from apps.v1.products.integrations import instrumentation, product_lists
+from apps.v1.products.integrations.grist_client import GristAPIError, GristClient, set_grist_client
+from apps.v1.products.integrations.grist_standin import GristStandin
+from apps.v1.products.integrations.product_lists import (
+    deactivate_unseen_products,
+    download_image,
+    get_product_properties_from_grist,
+    iter_product_batches,
+    process_products,
+    save_products_to_db,
+)
+from apps.v1.products.models import (
+    Categories, GristSyncState, GristWebhookEvent, ImportJob, ProductCategory, ProductCharacteristics, ProductIDs,
+    ProductProperties, ProductReadModel, Products, ProductSearchKey
+)
+from apps.v1.products.pagination import KeysetPagination
+from apps.v1.products.serializers import CategoriesSerializer
+from apps.v1.products.services import percentage_matrix
+from apps.v1.products.services import grist_sync
+from apps.v1.products.services.grist_webhooks import (
+    STALE_JOB_TIMEOUT,
+    WEBHOOK_MAX_ATTEMPTS,
+    WEBHOOK_RETRY_DELAY,
+    apply_events,
+    merge_records,
+    normalize_records,
+    process_webhook_events,
+)
+from apps.v1.products.services.import_jobs import (
+    LOCK_NAMESPACE_RUN,
+    claim_next_job,
+    enqueue_import,
+    lock_key,
+    run_worker,
+)
+from apps.v1.products.services.percentage_matrix import get_percentage_matrix, invalidate_percentage_matrix
+from apps.v1.products.services.product_read_model import refresh_after_import, refresh_product_read_models
+from apps.v1.products.services.product_search import search_products, update_search_vectors
+from apps.v1.products.services.search_keys import (
+    filter_by_search_keys,
+    phonetic_key,
+    replace_search_keys,
+    search_keys,
+)
+
+
+class GristPagingTests(SimpleTestCase):
+    names = ["b", None, "a", "c", "a", None, "b", "a"]
+
+    def setUp(self):
+        records = [
+            {"id": index, "fields": {"product_name": name, "actual": index != 4}}
+            for index, name in enumerate(self.names, start=1)
+        ]
+        standin = GristStandin({"Price": records})
+        server = standin.serve()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.client = GristClient(base_url=standin.base_url(server), api_key="test", doc_id=standin.doc_id, max_retries=0)
+
+    def rows(self, **kwargs):
+        return [
+            (record["id"], record["fields"]["product_name"])
+            for record in self.client.iter_table("Price", columns=["product_name"], page_size=2, **kwargs)
+        ]
+
+    def test_pages_by_id(self):
+        self.assertEqual(self.rows(), list(enumerate(self.names, start=1)))
+
+    def test_pages_ordered_by_column(self):
+        expected = [(2, None), (6, None), (3, "a"), (5, "a"), (8, "a"), (1, "b"), (7, "b"), (4, "c")]
+        self.assertEqual(self.rows(order_by=["product_name"]), expected)
+        self.client.use_sql = False
+        self.assertEqual(self.rows(order_by=["product_name"]), expected)
+
+    def test_filter_and_types(self):
+        records = list(self.client.iter_table(
+            "Price", filter={"actual": [True]}, columns=["actual", "product_name"],
+            column_types={"actual": "Bool"}, page_size=3, order_by=["product_name"],
+        ))
+        self.assertEqual(len(records), 7)
+        self.assertTrue(all(record["fields"]["actual"] is True for record in records))
+
+
+class ProductBatchesTests(SimpleTestCase):
+    def test_product_rows_stay_in_one_batch(self):
+        rows = [
+            {"product_name": name, "variation_name": variation}
+            for name, variation in [("a", "NEW"), ("a", "B/U"), ("b", "NEW"), ("c", "NEW"), ("c", "NEW 2"), ("d", "B/U")]
+        ]
+        batches = list(iter_product_batches(rows, batch_size=2))
+        self.assertEqual([list(batch) for batch in batches], [["a", "b"], ["c", "d"]])
+        self.assertEqual(len(batches[0]["a"]["used_products"]), 1)
+        self.assertEqual(len(batches[1]["c"]["new_products"]), 2)
+
+
+class DownloadImageTests(SimpleTestCase):
+    client_path = "apps.v1.products.integrations.product_lists.get_grist_client"
+
+    def test_grist_error_is_logged(self):
+        with mock.patch(self.client_path) as client:
+            client.return_value.iter_attachment.side_effect = GristAPIError("Grist API Error: 404", status_code=404)
+            with self.assertLogs("apps.v1.products.integrations.product_lists", level="WARNING"):
+                self.assertIsNone(download_image("7", [1], {}))
+
+    def test_programming_error_propagates(self):
+        with mock.patch(self.client_path) as client:
+            client.return_value.iter_attachment.side_effect = TypeError("bad call")
+            with self.assertRaises(TypeError):
+                download_image("7", [1], {})
+
+
+class ProductPropertiesFetchTests(SimpleTestCase):
+    def test_grist_error_is_logged(self):
+        with mock.patch("apps.v1.products.integrations.product_lists.get_grist_client") as client:
+            client.return_value.iter_table.side_effect = GristAPIError("Grist API Error: 500", status_code=500)
+            with self.assertLogs("apps.v1.products.integrations.product_lists", level="ERROR"):
+                self.assertIsNone(get_product_properties_from_grist())
+
+
+class PhoneticKeyTests(TestCase):
+    def test_spellings_converge(self):
+        self.assertEqual(search_keys("iphone"), ["ifon"])
+        self.assertEqual(search_keys("ayfon"), ["ifon"])
+        self.assertEqual(search_keys("айфон"), ["ifon"])
+        self.assertEqual(search_keys("xiaomi"), search_keys("сяоми"))
+        self.assertEqual(search_keys("samsung galaxy"), search_keys("самсунг галакси"))
+
+    def test_vowels_are_kept(self):
+        self.assertEqual(phonetic_key("xiaomi"), "siaomi")
+        self.assertEqual(phonetic_key("samsung"), "samsung")
+        self.assertEqual(phonetic_key("apple"), "apl")
+        self.assertEqual(phonetic_key("fen"), "fen")
+
+    def test_digits_unchanged(self):
+        self.assertEqual(search_keys("iPhone 15 Pro"), ["ifon", "15", "pro"])
+
+
+class SearchKeysConditionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Categories.objects.create(name="Test")
+        names = [
+            "iPhone 15 Pro",
+            "Xiaomi Redmi Note 13",
+            "Samsung Galaxy S24",
+            "Fen Dyson Supersonic",
+            "Apple Watch",
+            "Galaxy S24 Plus",
+            "Planshet Lenovo",
+            "Model 7",
+            "Monitor Mi",
+        ]
+        cls.products = {
+            name: Products.objects.create(name=name, category=category)
+            for name in names
+        }
+        replace_search_keys({product.id: name for name, product in cls.products.items()})
+
+    def search(self, text):
+        return set(filter_by_search_keys(Products.objects.all(), text, field="id").values_list('name', flat=True))
+
+    def test_xiaomi_does_not_match_samsung(self):
+        self.assertEqual(self.search("xiaomi"), {"Xiaomi Redmi Note 13"})
+        self.assertEqual(self.search("сяоми"), {"Xiaomi Redmi Note 13"})
+
+    def test_iphone_does_not_match_fen(self):
+        self.assertEqual(self.search("iphone"), {"iPhone 15 Pro"})
+        self.assertEqual(self.search("айфон"), {"iPhone 15 Pro"})
+        self.assertEqual(self.search("ayfon"), {"iPhone 15 Pro"})
+
+    def test_short_token_matches_whole_key_only(self):
+        self.assertEqual(self.search("Mi"), {"Monitor Mi"})
+
+    def test_apple_does_not_match_plus_or_planshet(self):
+        self.assertEqual(self.search("Apple"), {"Apple Watch"})
+
+    def test_prefix_of_three_or_more(self):
+        self.assertEqual(self.search("sams"), {"Samsung Galaxy S24"})
+        self.assertEqual(self.search("галакси"), {"Samsung Galaxy S24", "Galaxy S24 Plus"})
+
+    def test_every_token_must_match(self):
+        self.assertEqual(self.search("galaxy plus"), {"Galaxy S24 Plus"})
+
+    def test_no_keys(self):
+        self.assertIsNone(filter_by_search_keys(Products.objects.all(), "!!", field="id"))
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Categories.objects.create(name="Smartfonlar")
+        for name in ("iPhone 15 Pro", "Xiaomi Redmi Note 13", "Samsung Galaxy S24"):
+            product = Products.objects.create(name=name, category=category)
+            ProductReadModel.objects.create(
+                product=product, category=category, name=name, search_keywords=category.name, payload="{}"
+            )
+        replace_search_keys(dict(ProductReadModel.objects.values_list('product_id', 'name')))
+        update_search_vectors(ProductReadModel.objects.values_list('product_id', flat=True))
+
+    def search(self, text):
+        return [row.name for row in search_products(ProductReadModel.objects.all(), text)]
+
+    def test_without_trigram_extension(self):
+        with mock.patch("apps.v1.products.services.product_search.has_trigram_extension", return_value=False):
+            self.assertEqual(self.search("redm"), ["Xiaomi Redmi Note 13"])
+            self.assertEqual(self.search("айфон"), ["iPhone 15 Pro"])
+            self.assertEqual(len(self.search("smartfon")), 3)
+            self.assertEqual(self.search("!!"), [])
+
+
+class ReadModelSearchKeysTests(TestCase):
+    def test_unchanged_rows_get_missing_keys(self):
+        category = Categories.objects.create(name="Smartfonlar")
+        product = Products.objects.create(name="iPhone 15", category=category)
+        refresh_product_read_models()
+        ProductSearchKey.objects.all().delete()
+
+        result = refresh_product_read_models()
+        self.assertEqual(result["unchanged"], 1)
+        self.assertEqual(
+            set(ProductSearchKey.objects.filter(product=product).values_list('key', flat=True)),
+            {"ifon", "15", "smartfonlar"},
+        )
+
+
+class ReadModelBackfillTests(TestCase):
+    def test_import_builds_missing_and_stale_read_models(self):
+        category = Categories.objects.create(name="Smartfonlar")
+        first = Products.objects.create(name="iPhone 15", category=category)
+        ProductReadModel.objects.create(product=first, category=category, name=first.name, payload="{}")
+
+        # Render versiyasi belgilanmagan - butun katalog qayta render qilinadi
+        self.assertEqual(refresh_after_import([])["updated"], 1)
+        self.assertNotEqual(ProductReadModel.objects.get(product=first).payload, "{}")
+        self.assertIsNone(refresh_after_import([]))
+
+        second = Products.objects.create(name="iPhone 16", category=category)
+        self.assertEqual(refresh_after_import([])["created"], 1)
+        self.assertTrue(ProductReadModel.objects.filter(product=second).exists())
+
+
+def category_record(grist_id, name, row_hash):
+    return {"id": grist_id, "fields": {"name": name, "description": None}, "row_hash": row_hash}
+
+
+class SaveCategoryRecordsTests(TestCase):
+    def test_diff(self):
+        legacy = Categories.objects.create(name="Noutbuklar")
+        save_category_records([category_record(1, "Smartfonlar", "h1"), category_record(2, "Planshetlar", "h2")])
+
+        result = save_category_records([
+            category_record(1, "Smartfonlar", "h1"),
+            category_record(2, "Planshetlar (yangi)", "h2b"),
+            category_record(3, "Noutbuklar", "h3"),
+        ])
+        self.assertEqual((result["created"], result["updated"], result["unchanged"]), (0, 2, 1))
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.grist_category_id, "3")
+        self.assertEqual(Categories.objects.get(grist_category_id="2").name, "Planshetlar (yangi)")
+        self.assertEqual(set(result["changed_category_ids"]), set(
+            Categories.objects.filter(grist_category_id__in=["2", "3"]).values_list('id', flat=True)
+        ))
+
+    def test_deactivates_missing_and_duplicates(self):
+        save_category_records([category_record(1, "Smartfonlar", "h1"), category_record(2, "Planshetlar", "h2")])
+        duplicate = Categories.objects.create(name="Smartfonlar", grist_category_id="1")
+
+        result = save_category_records([category_record(1, "Smartfonlar", "h1")])
+        self.assertEqual(result["deactivated"], 2)
+        self.assertEqual(
+            set(Categories.objects.filter(is_active=False).values_list('id', flat=True)),
+            {duplicate.id, Categories.objects.get(grist_category_id="2").id},
+        )
+
+        result = save_category_records([category_record(1, "Smartfonlar", "h1"), category_record(2, "Planshetlar", "h2")])
+        self.assertEqual((result["updated"], result["deactivated"]), (1, 0))
+        self.assertTrue(Categories.objects.get(grist_category_id="2").is_active)
+
+    def test_serializer_hides_bookkeeping_fields(self):
+        save_category_records([category_record(1, "Smartfonlar", "h1")])
+        data = CategoriesSerializer(Categories.objects.get()).data
+        self.assertEqual(set(data), {"id", "name", "description", "created_at", "updated_at"})
+
+
+class StageFingerprintTests(TestCase):
+    records = [{"id": 1, "fields": {"name": "Smartfonlar"}}, {"id": 2, "fields": {"name": "Planshetlar"}}]
+
+    def fingerprint(self, stage="categories", records=None, force=False):
+        fingerprint = StageFingerprint(stage, force=force)
+        list(fingerprint.track("Categories", [dict(record) for record in records or self.records]))
+        return fingerprint
+
+    def test_unchanged_after_save(self):
+        self.assertFalse(self.fingerprint().unchanged())
+        self.fingerprint().save()
+        self.assertTrue(self.fingerprint().unchanged())
+        self.assertFalse(self.fingerprint(force=True).unchanged())
+
+        changed = [self.records[0], {"id": 2, "fields": {"name": "Planshetlar (yangi)"}}]
+        self.assertFalse(self.fingerprint(records=changed).unchanged())
+        self.assertFalse(self.fingerprint(records=self.records[:1]).unchanged())
+
+    def test_upstream_change_invalidates(self):
+        self.fingerprint().save()
+        self.fingerprint("products").save()
+        self.assertTrue(self.fingerprint("products").unchanged())
+        GristSyncState.objects.filter(stage="categories").update(fingerprint="other")
+        self.assertFalse(self.fingerprint("products").unchanged())
+
+    def test_changed_groups(self):
+        def grouped(names):
+            fingerprint = StageFingerprint("products")
+            records = [{"id": index, "fields": {"name": name}} for index, name in enumerate(names, start=1)]
+            list(fingerprint.track("Price", records, group_by=lambda record: record["fields"]["name"]))
+            return fingerprint
+
+        self.assertIsNone(grouped(["A", "B"]).changed_groups())
+        grouped(["A", "B"]).save()
+        self.assertEqual(grouped(["A", "B"]).changed_groups(), set())
+        self.assertEqual(grouped(["A", "C"]).changed_groups(), {"B", "C"})
+        self.assertIsNone(StageFingerprint("products", force=True).changed_groups())
+
+    def test_unchanged_import_skips_orm_work(self):
+        records = [dict(record) for record in self.records]
+        with mock.patch("apps.v1.products.integrations.category_list.get_grist_client") as client:
+            client.return_value.iter_table.side_effect = lambda *args, **kwargs: [
+                {"id": record["id"], "fields": dict(record["fields"])} for record in records
+            ]
+            client.return_value.stats_since.return_value = {}
+            self.assertEqual(get_categories()["created"], 2)
+            Categories.objects.update(name="Edited")
+
+            result = get_categories()
+            self.assertTrue(result["unchanged_table"])
+            self.assertFalse(Categories.objects.exclude(name="Edited").exists())
+
+            result = get_categories(force=True)
+            self.assertEqual(result["updated"], 0)
+            self.assertEqual(result["unchanged"], 2)
+
+
+def price_row(product_name, variation_name, variation_id, price, category_name="Smartfonlar"):
+    return {
+        "actual": True,
+        "product_name": product_name,
+        "product_id": 1,
+        "variation_name": variation_name,
+        "variation_id": variation_id,
+        "category_name": category_name,
+        "price": price,
+    }
+
+
+class SaveProductsTests(TestCase):
+    rows = [
+        price_row("iPhone 15", "iPhone 15 128GB NEW", 11, 1000),
+        price_row("iPhone 15", "iPhone 15 256GB NEW", 12, 1000),
+        price_row("iPhone 15", "iPhone 15 128GB B/U", 13, 700),
+    ]
+
+    def save(self, rows):
+        changed = set()
+        return save_products_to_db(process_products(rows), changed_product_ids=changed), changed
+
+    def test_create(self):
+        (created, updated, skipped, ids_created), changed = self.save(self.rows)
+        self.assertEqual((created, updated, skipped, ids_created), (2, 0, 0, 3))
+        self.assertEqual(set(Products.objects.values_list('id', flat=True)), changed)
+        used = ProductIDs.objects.get(variation_id="13").product
+        self.assertEqual(used.price, Decimal("700.00"))
+        self.assertTrue(Categories.objects.filter(name="Smartfonlar").exists())
+
+    def test_rerun_is_noop(self):
+        self.save(self.rows)
+        (created, updated, skipped, ids_created), changed = self.save(self.rows)
+        self.assertEqual((created, updated, ids_created), (0, 0, 0))
+        self.assertEqual(skipped, 2)
+        self.assertEqual(changed, set())
+        self.assertEqual(Products.objects.count(), 2)
+        self.assertEqual(ProductIDs.objects.count(), 3)
+
+    def test_update(self):
+        self.save(self.rows)
+        rows = self.rows[:2] + [price_row("iPhone 15", "iPhone 15 128GB B/U", 13, 650)]
+        (created, updated, skipped, ids_created), changed = self.save(rows)
+        self.assertEqual((created, updated, skipped, ids_created), (0, 1, 1, 0))
+        used = ProductIDs.objects.get(variation_id="13").product
+        self.assertEqual(changed, {used.id})
+        used.refresh_from_db()
+        self.assertEqual(used.price, Decimal("650.00"))
+
+    def test_reactivates_deactivated_product(self):
+        self.save(self.rows)
+        Products.objects.update(actual=False)
+        (created, updated, skipped, ids_created), changed = self.save(self.rows)
+        self.assertEqual((created, updated), (0, 2))
+        self.assertFalse(Products.objects.filter(actual=False).exists())
+
+
+class DeactivateUnseenProductsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Categories.objects.create(name="Test")
+        cls.first, cls.second, cls.third = (
+            Products.objects.create(name=name, category=category) for name in ("A", "B", "C")
+        )
+
+    def actual_names(self):
+        return set(Products.objects.filter(actual=True).values_list('name', flat=True))
+
+    def test_deactivates_unseen(self):
+        self.assertEqual(deactivate_unseen_products({self.first.id}), 2)
+        self.assertEqual(self.actual_names(), {"A"})
+
+    def test_scoped_by_product_names(self):
+        changed = set()
+        count = deactivate_unseen_products({self.first.id}, product_names=["A", "B"], changed_product_ids=changed)
+        self.assertEqual(count, 1)
+        self.assertEqual(changed, {self.second.id})
+        self.assertEqual(self.actual_names(), {"A", "C"})
+
+    def test_already_inactive_not_reported(self):
+        Products.objects.filter(pk=self.third.pk).update(actual=False)
+        changed = set()
+        deactivate_unseen_products({self.first.id}, changed_product_ids=changed)
+        self.assertEqual(changed, {self.second.id})
+
+
+class ProductDeactivationImportTests(TestCase):
+    def setUp(self):
+        self.standin = GristStandin({"Price": self.price_records(A=True, B=True)})
+        server = self.standin.serve()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        set_grist_client(GristClient(
+            base_url=self.standin.base_url(server), api_key="test", doc_id=self.standin.doc_id, max_retries=0
+        ))
+        self.addCleanup(set_grist_client, None)
+        patcher = mock.patch.object(product_lists, "Isell_PRODUCT_PRICE", "Price")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def price_records(**actual):
+        return [
+            {"id": index, "fields": {**price_row(name, f"{name} NEW", index, 100), "actual": value}}
+            for index, (name, value) in enumerate(sorted(actual.items()), start=1)
+        ]
+
+    def actual_names(self):
+        return set(Products.objects.filter(actual=True).values_list('name', flat=True))
+
+    def test_full_import_deactivates_products_left_the_price_list(self):
+        self.assertEqual(product_lists.get_products()["created"], 2)
+
+        self.standin.load_table("Price", self.price_records(A=True, B=False))
+        result = product_lists.get_products()
+        self.assertEqual(result["deactivated"], 1)
+        self.assertEqual(result["changed_product_ids"], [Products.objects.get(name="B").id])
+        self.assertEqual(self.actual_names(), {"A"})
+
+        self.standin.load_table("Price", self.price_records(A=True, B=True))
+        self.assertEqual(product_lists.get_products()["updated"], 1)
+        self.assertEqual(self.actual_names(), {"A", "B"})
+
+    def test_price_table_read_once_and_only_changed_products_saved(self):
+        self.assertEqual(product_lists.get_products()["grist"]["requests"], 1)
+
+        records = self.price_records(A=True, B=True)
+        records[0]["fields"]["price"] = 150
+        self.standin.load_table("Price", records)
+        result = product_lists.get_products()
+        self.assertEqual(result["grist"]["requests"], 1)
+        # B ning qatorlari o'zgarmagan - u qayta ishlanmaydi
+        self.assertEqual((result["updated"], result["skipped"]), (1, 0))
+        self.assertEqual(Products.objects.get(name="A").price, 150)
+
+    def test_empty_price_list_keeps_products(self):
+        product_lists.get_products()
+        self.standin.load_table("Price", self.price_records(A=False, B=False))
+        self.assertFalse(product_lists.get_products()["success"])
+        self.assertEqual(self.actual_names(), {"A", "B"})
+
+    def test_webhook_deactivates_only_changed_products(self):
+        product_lists.get_products()
+        records = self.price_records(A=False, B=True)
+        self.standin.load_table("Price", records)
+        result = product_lists.apply_price_rows(records[:1])
+        self.assertEqual(result["deactivated"], 1)
+        self.assertEqual(self.actual_names(), {"B"})
+
+
+class CharacteristicsImportTests(TestCase):
+    values = [
+        {"id": 100, "fields": {"property_id": 10, "value": "8 GB"}},
+        {"id": 101, "fields": {"property_id": 10, "value": "12 GB"}},
+    ]
+
+    def setUp(self):
+        category = Categories.objects.create(name="Smartfonlar")
+        ProductProperties.objects.create(name="RAM", grist_property_id="10")
+        for variation_id, name in enumerate(("A", "B"), start=1):
+            product = Products.objects.create(name=name, category=category)
+            ProductIDs.objects.create(product=product, variation_name=f"{name} 8/128", variation_id=str(variation_id))
+
+        self.standin = GristStandin({
+            "Product_property_value": self.product_values("A", "B"),
+            "Property_value": self.values,
+        })
+        server = self.standin.serve()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        set_grist_client(GristClient(
+            base_url=self.standin.base_url(server), api_key="test", doc_id=self.standin.doc_id, max_retries=0
+        ))
+        self.addCleanup(set_grist_client, None)
+        for name, table in (("ISell_PRODUCT_PROPERTY_VALUE", "Product_property_value"), ("ISell_PROPERTY_VALUE", "Property_value")):
+            patcher = mock.patch.object(product_lists, name, table)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def product_values(*names):
+        return [
+            {"id": index, "fields": {"product_name": name, "variation_id": index, "value_id": 99 + index, "property_id": 10}}
+            for index, name in enumerate(("A", "B"), start=1) if name in names
+        ]
+
+    def characteristics(self):
+        return dict(ProductCharacteristics.objects.values_list('product__name', 'value'))
+
+    def test_product_without_rows_loses_characteristics(self):
+        self.assertTrue(product_lists.import_product_characteristics()["success"])
+        self.assertEqual(self.characteristics(), {"A": "8 GB", "B": "12 GB"})
+
+        self.standin.load_table("Product_property_value", self.product_values("A"))
+        self.assertTrue(product_lists.import_product_characteristics()["success"])
+        self.assertEqual(self.characteristics(), {"A": "8 GB"})
+
+
+class KeysetPaginationTests(TestCase):
+    factory = APIRequestFactory()
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categories.objects.create(name="Test")
+        # Narxlar takrorlanadi - tartib product_id bilan to'ldiriladi
+        for index, price in enumerate([300, 100, 200, 100, 300, 200, 100]):
+            product = Products.objects.create(name=f"Model {index}", category=category)
+            ProductReadModel.objects.create(
+                product=product, category=category, name=product.name, price=price, payload="{}"
+            )
+
+    def paginator(self):
+        return KeysetPagination(orderings={"id": ("product_id",), "price": ("price", "product_id")})
+
+    def page(self, params):
+        paginator = self.paginator()
+        request = Request(self.factory.get('/api/v1/products/', {"page_size": 3, **params}))
+        rows = paginator.paginate_queryset(ProductReadModel.objects.all(), request)
+        links = [paginator.get_next_link(), paginator.get_previous_link()]
+        cursors = [parse_qs(urlparse(link).query)["cursor"][0] if link else None for link in links]
+        return [row.product_id for row in rows], cursors[0], cursors[1]
+
+    def walk(self, ordering):
+        pages = []
+        params = {"ordering": ordering}
+        while True:
+            rows, next_cursor, previous_cursor = self.page(params)
+            pages.append((rows, previous_cursor))
+            if next_cursor is None:
+                return pages
+            params = {"cursor": next_cursor}
+
+    def expected(self, ordering):
+        fields = ("-price", "-product_id") if ordering == "-price" else ("price", "product_id")
+        return list(ProductReadModel.objects.order_by(*fields).values_list('product_id', flat=True))
+
+    def test_next_pages_cover_all_rows(self):
+        for ordering in ("price", "-price"):
+            pages = self.walk(ordering)
+            self.assertEqual([product_id for rows, _ in pages for product_id in rows], self.expected(ordering))
+            self.assertEqual([len(rows) for rows, _ in pages], [3, 3, 1])
+            self.assertIsNone(pages[0][1])
+
+    def test_previous_returns_same_pages(self):
+        for ordering in ("price", "-price"):
+            pages = self.walk(ordering)
+            for index in range(len(pages) - 1, 0, -1):
+                rows, _, previous_cursor = self.page({"cursor": pages[index][1]})
+                self.assertEqual(rows, pages[index - 1][0])
+            self.assertIsNone(previous_cursor)
+
+    def test_previous_page_links_forward(self):
+        pages = self.walk("price")
+        rows, next_cursor, _ = self.page({"cursor": pages[1][1]})
+        self.assertEqual(self.page({"cursor": next_cursor})[0], pages[1][0])
+
+    def test_cursor_round_trip(self):
+        paginator = self.paginator()
+        for ordering, backwards, key in [("-price", True, ["100.00", 4]), ("id", False, [7])]:
+            self.assertEqual(paginator.decode_cursor(paginator.encode_cursor(ordering, backwards, key)), (ordering, backwards, key))
+
+    def test_invalid_cursor_rejected(self):
+        paginator = self.paginator()
+        for token in [
+            "not-base64!",
+            paginator.encode_cursor("name", False, [1]),
+            paginator.encode_cursor("price", False, [100]),
+            paginator.encode_cursor("price", False, [100, 1, 2]),
+        ]:
+            with self.assertRaises(NotFound):
+                paginator.decode_cursor(token)
+
+    def test_parse_key(self):
+        paginator = self.paginator()
+        fields = ("price", "product_id")
+        self.assertEqual(paginator.parse_key(ProductReadModel, fields, ["100.50", "3"]), [Decimal("100.50"), 3])
+        for key in [[None, 3], ["abc", 3], ["100", True], [["100"], 3], ["100", {"id": 3}]]:
+            with self.assertRaises(NotFound):
+                paginator.parse_key(ProductReadModel, fields, key)
+        with self.assertRaises(NotFound):
+            paginator.parse_key(ProductReadModel, ("missing",), [1])
+
+    def test_tampered_cursor_returns_404(self):
+        cursor = self.paginator().encode_cursor("price", False, ["abc", 1])
+        with self.assertRaises(NotFound):
+            self.page({"cursor": cursor})
+
+
+class WebhookEventsTests(TestCase):
+    handler = "apps.v1.products.integrations.product_lists.apply_price_rows"
+
+    def event(self, *records):
+        return GristWebhookEvent.objects.create(
+            table=GristWebhookEvent.Table.PRICE, records=list(records), row_count=len(records)
+        )
+
+    def test_merge_records_keeps_last_state(self):
+        events = [
+            self.event({"id": 1, "fields": {"price": 10}}, {"id": 2, "fields": {"price": 20}}),
+            self.event({"id": 1, "fields": {"price": 11}}),
+        ]
+        self.assertEqual(merge_records(events), [
+            {"id": 2, "fields": {"price": 20}},
+            {"id": 1, "fields": {"price": 11}},
+        ])
+
+    def test_apply_events(self):
+        events = [self.event({"id": 1, "fields": {}}), self.event({"id": 1, "fields": {}}, {"id": 2, "fields": {}})]
+        with mock.patch(self.handler, return_value={"updated": 2}) as handler:
+            self.assertTrue(apply_events(GristWebhookEvent.Table.PRICE, events))
+        self.assertEqual(len(handler.call_args.args[0]), 2)
+        for event in GristWebhookEvent.objects.all():
+            self.assertEqual(event.status, GristWebhookEvent.Status.APPLIED)
+            self.assertEqual(event.result, {"updated": 2, "rows": 2})
+
+    def test_failed_events_retry_then_fail(self):
+        event = self.event({"id": 1, "fields": {}})
+        with mock.patch(self.handler, side_effect=RuntimeError("Grist down")), \
+                self.assertLogs("apps.v1.products.services.grist_webhooks", level="ERROR"):
+            for attempt in range(1, WEBHOOK_MAX_ATTEMPTS + 1):
+                self.assertFalse(apply_events(GristWebhookEvent.Table.PRICE, [event]))
+                event.refresh_from_db()
+                self.assertEqual(event.attempts, attempt)
+        self.assertEqual(event.status, GristWebhookEvent.Status.FAILED)
+        self.assertEqual(event.error, "Grist down")
+
+    def test_failed_handler_rolls_back(self):
+        def handler(records):
+            Categories.objects.create(name="Partial")
+            raise RuntimeError("Grist down")
+
+        event = self.event({"id": 1, "fields": {}})
+        with mock.patch(self.handler, side_effect=handler), \
+                self.assertLogs("apps.v1.products.services.grist_webhooks", level="ERROR"):
+            self.assertFalse(apply_events(GristWebhookEvent.Table.PRICE, [event]))
+        self.assertFalse(Categories.objects.exists())
+
+    def test_lock_busy_events_wait_retry_delay(self):
+        event = self.event({"id": 1, "fields": {}})
+        with mock.patch("apps.v1.products.services.grist_webhooks.import_lock", return_value=nullcontext(False)):
+            self.assertEqual(process_webhook_events(), 0)
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (GristWebhookEvent.Status.QUEUED, 0))
+
+        with mock.patch(self.handler, return_value={"updated": 1}) as handler:
+            self.assertEqual(process_webhook_events(), 0)
+            GristWebhookEvent.objects.filter(pk=event.pk).update(processed_at=timezone.now() - WEBHOOK_RETRY_DELAY)
+            self.assertEqual(process_webhook_events(), 1)
+        handler.assert_called_once()
+
+    def test_normalize_records(self):
+        self.assertEqual(normalize_records([{"id": 1, "manualSort": 1, "price": 10}, {"price": 20}, "x"]), [
+            {"id": 1, "fields": {"price": 10}},
+        ])
+        self.assertEqual(normalize_records({"records": [{"id": 2, "fields": {"price": 30}}]}), [
+            {"id": 2, "fields": {"price": 30}},
+        ])
+        with self.assertRaises(ValueError):
+            normalize_records("price")
+
+    def test_process_applies_queued_and_stale_events(self):
+        queued = self.event({"id": 1, "fields": {}})
+        stale = self.event({"id": 2, "fields": {}})
+        GristWebhookEvent.objects.filter(pk=stale.pk).update(
+            status=GristWebhookEvent.Status.PROCESSING, started_at=timezone.now() - STALE_JOB_TIMEOUT * 2
+        )
+        running = self.event({"id": 3, "fields": {}})
+        GristWebhookEvent.objects.filter(pk=running.pk).update(
+            status=GristWebhookEvent.Status.PROCESSING, started_at=timezone.now()
+        )
+
+        with mock.patch(self.handler, return_value={"updated": 2}) as handler:
+            self.assertEqual(process_webhook_events(), 2)
+            self.assertEqual(process_webhook_events(), 0)
+        handler.assert_called_once()
+        self.assertEqual([record["id"] for record in handler.call_args.args[0]], [1, 2])
+        self.assertEqual(
+            set(GristWebhookEvent.objects.filter(status=GristWebhookEvent.Status.APPLIED).values_list('id', flat=True)),
+            {queued.id, stale.id},
+        )
+
+
+class GristWebhookViewTests(TestCase):
+    secret = "webhook-secret"
+
+    def setUp(self):
+        patcher = mock.patch("apps.v1.products.services.grist_webhooks.WEBHOOK_SECRET", self.secret)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def post(self, table=GristWebhookEvent.Table.PRICE, data=None, secret=None, **extra):
+        if secret is not None:
+            extra["HTTP_X_GRIST_WEBHOOK_SECRET"] = secret
+        url = reverse('grist-webhook', args=[table])
+        return self.client.post(url, data if data is not None else [{"id": 1, "price": 10}], format="json", **extra)
+
+    def test_secret_required(self):
+        self.assertEqual(self.post().status_code, 403)
+        self.assertEqual(self.post(secret="wrong").status_code, 403)
+        self.assertEqual(self.post(HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertFalse(GristWebhookEvent.objects.exists())
+
+    def test_secret_not_configured(self):
+        with mock.patch("apps.v1.products.services.grist_webhooks.WEBHOOK_SECRET", None):
+            self.assertEqual(self.post(secret=self.secret).status_code, 503)
+
+    def test_accepts_secret_sources(self):
+        responses = [
+            self.post(secret=self.secret),
+            self.post(HTTP_AUTHORIZATION=f"Bearer {self.secret}"),
+            self.post(HTTP_AUTHORIZATION=self.secret),
+        ]
+        self.assertEqual([response.status_code for response in responses], [202, 202, 202])
+        # Secret URL da (loglarda) qolmasligi uchun query parametri qabul qilinmaydi
+        url = reverse('grist-webhook', args=[GristWebhookEvent.Table.PRICE]) + f"?secret={self.secret}"
+        self.assertEqual(self.client.post(url, [{"id": 1}], format="json").status_code, 403)
+        event = GristWebhookEvent.objects.get(pk=responses[0].data["event_id"])
+        self.assertEqual(event.status, GristWebhookEvent.Status.QUEUED)
+        self.assertEqual(event.records, [{"id": 1, "fields": {"price": 10}}])
+
+    def test_rejects_unknown_table_and_bad_payload(self):
+        self.assertEqual(self.post(table="unknown", secret=self.secret).status_code, 404)
+        self.assertEqual(self.post(data={"records": "x"}, secret=self.secret).status_code, 400)
+
+
+class ImportWorkerTests(TestCase):
+    def setUp(self):
+        # Qulf boshqa jarayonda (grist_sync) ushlanganini alohida ulanish bilan taqlid qilish
+        other = connection.copy()
+        self.addCleanup(other.close)
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s, %s)", [LOCK_NAMESPACE_RUN, lock_key(ImportJob.Kind.CATEGORIES)])
+        self.locked = ImportJob.objects.create(kind=ImportJob.Kind.CATEGORIES)
+        self.free = ImportJob.objects.create(kind=ImportJob.Kind.TARIFFS)
+
+    def test_claim_skips_locked_kinds(self):
+        self.assertEqual(claim_next_job(), self.free)
+        self.assertIsNone(claim_next_job())
+
+    def run_worker(self):
+        # close_old_connections TestCase tranzaksiyasidagi ulanishni yopib yuboradi
+        with mock.patch("apps.v1.products.services.import_jobs.close_old_connections"), \
+                mock.patch("apps.v1.products.services.import_jobs.run_job") as run_job, \
+                mock.patch("apps.v1.products.services.grist_webhooks.process_webhook_events", return_value=0) as events:
+            run_worker(once=True)
+        return [call.args[0] for call in run_job.call_args_list], events
+
+    def test_worker_moves_past_job_locked_after_claim(self):
+        ImportJob.objects.filter(pk=self.locked.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        with mock.patch("apps.v1.products.services.import_jobs.locked_kinds", return_value=set()):
+            ran, events = self.run_worker()
+        self.assertEqual(ran, [self.free])
+        events.assert_called()
+        self.locked.refresh_from_db()
+        self.assertEqual(self.locked.status, ImportJob.Status.QUEUED)
+        self.assertGreater(self.locked.updated_at, timezone.now() - timedelta(minutes=1))
+
+
+class EnqueueImportTests(TestCase):
+    kind = ImportJob.Kind.CATEGORIES
+
+    def test_concurrent_triggers_share_one_job(self):
+        job, mode = enqueue_import(self.kind)
+        self.assertEqual(mode, "created")
+        self.assertEqual(enqueue_import(self.kind), (job, "attached"))
+        ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.Status.RUNNING)
+        self.assertEqual(enqueue_import(self.kind), (job, "attached"))
+        self.assertEqual(ImportJob.objects.count(), 1)
+
+    def test_cooldown_returns_last_result(self):
+        job = ImportJob.objects.create(
+            kind=self.kind, status=ImportJob.Status.SUCCEEDED, finished_at=timezone.now() - timedelta(seconds=5)
+        )
+        self.assertEqual(enqueue_import(self.kind), (job, "cached"))
+        ImportJob.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(enqueue_import(self.kind)[1], "created")
+
+    def test_force_skips_cooldown(self):
+        ImportJob.objects.create(kind=self.kind, status=ImportJob.Status.SUCCEEDED, finished_at=timezone.now())
+        job, mode = enqueue_import(self.kind, force=True)
+        self.assertEqual(mode, "created")
+        self.assertTrue(job.force)
+
+    def test_force_upgrades_queued_job(self):
+        job, _ = enqueue_import(self.kind)
+        self.assertEqual(enqueue_import(self.kind, force=True), (job, "attached"))
+        job.refresh_from_db()
+        self.assertTrue(job.force)
+
+    def test_force_queues_after_running_job(self):
+        running = ImportJob.objects.create(kind=self.kind, status=ImportJob.Status.RUNNING)
+        job, mode = enqueue_import(self.kind, force=True)
+        self.assertEqual(mode, "created")
+        self.assertNotEqual(job, running)
+        self.assertTrue(job.force)
+        self.assertEqual(enqueue_import(self.kind, force=True), (job, "attached"))
+
+
+@mock.patch.object(instrumentation, "TRACE_MEMORY", True)
+@mock.patch.object(instrumentation, "get_grist_client")
+class ImportMetricsTests(SimpleTestCase):
+    def test_memory_reported_only_for_serial_stages(self, client):
+        client.return_value.stats_since.return_value = {"seconds": 0.0, "requests": 0, "bytes": 0}
+        with instrumentation.ImportMetrics("categories") as serial:
+            pass
+        self.assertIn("memory_peak_mb", serial.summary())
+
+        first, second = instrumentation.ImportMetrics("categories"), instrumentation.ImportMetrics("products")
+        first.__enter__()
+        with second:
+            pass
+        first.__exit__(None, None, None)
+        self.assertNotIn("memory_peak_mb", first.summary())
+        self.assertNotIn("memory_peak_mb", second.summary())
+
+
+class RunSyncTests(SimpleTestCase):
+    def run_sync(self, stages, failing=()):
+        started = []
+
+        def run_stage(name, origin, force=False):
+            started.append(name)
+            status = grist_sync.FAILED if name in failing else grist_sync.SUCCEEDED
+            return {"status": status, "result": {"success": status == grist_sync.SUCCEEDED}, "rows": {}, "seconds": 0.0}
+
+        with mock.patch.object(grist_sync, "run_stage", side_effect=run_stage), \
+                mock.patch.object(grist_sync, "refresh_after_import") as refresh:
+            result = grist_sync.run_sync(stages, workers=1)
+        return result["stages"], started, [kind for kind, _ in refresh.call_args.args[0]]
+
+    def test_with_dependencies(self):
+        self.assertEqual(grist_sync.with_dependencies(["variants"]), {"variants", "images", "products", "categories"})
+        self.assertEqual(grist_sync.with_dependencies(["quote_tables"]), {"quote_tables", "advanced_payment"})
+
+    def test_plan_waves(self):
+        self.assertEqual(grist_sync.plan_waves(grist_sync.with_dependencies(["characteristics", "images"])), [
+            ["categories", "properties"],
+            ["products"],
+            ["characteristics", "images"],
+        ])
+        # Tanlanmagan bog'liqliklar kutilmaydi
+        self.assertEqual(grist_sync.plan_waves({"details", "images"}), [["details", "images"]])
+
+    def test_plan_waves_rejects_cycle(self):
+        with mock.patch.dict(grist_sync.STAGE_DEPENDENCIES, {"categories": ["products"]}), \
+                self.assertRaises(ValueError):
+            grist_sync.plan_waves({"categories", "products"})
+
+    def test_dependents_start_after_dependencies(self):
+        stages = grist_sync.with_dependencies(["details", "quote_tables"])
+        outcomes, started, _ = self.run_sync(stages)
+        self.assertEqual(set(outcomes), stages)
+        for name in stages:
+            for dependency in grist_sync.stage_dependencies(name, stages):
+                self.assertLess(started.index(dependency), started.index(name))
+
+    def test_failed_dependency_skips_dependents(self):
+        stages = grist_sync.with_dependencies(["details", "characteristics", "variants"])
+        outcomes, started, refreshed = self.run_sync(stages, failing={"products"})
+        statuses = {name: outcome["status"] for name, outcome in outcomes.items()}
+        self.assertEqual(statuses, {
+            "categories": grist_sync.SUCCEEDED,
+            "properties": grist_sync.SUCCEEDED,
+            "products": grist_sync.FAILED,
+            "details": grist_sync.SKIPPED,
+            "characteristics": grist_sync.SKIPPED,
+            "images": grist_sync.SKIPPED,
+            "variants": grist_sync.SKIPPED,
+        })
+        self.assertEqual(sorted(started), ["categories", "products", "properties"])
+        self.assertEqual(sorted(refreshed), sorted(
+            grist_sync.STAGE_KINDS[name] for name in ("categories", "products", "properties")
+        ))
+
+
+class ImportPermissionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def login(self, is_staff):
+        user = get_user_model().objects.create(phone_number="+998901234567", is_staff=is_staff)
+        self.client.force_authenticate(user)
+
+    def test_anonymous_cannot_force(self):
+        response = self.client.get('/api/v1/products/import-categories/', {"force": 1})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_staff_can_force(self):
+        self.login(is_staff=True)
+        response = self.client.get('/api/v1/products/import-categories/', {"force": 1})
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(ImportJob.objects.get().force)
+
+    def test_cached_result_hidden_from_anonymous(self):
+        ImportJob.objects.create(
+            kind=ImportJob.Kind.CATEGORIES, status=ImportJob.Status.SUCCEEDED,
+            finished_at=timezone.now(), result={"categories": {"created": 1}},
+        )
+        response = self.client.get('/api/v1/products/import-categories/')
+        self.assertEqual(response.data["mode"], "cached")
+        self.assertNotIn("result", response.data)
+
+    def test_status_url_only_for_staff(self):
+        response = self.client.get('/api/v1/products/import-categories/')
+        self.assertEqual(response.data["mode"], "created")
+        self.assertNotIn("status_url", response.data)
+        self.assertEqual(self.client.get('/api/v1/products/import-categories/').data["mode"], "attached")
+
+        self.login(is_staff=True)
+        response = self.client.get('/api/v1/products/import-categories/')
+        self.assertEqual(response.data["mode"], "attached")
+        self.assertEqual(self.client.get(response.data["status_url"]).status_code, 200)
+
+    def test_status_requires_staff(self):
+        job = ImportJob.objects.create(kind=ImportJob.Kind.CATEGORIES)
+        self.assertIn(self.client.get(f'/api/v1/products/import-jobs/{job.id}/').status_code, (401, 403))
+        self.login(is_staff=True)
+        self.assertEqual(self.client.get(f'/api/v1/products/import-jobs/{job.id}/').status_code, 200)
+
+
+class PercentageMatrixTests(TestCase):
+    def setUp(self):
+        # Jarayon ichidagi matritsa testlar orasida saqlanmasin
+        patcher = mock.patch.object(percentage_matrix, "_matrix", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        percentage_matrix.reset_local_matrix()
+        ProductCategory.objects.create(grist_risk_category_id="1", grist_price_category_id="10", percentage=15)
+        ProductCategory.objects.create(grist_risk_category_id="1", grist_price_category_id="20", percentage=None)
+        ProductCategory.objects.create(grist_risk_category_id="1", grist_price_category_id="10", percentage=99)
+        ProductCategory.objects.create(grist_risk_category_id=None, grist_price_category_id="10", percentage=50)
+
+    def test_lookup(self):
+        matrix = get_percentage_matrix()
+        self.assertEqual(len(matrix), 2)
+        self.assertEqual(matrix.percentage(1, 10), 15)
+        self.assertEqual(matrix.percentage("1", "20"), 0)
+        self.assertIsNone(matrix.percentage("2", "10"))
+
+    def test_cached_until_invalidated(self):
+        matrix = get_percentage_matrix()
+        ProductCategory.objects.filter(grist_price_category_id="20").update(percentage=30)
+        self.assertIs(get_percentage_matrix(), matrix)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_percentage_matrix()
+        reloaded = get_percentage_matrix()
+        self.assertIsNot(reloaded, matrix)
+        self.assertEqual(reloaded.percentage("1", "20"), 30)
+        self.assertEqual(matrix.percentage("1", "20"), 0)
@@ -1,7 +1,8 @@
 from django.urls import path
-from apps.v1.products.views.import_views import ImportProductsView, ImportCategoriesView, ImportCharacteristicsView, ImportAdvancedPaymentAssessmentView, ImportProductImagesView
+from apps.v1.products.views.import_views import ImportProductsView, ImportCategoriesView, ImportCharacteristicsView, ImportAdvancedPaymentAssessmentView, ImportProductImagesView, ImportJobStatusView
+from apps.v1.products.views.webhook_views import GristWebhookView
 from apps.v1.products.views.category_views import CategoryListView
-from apps.v1.products.views.product_views import ProductListView, ProductDetailView, ProductDetailFilterView, CalculateMonthlyPaymentView, CalculatePaymentScheduleView
+from apps.v1.products.views.product_views import ProductListView, ProductAutocompleteView, ProductDetailView, ProductDetailFilterView, CalculateMonthlyPaymentView, CalculatePaymentScheduleView
 
 
 urlpatterns = [
@@ -21,12 +22,21 @@ urlpatterns = [
     # Импорт изображений продуктов
     path('import-images/', ImportProductImagesView.as_view(), name='import-images'),
     
+    # Статус задачи импорта
+    path('import-jobs/<int:job_id>/', ImportJobStatusView.as_view(), name='import-job-status'),
+    
+    # Вебхук Grist (инкрементальные изменения)
+    path('webhooks/grist/<str:table>/', GristWebhookView.as_view(), name='grist-webhook'),
+    
     # Список категорий
     path('categories/', CategoryListView.as_view(), name='categories'),
     
     # Список продуктов
     path('', ProductListView.as_view(), name='products'),
     
+    # Подсказки поиска (autocomplete)
+    path('autocomplete/', ProductAutocompleteView.as_view(), name='product-autocomplete'),
+    
     # Детальная информация о продукте
     path('<int:product_id>/', ProductDetailView.as_view(), name='product-detail'),
     
@@ -28,6 +28,11 @@ class BannerListView(APIView):
                             "name": openapi.Schema(type=openapi.TYPE_STRING, description="Название баннера"),
                             "description": openapi.Schema(type=openapi.TYPE_STRING, description="Описание баннера"),
                             "link": openapi.Schema(type=openapi.TYPE_STRING, description="Ссылка на баннер"),   
+                            "image": openapi.Schema(type=openapi.TYPE_STRING, description="Изображение (оригинал)"),
+                            "variants": openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                description="Варианты изображения: thumbnail/card/full -> {width, height, webp, jpeg}"
+                            ),
                             "is_active": openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Активный"),
                             "order": openapi.Schema(type=openapi.TYPE_INTEGER, description="Порядок"),
                         }
@@ -35,6 +35,6 @@ class CategoryListView(APIView):
         }
     )
     def get(self, request):
-        categories = Categories.objects.all()
+        categories = Categories.objects.filter(is_active=True)
         serializer = CategoriesSerializer(categories, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
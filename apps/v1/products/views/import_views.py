@@ -1,110 +1,157 @@
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from apps.v1.products.integrations.product_lists import get_products, import_product_details, import_product_properties, import_product_characteristics, import_product_images
-from apps.v1.products.integrations.category_list import get_categories
-from apps.v1.order.integrations.advanced_payment_assessment import get_advanced_payment_assessment
+from rest_framework.exceptions import PermissionDenied
+from apps.v1.products.models import ImportJob
+from apps.v1.products.services.import_jobs import enqueue_import
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
+
+
+IMPORT_JOB_RESPONSE = openapi.Response(
+    description="Импорт поставлен в очередь",
+    schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+        "message": openapi.Schema(type=openapi.TYPE_STRING, description="Сообщение о результате"),
+        "job_id": openapi.Schema(type=openapi.TYPE_INTEGER, description="ID задачи импорта"),
+        "status": openapi.Schema(type=openapi.TYPE_STRING, description="Статус задачи"),
+        "mode": openapi.Schema(type=openapi.TYPE_STRING, description="created / attached / cached"),
+        "status_url": openapi.Schema(type=openapi.TYPE_STRING, description="URL для проверки статуса (только для администраторов)")
+    })
+)
+
+
+ENQUEUE_MESSAGES = {
+    "created": "Импорт поставлен в очередь",
+    "attached": "Импорт уже выполняется - запрос присоединён к текущей задаче",
+    "cached": "Импорт недавно выполнен - возвращён последний результат",
+}
+
+
+IMPORT_FORCE_PARAMETER = openapi.Parameter(
+    'force', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, required=False,
+    description="1 - игнорировать cool-down и импортировать заново, даже если данные в Grist не изменились (только для администраторов)"
+)
+
+
+def enqueue_import_response(request, kind):
+    """Import job ni navbatga qo'yib, 202 javob qaytarish (cool-down ichida oxirgi natija 200 bilan)"""
+    force = request.query_params.get('force') in ('1', 'true', 'True')
+    if force and not request.user.is_staff:
+        raise PermissionDenied("Принудительный импорт доступен только администраторам")
+    job, mode = enqueue_import(kind, force=force)
+    data = {
+        "message": ENQUEUE_MESSAGES[mode],
+        "job_id": job.id,
+        "status": job.status,
+        "mode": mode,
+    }
+    # Status endpoint faqat staff uchun - boshqalarga ochilmaydigan havola berilmaydi
+    if request.user.is_staff:
+        data["status_url"] = request.build_absolute_uri(reverse('import-job-status', args=[job.id]))
+    if mode == "cached":
+        data["finished_at"] = job.finished_at
+        if request.user.is_staff:
+            data["result"] = job.result
+        return Response(data, status=status.HTTP_200_OK)
+    return Response(data, status=status.HTTP_202_ACCEPTED)
 
 
 class ImportCategoriesView(APIView):
     permission_classes = [AllowAny]
     @swagger_auto_schema(
         tags=['Импорт'],
-        operation_description="Импорт категорий",
-        responses={200: openapi.Response(description="Категории импортированы успешно", schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
-            "message": openapi.Schema(type=openapi.TYPE_STRING, description="Сообщение о результате импорта")
-        }))}
+        operation_description="Импорт категорий (в фоне)",
+        manual_parameters=[IMPORT_FORCE_PARAMETER],
+        responses={202: IMPORT_JOB_RESPONSE}
     )
     def get(self, request):
-        categories = get_categories()
-        return Response({"message": "Категории импортированы успешно"}, status=status.HTTP_200_OK)
+        return enqueue_import_response(request, ImportJob.Kind.CATEGORIES)
 
 
 class ImportProductsView(APIView):
     permission_classes = [AllowAny]
     @swagger_auto_schema(
         tags=['Импорт'],
-        operation_description="Импорт продуктов и деталей",
-        responses={200: openapi.Response(description="Продукты и детали импортированы успешно", schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
-            "message": openapi.Schema(type=openapi.TYPE_STRING, description="Сообщение о результате импорта")
-        }))}
+        operation_description="Импорт продуктов и деталей (в фоне)",
+        manual_parameters=[IMPORT_FORCE_PARAMETER],
+        responses={202: IMPORT_JOB_RESPONSE}
     )
     def get(self, request):
-        products = get_products()
-        details = import_product_details()
-        
-        return Response({
-            "message": "Продукты и детали импортированы успешно",
-            "products": products,
-            "details": details
-        }, status=status.HTTP_200_OK)
+        return enqueue_import_response(request, ImportJob.Kind.PRODUCTS)
 
 
 class ImportCharacteristicsView(APIView):
     permission_classes = [AllowAny]
     @swagger_auto_schema(
         tags=['Импорт'],
-        operation_description="Импорт характеристик продуктов",
-        responses={200: openapi.Response(description="Характеристики импортированы успешно", schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
-            "message": openapi.Schema(type=openapi.TYPE_STRING, description="Сообщение о результате импорта")
-        }))}
+        operation_description="Импорт свойств и характеристик продуктов (в фоне)",
+        manual_parameters=[IMPORT_FORCE_PARAMETER],
+        responses={202: IMPORT_JOB_RESPONSE}
     )
     def get(self, request):
-        # Avval properties import qilamiz
-        properties = import_product_properties()
-        
-        # Keyin characteristics import qilamiz
-        characteristics = import_product_characteristics()
-        
-        return Response({
-            "message": "Свойства и характеристики импортированы успешно",
-            "properties": properties,
-            "characteristics": characteristics
-        }, status=status.HTTP_200_OK)
+        return enqueue_import_response(request, ImportJob.Kind.CHARACTERISTICS)
 
 
 class ImportAdvancedPaymentAssessmentView(APIView):
     permission_classes = [AllowAny]
     @swagger_auto_schema(
         tags=['Импорт'],
-        operation_description="Импорт категорий продуктов с advanced payment assessment",
-        responses={200: openapi.Response(description="Advanced payment assessment импортирован успешно", schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
-            "message": openapi.Schema(type=openapi.TYPE_STRING, description="Сообщение о результате импорта"),
-            "created": openapi.Schema(type=openapi.TYPE_INTEGER, description="Количество созданных записей"),
-            "updated": openapi.Schema(type=openapi.TYPE_INTEGER, description="Количество обновленных записей"),
-            "skipped": openapi.Schema(type=openapi.TYPE_INTEGER, description="Количество пропущенных записей")
-        }))}
+        operation_description="Импорт категорий продуктов с advanced payment assessment (в фоне)",
+        manual_parameters=[IMPORT_FORCE_PARAMETER],
+        responses={202: IMPORT_JOB_RESPONSE}
     )
     def get(self, request):
-        result = get_advanced_payment_assessment()
-        
-        if result.get("success"):
-            return Response(result, status=status.HTTP_200_OK)
-        else:
-            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return enqueue_import_response(request, ImportJob.Kind.ADVANCED_PAYMENT)
 
 
 class ImportProductImagesView(APIView):
     permission_classes = [AllowAny]
     @swagger_auto_schema(
         tags=['Импорт'],
-        operation_description="Импорт изображений продуктов из Grist",
-        responses={200: openapi.Response(description="Изображения импортированы успешно", schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
-            "message": openapi.Schema(type=openapi.TYPE_STRING, description="Сообщение о результате импорта"),
-            "created": openapi.Schema(type=openapi.TYPE_INTEGER, description="Количество созданных изображений"),
-            "skipped": openapi.Schema(type=openapi.TYPE_INTEGER, description="Количество пропущенных изображений"),
-            "total_downloaded": openapi.Schema(type=openapi.TYPE_INTEGER, description="Общее количество загруженных файлов"),
-            "total_products": openapi.Schema(type=openapi.TYPE_INTEGER, description="Количество продуктов с изображениями")
-        }))}
+        operation_description="Импорт изображений продуктов из Grist (в фоне)",
+        manual_parameters=[IMPORT_FORCE_PARAMETER],
+        responses={202: IMPORT_JOB_RESPONSE}
     )
     def get(self, request):
-        result = import_product_images()
+        return enqueue_import_response(request, ImportJob.Kind.IMAGES)
+
+
+class ImportJobStatusView(APIView):
+    permission_classes = [IsAdminUser]
+    @swagger_auto_schema(
+        tags=['Импорт'],
+        operation_description="Статус задачи импорта: прогресс по этапам, количество строк и длительность (только для администраторов)",
+        responses={200: openapi.Response(description="Статус задачи импорта", schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+            "job_id": openapi.Schema(type=openapi.TYPE_INTEGER, description="ID задачи импорта"),
+            "kind": openapi.Schema(type=openapi.TYPE_STRING, description="Тип импорта"),
+            "force": openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Принудительный импорт"),
+            "status": openapi.Schema(type=openapi.TYPE_STRING, description="queued / running / succeeded / failed"),
+            "stages": openapi.Schema(type=openapi.TYPE_OBJECT, description="Этапы: status, started_at, finished_at, seconds, rows"),
+            "error": openapi.Schema(type=openapi.TYPE_STRING, description="Ошибка"),
+            "result": openapi.Schema(type=openapi.TYPE_OBJECT, description="Результат (после завершения)")
+        }))}
+    )
+    def get(self, request, job_id):
+        job = get_object_or_404(ImportJob, id=job_id)
+        duration = None
+        if job.started_at:
+            duration = round(((job.finished_at or timezone.now()) - job.started_at).total_seconds(), 3)
         
-        if result.get("success"):
-            return Response(result, status=status.HTTP_200_OK)
-        else:
-            return Response(result, status=status.HTTP_400_BAD_REQUEST)
-        
\ No newline at end of file
+        return Response({
+            "job_id": job.id,
+            "kind": job.kind,
+            "force": job.force,
+            "status": job.status,
+            "stages": job.progress,
+            "worker": job.worker,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "seconds": duration,
+            "error": job.error,
+            "result": job.result
+        }, status=status.HTTP_200_OK)
@@ -3,14 +3,23 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
 from django.db.models import Q
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from datetime import datetime, timedelta
 from calendar import monthrange
 
-from apps.v1.products.models import Products, ProductDetails, ProductCategory
+from apps.v1.products.models import Products, ProductDetails, ProductReadModel
+from apps.v1.products.pagination import KeysetPagination
 from apps.v1.order.models import Tariffs, OrderCaluculationMode
-from apps.v1.products.serializers import ProductsSerializer, ProductDetailFilterSerializer, ProductImagesSerializer, CategoriesSerializer
-from apps.v1.order.integrations.advanced_payment_assessment import get_application, get_products_in_grist
+from apps.v1.products.serializers import ProductDetailFilterSerializer, ProductImagesSerializer, CategoriesSerializer
+from apps.v1.order.integrations.advanced_payment_assessment import (
+    grist_basket_risk_category, grist_price_categories, grist_risk_categories
+)
+from apps.v1.products.services.percentage_matrix import get_percentage_matrix
+from apps.v1.products.services.product_autocomplete import DEFAULT_LIMIT, MAX_LIMIT, get_prefix_index
+from apps.v1.products.services.product_read_model import read_model_response_body
+from apps.v1.products.services.product_search import search_products
+from apps.v1.products.services.search_keys import filter_by_search_keys
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.permissions import AllowAny
@@ -24,9 +33,21 @@ class ProductPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class ProductCursorPagination(KeysetPagination):
+    orderings = {
+        "id": ("product_id",),
+        "category": ("category_id", "product_id"),
+        "price": ("price", "product_id"),
+    }
+    default_ordering = "id"
+    page_size = 10
+    max_page_size = 100
+
+
 class ProductListView(APIView):
     permission_classes = [AllowAny]
     pagination_class = ProductPagination
+    cursor_pagination_class = ProductCursorPagination
     
     @swagger_auto_schema(
         tags=['Продукты'],
@@ -36,7 +57,14 @@ class ProductListView(APIView):
             openapi.Parameter(
                 'name',
                 openapi.IN_QUERY,
-                description="Фильтр по названию продукта (частичный поиск)",
+                description="Фильтр по названию продукта: начало слов, кириллица/латиница (айфон = ayfon = iphone)",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
+            openapi.Parameter(
+                'search',
+                openapi.IN_QUERY,
+                description="Поиск по названию, категории и характеристикам с сортировкой по релевантности (допускает опечатки)",
                 type=openapi.TYPE_STRING,
                 required=False
             ),
@@ -61,10 +89,32 @@ class ProductListView(APIView):
                 type=openapi.TYPE_INTEGER,
                 required=False
             ),
+            openapi.Parameter(
+                'pagination',
+                openapi.IN_QUERY,
+                description="cursor - постраничная навигация по курсору (без count и номеров страниц)",
+                type=openapi.TYPE_STRING,
+                enum=['page', 'cursor'],
+                required=False
+            ),
+            openapi.Parameter(
+                'ordering',
+                openapi.IN_QUERY,
+                description="Сортировка в режиме cursor: id, category, price (с '-' - по убыванию)",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                description="Курсор из ссылок next/previous (включает режим cursor)",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
         ],
         responses={
             200: openapi.Response(
-                description="Список продуктов", 
+                description="Список продуктов (в режиме cursor без count и total_pages)", 
                 schema=openapi.Schema(
                     type=openapi.TYPE_OBJECT,
                     properties={
@@ -105,24 +155,105 @@ class ProductListView(APIView):
     def get(self, request):
         name = request.query_params.get('name', None)
         category = request.query_params.get('category', None)
+        search = request.query_params.get('search', '').strip()
         
-        queryset = Products.objects.select_related('category').prefetch_related('details', 'images', 'characteristics__property').all()
+        # Grist narx ro'yxatidan chiqqan (actual=False) productlar ko'rsatilmaydi.
+        # Javob oldindan render qilingan ProductReadModel.payload lardan yig'iladi
+        queryset = ProductReadModel.objects.filter(actual=True).order_by('product_id')
         
         if name:
-            queryset = queryset.filter(name__icontains=name)
+            # "айфон", "ayfon" va "iphone" bir xil transliteratsiya kalitiga keladi
+            keyed = filter_by_search_keys(queryset, name)
+            queryset = keyed if keyed is not None else queryset.filter(name__icontains=name)
         
         if category:
             queryset = queryset.filter(category_id=category)
         
-        paginator = self.pagination_class()
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
-        
-        serializer = ProductsSerializer(paginated_queryset, many=True, context={'request': request})
+        cursor_mode = request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params
         
-        response = paginator.get_paginated_response(serializer.data)
-        response.data['total_pages'] = paginator.page.paginator.num_pages
-        return response
+        if search:
+            if cursor_mode:
+                return Response(
+                    {"error": "Параметр 'search' не поддерживается в режиме pagination=cursor"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Relevantlik bo'yicha saralangan (Postgres: tsvector + pg_trgm)
+            queryset = search_products(queryset, search)
+        
+        if cursor_mode:
+            # Keyset: OFFSET va COUNT(*) siz, chuqur sahifalar ham birinchisi kabi arzon
+            paginator = self.cursor_pagination_class()
+            rows = paginator.paginate_queryset(
+                queryset.values('payload', 'product_id', 'category_id', 'price'), request
+            )
+            body = read_model_response_body(
+                [row['payload'] for row in rows],
+                request,
+                envelope={"next": paginator.get_next_link(), "previous": paginator.get_previous_link()},
+            )
+            return HttpResponse(body, content_type="application/json")
         
+        paginator = self.pagination_class()
+        payloads = paginator.paginate_queryset(queryset.values_list('payload', flat=True), request)
+        
+        body = read_model_response_body(
+            payloads,
+            request,
+            envelope={
+                "count": paginator.page.paginator.count,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+            },
+            extra={"total_pages": paginator.page.paginator.num_pages},
+        )
+        return HttpResponse(body, content_type="application/json")
+
+
+class ProductAutocompleteView(APIView):
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        tags=['Продукты'],
+        operation_summary="Подсказки поиска",
+        operation_description="Подсказки по началу слов в названиях активных категорий и продуктов (кириллица/латиница)",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Введенный текст", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter(
+                'limit', openapi.IN_QUERY, description=f"Количество подсказок (по умолчанию {DEFAULT_LIMIT}, максимум {MAX_LIMIT})",
+                type=openapi.TYPE_INTEGER
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Подсказки",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "results": openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    "type": openapi.Schema(type=openapi.TYPE_STRING, description="category или product"),
+                                    "id": openapi.Schema(type=openapi.TYPE_INTEGER, description="ID"),
+                                    "name": openapi.Schema(type=openapi.TYPE_STRING, description="Название"),
+                                }
+                            )
+                        ),
+                    }
+                )
+            ),
+        }
+    )
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except (TypeError, ValueError):
+            limit = DEFAULT_LIMIT
+        limit = max(1, min(limit, MAX_LIMIT))
+        results = get_prefix_index().search(request.query_params.get('q', ''), limit)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
 
 class ProductDetailView(APIView):
     permission_classes = [AllowAny]
@@ -155,13 +286,15 @@ class ProductDetailView(APIView):
                         ),
                     }
                 )
-            )
+            ),
+            404: "Продукт не найден"
         }
     )
     def get(self, request, product_id):
-        product = Products.objects.select_related('category').prefetch_related('details', 'images', 'characteristics__property').get(id=product_id)
-        serializer = ProductsSerializer(product, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        payload = ProductReadModel.objects.filter(product_id=product_id, actual=True).values_list('payload', flat=True).first()
+        if payload is None:
+            raise Http404
+        return HttpResponse(read_model_response_body([payload], request), content_type="application/json")
 
 
 class ProductDetailFilterView(APIView):
@@ -291,7 +424,7 @@ class ProductDetailFilterView(APIView):
     )
     def get(self, request, product_id):
         try:
-            product = Products.objects.select_related('category').prefetch_related('images', 'details', 'characteristics__property').get(id=product_id)
+            product = Products.objects.filter(actual=True).select_related('category').prefetch_related('images', 'details', 'characteristics__property').get(id=product_id)
         except Products.DoesNotExist:
             return Response(
                 {"error": "Продукт не найден"},
@@ -470,7 +603,7 @@ class CalculateMonthlyPaymentView(APIView):
             )
         
         product = get_object_or_404(Products, id=product_id)
-        tariff = get_object_or_404(Tariffs, id=installment_period)
+        tariff = get_object_or_404(Tariffs, id=installment_period, is_active=True)
         
         monthly_payment = round(
             (float(product.price) - float(total_down_payment)) * 
@@ -587,6 +720,8 @@ class CalculatePaymentScheduleView(APIView):
             )
         
         monthly_payments = []
+        # (risk, price) -> foiz: savatdagi mahsulotlar uchun alohida so'rov yo'q
+        percentage_matrix = get_percentage_matrix()
         
         if calculation_mode == 1:
             total_down_payment = request.data.get('total_down_payment')
@@ -604,7 +739,7 @@ class CalculatePaymentScheduleView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            tariff = get_object_or_404(Tariffs, id=installment_period)
+            tariff = get_object_or_404(Tariffs, id=installment_period, is_active=True)
             
             total_product_sum = 0
             products_data = []
@@ -628,34 +763,16 @@ class CalculatePaymentScheduleView(APIView):
             
             minimum_contribution = 0
             try:
-                application_data = get_application()
-                applications = application_data.get('records', [])
-                
-                grist_products_data = get_products_in_grist()
-                grist_products = grist_products_data.get('records', [])
-                
-                grist_product_map = {}
-                for grist_product in grist_products:
-                    grist_id = grist_product.get('id')
-                    price_category_id = grist_product.get('fields', {}).get('price_category_id')
-                    if grist_id and price_category_id:
-                        grist_product_map[grist_id] = price_category_id
+                grist_product_ids = []
+                for prod_data in products_data:
+                    try:
+                        grist_product_ids.append(int(prod_data['product'].grist_product_id))
+                    except (ValueError, TypeError):
+                        continue
                 
-                risk_category_id = None
-                for app in applications:
-                    app_products = app.get('fields', {}).get('products', [])
-                    for prod_data in products_data:
-                        grist_product_id = prod_data['product'].grist_product_id
-                        if grist_product_id:
-                            try:
-                                grist_product_id = int(grist_product_id)
-                            except (ValueError, TypeError):
-                                continue
-                        if grist_product_id and grist_product_id in app_products:
-                            risk_category_id = app.get('fields', {}).get('risk_category_id')
-                            break
-                    if risk_category_id:
-                        break
+                # Grist Application/Products jadvallarining lokal nusxasidan
+                grist_product_map = grist_price_categories(grist_product_ids)
+                risk_category_id = grist_basket_risk_category(grist_product_ids)
                 
                 for prod_data in products_data:
                     product = prod_data['product']
@@ -672,16 +789,10 @@ class CalculatePaymentScheduleView(APIView):
                         price_category_id = grist_product_map[grist_product_id]
                         
                         if risk_category_id and price_category_id:
-                            try:
-                                product_category = ProductCategory.objects.get(
-                                    grist_risk_category_id=str(risk_category_id),
-                                    grist_price_category_id=str(price_category_id)
-                                )
-                                percentage = product_category.percentage or 0
+                            percentage = percentage_matrix.percentage(risk_category_id, price_category_id)
+                            if percentage is not None:
                                 product_price = float(product.price) * quantity
                                 minimum_contribution += product_price * percentage
-                            except ProductCategory.DoesNotExist:
-                                pass
             except Exception as e:
                 minimum_contribution = 0
             
@@ -719,21 +830,8 @@ class CalculatePaymentScheduleView(APIView):
             merged_payments = {}
             max_months = 0
             
-            try:
-                application_data = get_application()
-                applications = application_data.get('records', [])
-                grist_products_data = get_products_in_grist()
-                grist_products = grist_products_data.get('records', [])
-                
-                grist_product_map = {}
-                for grist_product in grist_products:
-                    grist_id = grist_product.get('id')
-                    price_category_id = grist_product.get('fields', {}).get('price_category_id')
-                    if grist_id and price_category_id:
-                        grist_product_map[grist_id] = price_category_id
-            except:
-                grist_product_map = {}
-                applications = []
+            # (grist product id, mahsulot summasi) - minimal badal tsikldan keyin hisoblanadi
+            grist_product_totals = []
             
             for item in product_list:
                 product_id = item.get('product_id')
@@ -750,7 +848,7 @@ class CalculatePaymentScheduleView(APIView):
                     continue
                 
                 try:
-                    tariff = get_object_or_404(Tariffs, id=item_installment_period)
+                    tariff = get_object_or_404(Tariffs, id=item_installment_period, is_active=True)
                 except:
                     continue
                 
@@ -795,36 +893,27 @@ class CalculatePaymentScheduleView(APIView):
                     max_months = max(max_months, month_num)
                 
                 try:
-                    grist_product_id = product.grist_product_id
-                    if grist_product_id:
-                        try:
-                            grist_product_id = int(grist_product_id)
-                        except (ValueError, TypeError):
-                            continue
-                        
-                        risk_category_id = None
-                        for app in applications:
-                            app_products = app.get('fields', {}).get('products', [])
-                            if grist_product_id in app_products:
-                                risk_category_id = app.get('fields', {}).get('risk_category_id')
-                                break
-                        
-                        if grist_product_id in grist_product_map:
-                            price_category_id = grist_product_map[grist_product_id]
-                            
-                            if risk_category_id and price_category_id:
-                                try:
-                                    product_category = ProductCategory.objects.get(
-                                        grist_risk_category_id=str(risk_category_id),
-                                        grist_price_category_id=str(price_category_id)
-                                    )
-                                    percentage = product_category.percentage or 0
-                                    minimum_contribution += product_total * percentage
-                                except ProductCategory.DoesNotExist:
-                                    pass
-                except:
+                    grist_product_totals.append((int(product.grist_product_id), product_total))
+                except (ValueError, TypeError):
                     pass
             
+            try:
+                # Grist Application/Products jadvallarining lokal nusxasidan
+                grist_product_ids = [grist_product_id for grist_product_id, _ in grist_product_totals]
+                grist_product_map = grist_price_categories(grist_product_ids)
+                risk_categories = grist_risk_categories(grist_product_ids)
+                
+                for grist_product_id, product_total in grist_product_totals:
+                    risk_category_id = risk_categories.get(grist_product_id)
+                    price_category_id = grist_product_map.get(grist_product_id)
+                    
+                    if risk_category_id and price_category_id:
+                        percentage = percentage_matrix.percentage(risk_category_id, price_category_id)
+                        if percentage is not None:
+                            minimum_contribution += product_total * percentage
+            except Exception:
+                minimum_contribution = 0
+            
             monthly_payments = []
             for month_num in sorted(merged_payments.keys()):
                 monthly_payments.append({
@@ -0,0 +1,64 @@
+import hmac
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from apps.v1.products.models import GristWebhookEvent
+from apps.v1.products.services import grist_webhooks
+
+
+def webhook_secret(request):
+    """So'rovdagi secret: Authorization ("Bearer <secret>" yoki o'zi) yoki X-Grist-Webhook-Secret"""
+    authorization = request.headers.get('Authorization', '')
+    if authorization:
+        return authorization[7:] if authorization.startswith('Bearer ') else authorization
+    return request.headers.get('X-Grist-Webhook-Secret', '')
+
+
+class GristWebhookView(APIView):
+    # Secret orqali tekshiriladi - JWT autentifikatsiya Authorization headerini talab qilmasligi uchun o'chirilgan
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    @swagger_auto_schema(
+        tags=['Импорт'],
+        operation_description=(
+            f"Приём вебхука Grist (add/update) для таблиц {', '.join(GristWebhookEvent.Table.values)}. "
+            "Строки ставятся в очередь и применяются import_worker'ом."
+        ),
+        manual_parameters=[
+            openapi.Parameter('table', openapi.IN_PATH, type=openapi.TYPE_STRING, required=True,
+                              enum=GristWebhookEvent.Table.values, description="Таблица Grist"),
+            openapi.Parameter('X-Grist-Webhook-Secret', openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False,
+                              description="Общий секрет (или заголовок Authorization)")
+        ],
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        responses={202: openapi.Response(description="Событие поставлено в очередь", schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+            "message": openapi.Schema(type=openapi.TYPE_STRING, description="Сообщение о результате"),
+            "event_id": openapi.Schema(type=openapi.TYPE_INTEGER, description="ID события"),
+            "rows": openapi.Schema(type=openapi.TYPE_INTEGER, description="Количество строк")
+        }))}
+    )
+    def post(self, request, table):
+        if table not in GristWebhookEvent.Table.values:
+            return Response({"error": f"Неизвестная таблица: {table}"}, status=status.HTTP_404_NOT_FOUND)
+        
+        expected = grist_webhooks.WEBHOOK_SECRET
+        if not expected:
+            return Response({"error": "Секрет вебхука не настроен"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if not hmac.compare_digest(webhook_secret(request).encode(), expected.encode()):
+            return Response({"error": "Неверный секрет вебхука"}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            event = grist_webhooks.enqueue_webhook(table, request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            "message": "Событие поставлено в очередь",
+            "event_id": event.id,
+            "rows": event.row_count
+        }, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,46 @@
+import json
+import logging
+import os
+
+
+# LogRecord ning standart atributlari; qolganlari (extra=...) JSON da alohida maydon bo'ladi
+RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Bir qatorli JSON log: time, level, logger, message va extra maydonlar"""
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update({
+            key: value for key, value in vars(record).items()
+            if key not in RESERVED_ATTRS and not key.startswith("_")
+        })
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+# ISell_LOG_FORMAT=text - odam o'qishi uchun oddiy format (extra maydonlarsiz)
+LOG_LEVEL = os.getenv('ISell_LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('ISell_LOG_FORMAT', 'json')
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "config.libraries.logging.JsonFormatter"},
+        "text": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": LOG_FORMAT},
+    },
+    "loggers": {
+        "apps": {"handlers": ["console"], "level": LOG_LEVEL, "propagate": False},
+    },
+}